@@ -0,0 +1,43 @@
+"""Add task execution timing and throughput columns
+
+Revision ID: 7c1e4a9d2b60
+Revises:
+Create Date: 2026-10-17 00:58:48
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e4a9d2b60'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('prompt_tokens', sa.Integer(), server_default='0'),
+    sa.Column('completion_tokens', sa.Integer(), server_default='0'),
+    sa.Column('queue_wait', sa.Integer()),
+    sa.Column('time_to_first_token', sa.Integer()),
+    sa.Column('tokens_per_second', sa.Float()),
+]
+
+
+def _existing_columns() -> set:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('task_executions')}
+
+
+def upgrade() -> None:
+    # Databases created from init.sql or create_all already have the columns
+    existing = _existing_columns()
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('task_executions', column)
+
+
+def downgrade() -> None:
+    existing = _existing_columns()
+    for column in reversed(COLUMNS):
+        if column.name in existing:
+            op.drop_column('task_executions', column.name)
@@ -3,7 +3,7 @@ Main API router
 """
 
 from fastapi import APIRouter
-from app.api.v1.endpoints import agents, workflows, tasks, executions, websocket
+from app.api.v1.endpoints import agents, workflows, tasks, executions, websocket, llm
 
 api_router = APIRouter()
 
@@ -12,4 +12,5 @@ api_router.include_router(agents.router, prefix="/agents", tags=["agents"])
 api_router.include_router(workflows.router, prefix="/workflows", tags=["workflows"])
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 api_router.include_router(executions.router, prefix="/executions", tags=["executions"])
-api_router.include_router(websocket.router, prefix="/ws", tags=["websocket"])
\ No newline at end of file
+api_router.include_router(websocket.router, prefix="/ws", tags=["websocket"])
+api_router.include_router(llm.router, prefix="/llm", tags=["llm"])
\ No newline at end of file
@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.models.agent import Agent
-from app.schemas.agent import AgentCreate, AgentUpdate, AgentResponse
+from app.schemas.agent import AgentCreate, AgentUpdate, AgentResponse, AgentBatchTestRequest, AgentTestResponse, AgentChatRequest, AgentChatResponse, ConversationSession
 from app.services.agent_service import AgentService
 from app.core.exceptions import NotFoundError, ValidationError
 
@@ -107,6 +107,54 @@ async def test_agent(
         )
 
 
+@router.post("/test/batch", response_model=List[AgentTestResponse])
+async def test_agents_batch(
+    batch: AgentBatchTestRequest,
+    db: Session = Depends(get_db)
+):
+    """Test many agents at once with bounded concurrency"""
+    agent_service = AgentService(db)
+    return await agent_service.test_agents_batch(
+        [test.dict() for test in batch.tests],
+        concurrency=batch.concurrency
+    )
+
+
+@router.post("/{agent_id}/chat", response_model=AgentChatResponse)
+async def chat_with_agent(
+    agent_id: int,
+    chat: AgentChatRequest,
+    db: Session = Depends(get_db)
+):
+    """Send a message to an agent, continuing the conversation in `session_id`"""
+    agent_service = AgentService(db)
+    return await agent_service.chat(agent_id, chat.message, chat.session_id, chat.context)
+
+
+@router.get("/{agent_id}/sessions/{session_id}", response_model=ConversationSession)
+async def get_chat_session(
+    agent_id: int,
+    session_id: str,
+    db: Session = Depends(get_db)
+):
+    """Get the remembered summary and recent turns of an agent conversation"""
+    agent_service = AgentService(db)
+    return await agent_service.get_chat_session(agent_id, session_id)
+
+
+@router.delete("/{agent_id}/sessions/{session_id}")
+async def clear_chat_session(
+    agent_id: int,
+    session_id: str,
+    db: Session = Depends(get_db)
+):
+    """Forget an agent conversation"""
+    agent_service = AgentService(db)
+    if not await agent_service.clear_chat_session(agent_id, session_id):
+        raise NotFoundError("Conversation session", session_id)
+    return {"message": "Conversation session cleared"}
+
+
 @router.get("/{agent_id}/capabilities")
 async def get_agent_capabilities(
     agent_id: int,
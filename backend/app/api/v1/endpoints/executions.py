@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.schemas.execution import ExecutionResponse, ExecutionStats
 from app.services.execution_service import ExecutionService
+from app.services.execution_queue import execution_queue
 from app.core.exceptions import NotFoundError
 
 router = APIRouter()
@@ -48,6 +49,12 @@ async def get_execution_stats(
     return stats
 
 
+@router.get("/queue")
+async def get_execution_queue_stats():
+    """Get execution queue depth and delivery statistics"""
+    return await execution_queue.get_stats()
+
+
 @router.get("/{execution_id}", response_model=ExecutionResponse)
 async def get_execution(
     execution_id: int,
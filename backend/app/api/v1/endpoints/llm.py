@@ -0,0 +1,42 @@
+"""
+LLM client runtime endpoints
+"""
+
+from fastapi import APIRouter
+
+from app.services.cerebras_service import cerebras_service
+from app.services.completion_cache import completion_cache
+from app.services.llm_scheduler import llm_scheduler
+from app.services.model_catalog import model_catalog
+from app.services.model_router import model_router
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_llm_stats():
+    """Get LLM client statistics"""
+    stats = cerebras_service.get_stats()
+    stats["scheduler"]["queue_depth_by_model"] = await llm_scheduler.get_queue_depths()
+    return stats
+
+
+@router.get("/models")
+async def get_models():
+    """Get available models with their context window, relative cost and typical latency"""
+    await cerebras_service.get_available_models()
+    return [info.to_dict() for info in model_catalog.list_models()]
+
+
+@router.post("/routing/reload")
+async def reload_routing_policy():
+    """Reload the model routing policy file"""
+    model_router.reload_policy()
+    return {"message": "Routing policy reloaded successfully"}
+
+
+@router.delete("/cache")
+async def clear_completion_cache():
+    """Clear the completion cache"""
+    await completion_cache.clear()
+    return {"message": "Completion cache cleared successfully"}
@@ -8,8 +8,9 @@ from typing import Dict, Any
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.websocket import websocket_manager
+from app.services.agent_service import AgentService
 from app.services.workflow_service import WorkflowService
 from app.services.task_service import TaskService
 
@@ -209,13 +210,36 @@ async def handle_agent_message(client_id: str, agent_id: int, message: Dict[str,
         }, client_id)
     
     elif message_type == "test_agent":
-        # Test agent with provided input
+        # Test agent with provided input, streaming tokens as they are generated
         test_input = message.get("input", "")
+        
+        async def relay(content: str):
+            await websocket_manager.send_personal_message({
+                "type": "agent_test_token",
+                "agent_id": agent_id,
+                "content": content
+            }, client_id)
+        
+        db = SessionLocal()
+        try:
+            result = await AgentService(db).test_agent(
+                agent_id,
+                {"input": test_input, "context": message.get("context")},
+                on_content=relay
+            )
+        finally:
+            db.close()
+        
         await websocket_manager.send_personal_message({
             "type": "agent_test_result",
             "agent_id": agent_id,
             "input": test_input,
-            "output": "Test result would be here"  # This would be the actual test result
+            "output": result.output,
+            "success": result.success,
+            "error": result.error,
+            "tokens_used": result.tokens_used,
+            "execution_time": result.execution_time,
+            "time_to_first_token": result.time_to_first_token
         }, client_id)
     
     else:
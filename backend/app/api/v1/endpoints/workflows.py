@@ -3,7 +3,7 @@ Workflow management endpoints
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
@@ -92,12 +92,13 @@ async def delete_workflow(
 async def execute_workflow(
     workflow_id: int,
     input_data: Optional[dict] = None,
+    timeout: Optional[float] = Query(None, gt=0, description="Seconds before the execution is cancelled"),
     db: Session = Depends(get_db)
 ):
     """Execute a workflow"""
     workflow_service = WorkflowService(db)
     try:
-        execution = await workflow_service.execute_workflow(workflow_id, input_data)
+        execution = await workflow_service.execute_workflow(workflow_id, input_data, timeout)
         return execution
     except Exception as e:
         raise WorkflowExecutionError(str(workflow_id), str(e))
@@ -3,7 +3,7 @@ Application configuration settings
 """
 
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseSettings, validator
 
 
@@ -43,6 +43,115 @@ class Settings(BaseSettings):
     TEMPERATURE: float = 0.6
     TOP_P: float = 0.9
     
+    # Cerebras HTTP client
+    CEREBRAS_BASE_URL: Optional[str] = None
+    CEREBRAS_TIMEOUT: float = 120.0  # seconds
+    CEREBRAS_CONNECT_TIMEOUT: float = 10.0  # seconds
+    CEREBRAS_MAX_CONNECTIONS: int = 200
+    CEREBRAS_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    CEREBRAS_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+    CEREBRAS_HTTP2: bool = True  # multiplex calls over one connection; needs the h2 package
+    CEREBRAS_PREWARM_CONNECTIONS: int = 8  # opened at startup when on HTTP/1.1
+    CEREBRAS_WARMUP_TIMEOUT: float = 5.0  # seconds startup waits for pre-warming before moving on
+    CEREBRAS_KEEPALIVE_PING_INTERVAL: float = 20.0  # seconds of pool idleness before a ping; 0 disables
+    STREAM_FLUSH_INTERVAL: float = 0.05  # seconds between streamed token relays
+    
+    # Completion cache
+    COMPLETION_CACHE_ENABLED: bool = True
+    COMPLETION_CACHE_MAX_ENTRIES: int = 1024  # in-process LRU tier
+    COMPLETION_CACHE_TTL: int = 300  # seconds, in-process LRU tier
+    COMPLETION_CACHE_REDIS_TTL: int = 3600  # seconds, Redis tier
+    COMPLETION_CACHE_MAX_ENTRY_BYTES: int = 262144  # larger responses are not cached
+    
+    # Single-flight request coalescing
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_DISTRIBUTED: bool = True  # coalesce across workers through Redis
+    SINGLE_FLIGHT_LOCK_TTL: int = 30  # seconds, refreshed while the leader runs
+    
+    # LLM request scheduling (shared across workers through Redis)
+    LLM_SCHEDULER_ENABLED: bool = True
+    LLM_REQUESTS_PER_MINUTE: int = 300
+    LLM_TOKENS_PER_MINUTE: int = 1000000
+    LLM_MODEL_RATE_LIMITS: Dict[str, Dict[str, int]] = {}  # per-model overrides
+    LLM_SCHEDULER_MAX_WAIT: float = 300.0  # seconds a request may queue for budget
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 1024  # completion tokens reserved up front
+    LLM_SCHEDULER_REDIS_BACKOFF: float = 5.0  # seconds to use local budgets only after a Redis failure
+    
+    # LLM retries and circuit breaking
+    LLM_MAX_RETRIES: int = 3  # retries after the first attempt, for transient errors only
+    LLM_RETRY_BASE_DELAY: float = 0.5  # seconds, doubled per attempt with full jitter
+    LLM_RETRY_MAX_DELAY: float = 20.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # consecutive transient failures before opening
+    LLM_CIRCUIT_RECOVERY_TIMEOUT: float = 30.0  # seconds before a half-open probe
+    
+    # LLM latency metrics and request hedging
+    LLM_METRICS_WINDOW: int = 500  # recent calls kept per model
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 0.95  # hedge once a call is slower than this quantile
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # latency samples needed before hedging a model
+    LLM_HEDGE_MIN_DELAY: float = 0.05  # seconds
+    LLM_HEDGE_MAX_RATIO: float = 0.05  # at most this fraction of requests is hedged
+    
+    # Batch completions
+    LLM_BATCH_CONCURRENCY: int = 16  # items in flight per batch
+    
+    # Context-window budgeting
+    LLM_DEFAULT_CONTEXT_WINDOW: int = 8192  # for models without a context window in the catalog
+    LLM_MODEL_CONTEXT_WINDOWS: Dict[str, int] = {}  # per-model overrides
+    LLM_CONTEXT_SAFETY_TOKENS: int = 256  # headroom for token estimation error
+    LLM_MIN_COMPLETION_TOKENS: int = 16  # reject prompts that leave less room than this
+    
+    # Model catalog
+    MODEL_CATALOG_PATH: Optional[str] = None  # defaults to app/data/model_catalog.json
+    MODEL_CATALOG_TTL: int = 3600  # seconds between refreshes, shared through Redis
+    MODEL_CATALOG_UPSTREAM: bool = False  # merge in models listed by the upstream API
+    
+    # LLM backend
+    LLM_BACKEND: str = "cerebras"  # "cerebras", or "simulated" for a local stand-in
+    LLM_SIMULATOR_PROFILE: Dict[str, Any] = {}  # SimulationProfile options for the simulated backend
+    LLM_CASSETTE_MODE: Optional[str] = None  # "record" LLM traffic to a cassette, or "replay" it offline
+    LLM_CASSETTE_PATH: str = "cassettes/llm.jsonl.gz"
+    LLM_CASSETTE_REPLAY_SPEED: float = 1.0  # timing divisor on replay; 0 replays without delays
+    
+    # Model routing
+    MODEL_ROUTING_ENABLED: bool = False
+    MODEL_ROUTING_POLICY_PATH: Optional[str] = None  # defaults to app/data/routing_policy.json
+    
+    # Conversation memory
+    CONVERSATION_MEMORY_TOKEN_BUDGET: int = 2048  # history tokens (summary plus recent turns) per prompt
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 256
+    CONVERSATION_MEMORY_TTL: int = 86400  # seconds a session survives without activity
+    
+    # Execution queue
+    EXECUTION_QUEUE_ENABLED: bool = False  # run executions on worker processes (worker.py) instead of the API
+    EXECUTION_QUEUE_VISIBILITY_TIMEOUT: float = 60.0  # seconds without a worker heartbeat before redelivery
+    EXECUTION_QUEUE_MAX_ATTEMPTS: int = 3  # deliveries before a job is dead-lettered
+    EXECUTION_QUEUE_POLL_INTERVAL: float = 1.0  # seconds between polls of an empty queue
+    WORKER_CONCURRENCY: int = 4  # executions run at once per worker process
+    WORKER_SHUTDOWN_GRACE: float = 25.0  # seconds to let running executions finish on shutdown
+    WORKER_HEARTBEAT_FILE: Optional[str] = "/tmp/worker-heartbeat"  # touched every loop for liveness probes
+    
+    # Task state persistence
+    TASK_STATE_FLUSH_INTERVAL: float = 0.5  # longest a task state change waits to be committed; finished tasks commit at once
+    
+    # Workflow deadlines
+    WORKFLOW_EXECUTION_TIMEOUT: Optional[float] = None  # seconds; overridden per workflow or request
+    
+    # DAG workflows
+    WORKFLOW_DAG_MAX_PARALLELISM: int = 8  # tasks running at once; overridden by workflow config max_parallelism
+    
+    # Workflow concurrency (AI tasks in flight per worker; 0 disables a level)
+    WORKFLOW_MAX_CONCURRENT_TASKS: int = 64  # across all workflows
+    WORKFLOW_MAX_CONCURRENT_TASKS_PER_WORKFLOW: int = 16  # overridden by workflow config max_concurrency
+    WORKFLOW_MAX_CONCURRENT_TASKS_PER_AGENT: int = 16
+    WORKFLOW_MAX_CONCURRENT_TASKS_PER_MODEL: int = 32
+    
+    # Prompt context serialization
+    LLM_CONTEXT_MAX_CHARS: int = 16000  # whole serialized context
+    LLM_CONTEXT_MAX_FIELD_CHARS: int = 4000  # longer strings keep their head and tail
+    LLM_CONTEXT_MAX_LIST_ITEMS: int = 50
+    LLM_CONTEXT_MAX_DEPTH: int = 6  # deeper objects are summarised by their keys
+    
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
     UPLOAD_DIR: str = "uploads"
@@ -103,6 +103,30 @@ class CerebrasAPIError(ExternalServiceError):
         )
 
 
+class CircuitBreakerOpenError(CerebrasAPIError):
+    """Cerebras API calls for a model are short-circuited after repeated failures"""
+    
+    def __init__(self, model: str, retry_after: int = 30):
+        super().__init__(
+            message=f"Circuit breaker open for model {model}; failing fast",
+            details={"model": model, "retry_after": retry_after}
+        )
+        self.error_code = "CIRCUIT_BREAKER_OPEN"
+        self.status_code = 503
+
+
+class CassetteMissError(CustomException):
+    """A replayed LLM request has no recorded interaction in the cassette"""
+    
+    def __init__(self, model: str):
+        super().__init__(
+            message=f"No recorded LLM interaction for this {model} request",
+            error_code="CASSETTE_MISS",
+            status_code=404,
+            details={"model": model}
+        )
+
+
 class WorkflowExecutionError(CustomException):
     """Workflow execution error"""
     
@@ -115,6 +139,38 @@ class WorkflowExecutionError(CustomException):
         )
 
 
+class ExecutionCancelledError(CustomException):
+    """Work was cancelled before it finished"""
+    
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(
+            message=f"Execution cancelled: {reason}",
+            error_code="EXECUTION_CANCELLED",
+            status_code=409,
+            details={"reason": reason}
+        )
+
+
+class DeadlineExceededError(ExecutionCancelledError):
+    """Work ran past its deadline and was cancelled"""
+    
+    def __init__(self):
+        super().__init__("deadline exceeded")
+        self.error_code = "DEADLINE_EXCEEDED"
+        self.status_code = 504
+
+
+class ExecutionPausedError(CustomException):
+    """Execution stopped at a task boundary because it was paused"""
+    
+    def __init__(self):
+        super().__init__(
+            message="Execution paused",
+            error_code="EXECUTION_PAUSED",
+            status_code=409
+        )
+
+
 class AgentExecutionError(CustomException):
     """Agent execution error"""
     
@@ -136,4 +192,12 @@ class RateLimitError(CustomException):
             error_code="RATE_LIMIT_ERROR",
             status_code=429,
             details={"retry_after": retry_after}
-        )
\ No newline at end of file
+        )
+
+
+class SchedulerTimeoutError(RateLimitError):
+    """The local LLM rate budget did not free up within the scheduler's maximum wait
+    
+    Raised before any upstream request is made, so it is neither retried nor
+    counted against the model's circuit breaker.
+    """
\ No newline at end of file
@@ -3,7 +3,7 @@ Redis configuration and connection management
 """
 
 import redis.asyncio as redis
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional, Sequence, cast
 import json
 import asyncio
 
@@ -44,6 +44,16 @@ async def get_redis() -> redis.Redis:
     return _redis
 
 
+async def eval_script(client: redis.Redis, script: str, keys: Sequence[str], *args: Any) -> Any:
+    """Run a Lua script on `keys` with `args`
+    
+    redis-py annotates `eval` as taking lists and maybe returning a plain
+    str, which does not hold for the asyncio client.
+    """
+    evaluate = cast(Callable[..., Awaitable[Any]], client.eval)
+    return await evaluate(script, len(keys), *keys, *args)
+
+
 async def close_redis():
     """Close Redis connection"""
     global _redis
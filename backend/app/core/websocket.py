@@ -10,6 +10,7 @@ from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 
 from app.core.config import settings
+from app.core.redis import get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +18,17 @@ logger = logging.getLogger(__name__)
 class ConnectionManager:
     """Manages WebSocket connections"""
     
+    # Workflow and agent updates from worker processes, tagged by the id they are for
+    RELAY_CHANNEL = "ws:workflow_updates"
+    
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.connection_metadata: Dict[str, Dict[str, Any]] = {}
         self.workflow_subscriptions: Dict[str, Set[str]] = {}
         self.agent_subscriptions: Dict[str, Set[str]] = {}
+        # Set in worker processes, which have no clients of their own
+        self.relay_to_redis = False
+        self._relay_listener: Optional[asyncio.Task] = None
     
     async def connect(self, websocket: WebSocket, client_id: str, metadata: Optional[Dict[str, Any]] = None):
         """Accept a new WebSocket connection"""
@@ -112,7 +119,31 @@ class ConnectionManager:
         logger.info(f"Client {client_id} unsubscribed from agent {agent_id}")
     
     async def broadcast_workflow_update(self, workflow_id: str, message: dict):
-        """Broadcast workflow update to subscribed clients"""
+        """Broadcast workflow update to subscribed clients
+        
+        With `relay_to_redis` the update is published for the API processes,
+        which hold the WebSocket connections, to deliver.
+        """
+        if self.relay_to_redis:
+            await self._relay({"workflow_id": workflow_id, "message": message})
+            return
+        await self._deliver_workflow_update(workflow_id, message)
+    
+    async def _relay(self, update: dict):
+        """Publish an update for the API processes to deliver"""
+        try:
+            redis = await get_redis()
+            await redis.publish(self.RELAY_CHANNEL, json.dumps(update))
+        except Exception as e:
+            logger.warning(f"Could not relay WebSocket update: {e}")
+    
+    async def _deliver_relayed_update(self, update: dict):
+        if "agent_id" in update:
+            await self._deliver_agent_update(update["agent_id"], update["message"])
+        else:
+            await self._deliver_workflow_update(update["workflow_id"], update["message"])
+    
+    async def _deliver_workflow_update(self, workflow_id: str, message: dict):
         if workflow_id in self.workflow_subscriptions:
             disconnected_clients = []
             
@@ -128,7 +159,16 @@ class ConnectionManager:
                 self.disconnect(client_id)
     
     async def broadcast_agent_update(self, agent_id: str, message: dict):
-        """Broadcast agent update to subscribed clients"""
+        """Broadcast agent update to subscribed clients
+        
+        With `relay_to_redis` the update is published like workflow updates.
+        """
+        if self.relay_to_redis:
+            await self._relay({"agent_id": agent_id, "message": message})
+            return
+        await self._deliver_agent_update(agent_id, message)
+    
+    async def _deliver_agent_update(self, agent_id: str, message: dict):
         if agent_id in self.agent_subscriptions:
             disconnected_clients = []
             
@@ -164,11 +204,39 @@ class ConnectionManager:
             self.disconnect(client_id)
         
         logger.info("All WebSocket connections closed")
-
+    
     async def initialize(self):
-        """Initialize connection manager (placeholder for symmetry)"""
-        # No-op for now; method exists to align with startup lifecycle
-        return None
+        """Start delivering workflow and agent updates relayed by worker processes"""
+        if settings.EXECUTION_QUEUE_ENABLED and not self.relay_to_redis and self._relay_listener is None:
+            self._relay_listener = asyncio.create_task(self._listen_for_relayed_updates())
+    
+    async def close(self):
+        if self._relay_listener is not None:
+            self._relay_listener.cancel()
+            try:
+                await self._relay_listener
+            except asyncio.CancelledError:
+                pass
+            self._relay_listener = None
+    
+    async def _listen_for_relayed_updates(self):
+        while True:
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.RELAY_CHANNEL)
+                try:
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            await self._deliver_relayed_update(json.loads(message["data"]))
+                finally:
+                    await pubsub.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Update relay listener error, resubscribing: {e}")
+                await asyncio.sleep(1.0)
 
 
 # Global WebSocket manager
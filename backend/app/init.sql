@@ -100,7 +100,12 @@ CREATE TABLE IF NOT EXISTS task_executions (
     error_message TEXT,
     execution_log JSONB,
     tokens_used INTEGER DEFAULT 0,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
     execution_time INTEGER,
+    queue_wait INTEGER,
+    time_to_first_token INTEGER,
+    tokens_per_second DOUBLE PRECISION,
     created_by INTEGER REFERENCES users(id)
 );
 
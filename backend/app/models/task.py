@@ -2,7 +2,7 @@
 Task model
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Text, JSON, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -56,7 +56,12 @@ class TaskExecution(Base):
     error_message = Column(Text)
     execution_log = Column(JSON)  # Detailed execution log
     tokens_used = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
     execution_time = Column(Integer)  # Execution time in milliseconds
+    queue_wait = Column(Integer)  # Milliseconds spent waiting for rate-limit budget
+    time_to_first_token = Column(Integer)  # Milliseconds, streamed tasks only
+    tokens_per_second = Column(Float)  # Completion tokens per second of upstream time
     created_by = Column(Integer)  # User ID
     
     # Relationships
@@ -17,7 +17,7 @@ class Workflow(Base):
     name = Column(String(200), nullable=False, index=True)
     description = Column(Text)
     status = Column(String(20), default="draft")  # draft, active, paused, completed, failed
-    workflow_type = Column(String(20), default="linear")  # linear, parallel, conditional, loop
+    workflow_type = Column(String(20), default="linear")  # linear, parallel, dag, conditional, loop
     config = Column(JSON)  # Workflow configuration
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -41,7 +41,7 @@ class WorkflowExecution(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
-    status = Column(String(20), default="pending")  # pending, running, completed, failed, cancelled
+    status = Column(String(20), default="pending")  # pending, running, paused, completed, failed, cancelled
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
     input_data = Column(JSON)
@@ -61,6 +61,17 @@ class AgentTestRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class AgentBatchTestItem(AgentTestRequest):
+    """Single test in an agent batch test request"""
+    agent_id: int
+
+
+class AgentBatchTestRequest(BaseModel):
+    """Agent batch test request schema"""
+    tests: List[AgentBatchTestItem] = Field(..., min_length=1, max_length=500)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=100)
+
+
 class AgentTestResponse(BaseModel):
     """Agent test response schema"""
     agent_id: int
@@ -68,5 +79,33 @@ class AgentTestResponse(BaseModel):
     output: str
     execution_time: float
     tokens_used: int
+    time_to_first_token: Optional[float] = None
     success: bool
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+
+
+class AgentChatRequest(BaseModel):
+    """Agent chat message schema; omit session_id to start a new conversation"""
+    message: str = Field(..., min_length=1)
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
+    context: Optional[Dict[str, Any]] = None
+
+
+class AgentChatResponse(BaseModel):
+    """Agent chat reply schema"""
+    agent_id: int
+    session_id: str
+    output: str
+    tokens_used: int
+    history_tokens: int = 0
+    history_turns: int = 0
+    history_summarized: bool = False
+
+
+class ConversationSession(BaseModel):
+    """Stored conversation memory of an agent session"""
+    session_id: str
+    summary: Optional[str] = None
+    summarized_turns: int = 0
+    turns: List[Dict[str, str]] = []
+    tokens: int = 0
@@ -46,6 +46,20 @@ class ExecutionLog(BaseModel):
     details: Optional[Dict[str, Any]] = None
 
 
+class TaskExecutionMetrics(BaseModel):
+    """Per-task timing and throughput schema; times are in seconds"""
+    task_execution_id: int
+    task_id: int
+    status: str
+    execution_time: Optional[float] = None
+    queue_wait: Optional[float] = None
+    time_to_first_token: Optional[float] = None
+    tokens_per_second: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_used: int = 0
+
+
 class ExecutionMetrics(BaseModel):
     """Execution metrics schema"""
     execution_id: int
@@ -55,4 +69,10 @@ class ExecutionMetrics(BaseModel):
     total_tokens: int
     total_time: float
     average_task_time: float
-    success_rate: float
\ No newline at end of file
+    success_rate: float
+    total_prompt_tokens: int = 0
+    total_completion_tokens: int = 0
+    average_queue_wait: float = 0
+    average_time_to_first_token: Optional[float] = None
+    average_tokens_per_second: Optional[float] = None
+    tasks: List[TaskExecutionMetrics] = []
\ No newline at end of file
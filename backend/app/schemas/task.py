@@ -75,7 +75,12 @@ class TaskExecutionResponse(TaskExecutionBase):
     error_message: Optional[str] = None
     execution_log: Optional[Dict[str, Any]] = None
     tokens_used: int = 0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     execution_time: Optional[int] = None
+    queue_wait: Optional[int] = None
+    time_to_first_token: Optional[int] = None
+    tokens_per_second: Optional[float] = None
     created_by: Optional[int] = None
     
     class Config:
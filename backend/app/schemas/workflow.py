@@ -11,7 +11,7 @@ class WorkflowBase(BaseModel):
     """Base workflow schema"""
     name: str = Field(..., min_length=1, max_length=200)
     description: Optional[str] = None
-    workflow_type: str = Field(default="linear", regex="^(linear|parallel|conditional|loop)$")
+    workflow_type: str = Field(default="linear", regex="^(linear|parallel|dag|conditional|loop)$")
     config: Optional[Dict[str, Any]] = None
     is_active: bool = Field(default=True)
 
@@ -25,7 +25,7 @@ class WorkflowUpdate(BaseModel):
     """Workflow update schema"""
     name: Optional[str] = Field(None, min_length=1, max_length=200)
     description: Optional[str] = None
-    workflow_type: Optional[str] = Field(None, regex="^(linear|parallel|conditional|loop)$")
+    workflow_type: Optional[str] = Field(None, regex="^(linear|parallel|dag|conditional|loop)$")
     config: Optional[Dict[str, Any]] = None
     is_active: Optional[bool] = None
 
@@ -4,13 +4,16 @@ Agent service for managing AI agents
 
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+import uuid
+from typing import List, Optional, Dict, Any, Awaitable, Callable, cast
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.models.agent import Agent
-from app.schemas.agent import AgentCreate, AgentUpdate, AgentResponse, AgentTestResponse
+from app.schemas.agent import AgentCreate, AgentUpdate, AgentResponse, AgentTestResponse, AgentChatResponse, ConversationSession
 from app.services.cerebras_service import cerebras_service
+from app.services.conversation_memory import conversation_memory
+from app.services.prompt_templates import prompt_registry
 from app.core.exceptions import NotFoundError, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -111,6 +114,7 @@ class AgentService:
             
             self.db.commit()
             self.db.refresh(agent)
+            prompt_registry.invalidate_agent(agent.id)
             
             logger.info(f"Updated agent: {agent.name}")
             return AgentResponse.from_orm(agent)
@@ -130,6 +134,7 @@ class AgentService:
             
             self.db.delete(agent)
             self.db.commit()
+            prompt_registry.invalidate_agent(agent_id)
             
             logger.info(f"Deleted agent: {agent.name}")
             return True
@@ -139,28 +144,38 @@ class AgentService:
             logger.error(f"Error deleting agent {agent_id}: {e}")
             raise ValidationError(f"Failed to delete agent: {str(e)}")
     
-    async def test_agent(self, agent_id: int, test_input: Dict[str, Any]) -> AgentTestResponse:
-        """Test an agent with sample input"""
+    async def test_agent(
+        self,
+        agent_id: int,
+        test_input: Dict[str, Any],
+        on_content: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> AgentTestResponse:
+        """Test an agent with sample input
+        
+        When `on_content` is given the response is streamed and each batch of
+        generated text is passed to it as it arrives.
+        """
         try:
             agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
             
             if not agent:
                 raise NotFoundError("Agent", str(agent_id))
             
-            # Build agent prompt
-            agent_prompt = self._build_agent_prompt(agent, test_input)
+            generation_kwargs = self._build_test_request(agent, test_input)
             
             # Generate response
             start_time = asyncio.get_event_loop().time()
-            
-            response = await cerebras_service.generate_agent_response(
-                agent_prompt=agent_prompt,
-                context=test_input.get("context"),
-                model=agent.model,
-                max_tokens=agent.max_tokens,
-                temperature=float(agent.temperature),
-                top_p=float(agent.top_p)
-            )
+            time_to_first_token = None
+            
+            if on_content is not None:
+                result = await cerebras_service.consume_stream(
+                    cerebras_service.stream_agent_response(**generation_kwargs),
+                    on_content=on_content
+                )
+                response = {"response": result["content"], "tokens_used": result["tokens_used"]}
+                time_to_first_token = result["time_to_first_token"]
+            else:
+                response = await cerebras_service.generate_agent_response(**generation_kwargs)
             
             end_time = asyncio.get_event_loop().time()
             execution_time = end_time - start_time
@@ -171,6 +186,7 @@ class AgentService:
                 output=response["response"],
                 execution_time=execution_time,
                 tokens_used=response["tokens_used"],
+                time_to_first_token=time_to_first_token,
                 success=True
             )
             
@@ -186,18 +202,128 @@ class AgentService:
                 error=str(e)
             )
     
-    def _build_agent_prompt(self, agent: Agent, test_input: Dict[str, Any]) -> str:
-        """Build prompt for agent testing"""
-        prompt = f"""
-Agent Role: {agent.role}
-Agent Goal: {agent.goal}
-Agent Backstory: {agent.backstory}
-
-Task: {test_input.get('input', '')}
-
-Please provide a response based on your role and goal.
-"""
-        return prompt
+    async def test_agents_batch(
+        self,
+        tests: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[AgentTestResponse]:
+        """Test many agents at once through the batch completion API
+        
+        Each test holds an `agent_id` plus the same `input` and `context` as
+        `test_agent`. Results are returned in input order; a failing test is
+        reported on its own response without failing the others.
+        """
+        agent_ids = {test.get("agent_id") for test in tests}
+        agents = {
+            agent.id: agent
+            for agent in self.db.query(Agent).filter(Agent.id.in_(agent_ids)).all()
+        }
+        
+        results: List[Optional[AgentTestResponse]] = [None] * len(tests)
+        batch_requests = []
+        batch_positions = []
+        for position, test in enumerate(tests):
+            agent = agents.get(test.get("agent_id"))
+            if agent is None:
+                results[position] = AgentTestResponse(
+                    agent_id=test.get("agent_id") or 0,
+                    input=test.get("input", ""),
+                    output="",
+                    execution_time=0.0,
+                    tokens_used=0,
+                    success=False,
+                    error=NotFoundError("Agent", str(test.get("agent_id"))).message
+                )
+                continue
+            batch_requests.append(self._build_test_request(agent, test))
+            batch_positions.append(position)
+        
+        batch_results = await cerebras_service.generate_completions_batch(batch_requests, concurrency)
+        for position, item in zip(batch_positions, batch_results):
+            test = tests[position]
+            if item["success"]:
+                results[position] = AgentTestResponse(
+                    agent_id=test["agent_id"],
+                    input=test.get("input", ""),
+                    output=item["result"]["response"],
+                    execution_time=item["execution_time"],
+                    tokens_used=item["result"]["tokens_used"],
+                    success=True
+                )
+            else:
+                results[position] = AgentTestResponse(
+                    agent_id=test["agent_id"],
+                    input=test.get("input", ""),
+                    output="",
+                    execution_time=item["execution_time"],
+                    tokens_used=0,
+                    success=False,
+                    error=item["error"]
+                )
+        
+        return cast(List[AgentTestResponse], results)
+    
+    async def chat(
+        self,
+        agent_id: int,
+        message: str,
+        session_id: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AgentChatResponse:
+        """Send a message to an agent within a remembered conversation
+        
+        Only the new message is sent; earlier turns come from the session's
+        conversation memory. A new session is started without `session_id`.
+        """
+        agent = self.db.query(Agent).filter(Agent.id == agent_id).first()
+        if not agent:
+            raise NotFoundError("Agent", str(agent_id))
+        
+        session_id = session_id or uuid.uuid4().hex
+        response = await cerebras_service.generate_agent_response(
+            agent_prompt=message,
+            system_prompt=prompt_registry.get_agent_system_prompt(agent),
+            context=context,
+            model=agent.model,
+            max_tokens=agent.max_tokens,
+            temperature=float(agent.temperature),
+            top_p=float(agent.top_p),
+            use_cache=(agent.config or {}).get("cache_enabled", True),
+            routing_hints=agent.config or {},
+            session_id=session_id,
+            agent_id=agent_id
+        )
+        
+        return AgentChatResponse(
+            agent_id=agent_id,
+            session_id=session_id,
+            output=response["response"],
+            tokens_used=response["tokens_used"],
+            history_tokens=response["history_tokens"],
+            history_turns=response["history_turns"],
+            history_summarized=response["history_summarized"]
+        )
+    
+    async def get_chat_session(self, agent_id: int, session_id: str) -> ConversationSession:
+        """Get the remembered summary and turns of an agent conversation"""
+        return ConversationSession(**await conversation_memory.get_session(agent_id, session_id))
+    
+    async def clear_chat_session(self, agent_id: int, session_id: str) -> bool:
+        """Forget an agent conversation"""
+        return await conversation_memory.clear(agent_id, session_id)
+    
+    def _build_test_request(self, agent: Agent, test_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the generation arguments for testing an agent"""
+        return dict(
+            agent_prompt=prompt_registry.render("agent_test", input=test_input.get("input", "")),
+            system_prompt=prompt_registry.get_agent_system_prompt(agent),
+            context=test_input.get("context"),
+            model=agent.model,
+            max_tokens=agent.max_tokens,
+            temperature=float(agent.temperature),
+            top_p=float(agent.top_p),
+            use_cache=(agent.config or {}).get("cache_enabled", True)
+        )
     
     async def get_agent_capabilities(self, agent_id: int) -> Dict[str, Any]:
         """Get agent capabilities and tools"""
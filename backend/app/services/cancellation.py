@@ -0,0 +1,273 @@
+"""
+Deadlines and cancellation tokens for workflow executions and LLM calls
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from typing import Dict, Any, Optional, Awaitable, Callable, TypeVar
+
+from app.core.exceptions import ExecutionCancelledError, DeadlineExceededError
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CancellationToken:
+    """Cancellation signal with an optional deadline, shared down a call tree
+    
+    A child token is cancelled with its parent and never outlives the
+    parent's deadline, so an execution token covers every task token made
+    from it. Work checks `raise_if_cancelled` between steps or wraps an
+    awaitable in `run`, which abandons it (closing its HTTP request) as soon
+    as the token is cancelled or the deadline passes. Tokens saved by
+    cancelling are added up the tree. A pause request only sets
+    `pause_requested`, which executors check between tasks.
+    """
+    
+    def __init__(self, timeout: Optional[float] = None, parent: Optional["CancellationToken"] = None):
+        self.parent = parent
+        self.deadline: Optional[float] = None
+        self.start_timeout(timeout)
+        self.reason: Optional[str] = None
+        self.pause_requested = False
+        self.tokens_saved = 0
+        self._event = asyncio.Event()
+        self._children: "weakref.WeakSet[CancellationToken]" = weakref.WeakSet()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        if parent is not None:
+            parent._children.add(self)
+            if parent.reason is not None:
+                self.cancel(parent.reason)
+    
+    def child(self, timeout: Optional[float] = None) -> "CancellationToken":
+        return CancellationToken(timeout, parent=self)
+    
+    def start_timeout(self, timeout: Optional[float]):
+        """Set the token's own deadline `timeout` seconds from now, still capped by its parent's
+        
+        For work whose timeout should only count once it actually starts,
+        such as a task that first waits for a concurrency slot.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        parent = self.parent
+        if parent is not None and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        self.deadline = deadline
+    
+    @property
+    def cancelled(self) -> bool:
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+        return self.reason is not None
+    
+    @property
+    def deadline_exceeded(self) -> bool:
+        return self.cancelled and self.reason == "deadline exceeded"
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is not None:
+            return
+        self.reason = reason
+        self._event.set()
+        for callback in list(self._callbacks.values()):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {e}")
+        self._callbacks.clear()
+        for child in list(self._children):
+            child.cancel(reason)
+    
+    def add_callback(self, callback: Callable[[], None]) -> int:
+        """Call `callback` once on cancellation; returns a handle for `remove_callback`"""
+        handle = id(callback)
+        if self.cancelled:
+            callback()
+        else:
+            self._callbacks[handle] = callback
+        return handle
+    
+    def remove_callback(self, handle: int):
+        self._callbacks.pop(handle, None)
+    
+    def raise_if_cancelled(self):
+        if not self.cancelled:
+            return
+        if self.reason == "deadline exceeded":
+            raise DeadlineExceededError()
+        raise ExecutionCancelledError(self.reason or "cancelled")
+    
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await `awaitable`, abandoning it when the token is cancelled or its deadline passes"""
+        task = asyncio.ensure_future(awaitable)
+        if self.cancelled:
+            task.cancel()
+            self.raise_if_cancelled()
+        
+        waiter = asyncio.ensure_future(self._event.wait())
+        try:
+            await asyncio.wait({task, waiter}, timeout=self.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except BaseException:
+                    pass
+        
+        if task.cancelled():
+            # Cancelled by the token, or by the deadline expiring
+            if not self.cancelled:
+                self.cancel("deadline exceeded")
+            self.raise_if_cancelled()
+        return task.result()
+    
+    def record_tokens_saved(self, tokens: int):
+        token: Optional[CancellationToken] = self
+        while token is not None:
+            token.tokens_saved += tokens
+            token = token.parent
+
+
+class CancellationRegistry:
+    """Cancellation tokens of running executions, reachable from any worker
+    
+    Executions register a token when they start. `cancel` cancels the local
+    token and publishes the execution id on a Redis channel so the worker
+    actually running it cancels too; `pause` does the same on a second
+    channel.
+    """
+    
+    CHANNEL = "llm:cancel"
+    PAUSE_CHANNEL = "llm:pause"
+    
+    def __init__(self):
+        self._tokens: Dict[int, CancellationToken] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = {
+            "cancelled": 0,
+            "deadline_exceeded": 0,
+            "tokens_saved": 0
+        }
+    
+    def register(self, execution_id: int, timeout: Optional[float] = None) -> CancellationToken:
+        token = CancellationToken(timeout)
+        self._tokens[execution_id] = token
+        return token
+    
+    def get(self, execution_id: int) -> Optional[CancellationToken]:
+        return self._tokens.get(execution_id)
+    
+    def unregister(self, execution_id: int, token: Optional[CancellationToken] = None):
+        """Drop an execution's token once it has finished, counting what cancellation saved
+        
+        With `token`, only that token is dropped, not one registered since for
+        a new run of the execution.
+        """
+        if token is not None and self._tokens.get(execution_id) is not token:
+            return
+        token = self._tokens.pop(execution_id, None)
+        if token is None or not token.cancelled:
+            return
+        if token.deadline_exceeded:
+            self.stats["deadline_exceeded"] += 1
+        else:
+            self.stats["cancelled"] += 1
+        self.stats["tokens_saved"] += token.tokens_saved
+    
+    async def cancel(self, execution_id: int, reason: str = "cancelled") -> bool:
+        """Cancel an execution on this worker and ask the others to do the same"""
+        cancelled_locally = self._cancel_local(execution_id, reason)
+        try:
+            redis = await get_redis()
+            await redis.publish(self.CHANNEL, str(execution_id))
+        except Exception as e:
+            logger.warning(f"Could not publish cancellation of execution {execution_id}: {e}")
+        return cancelled_locally
+    
+    async def pause(self, execution_id: int) -> bool:
+        """Ask an execution to stop at its next task boundary, on whichever worker runs it"""
+        paused_locally = self._pause_local(execution_id)
+        try:
+            redis = await get_redis()
+            await redis.publish(self.PAUSE_CHANNEL, str(execution_id))
+        except Exception as e:
+            logger.warning(f"Could not publish pause of execution {execution_id}: {e}")
+        return paused_locally
+    
+    def _pause_local(self, execution_id: int) -> bool:
+        token = self._tokens.get(execution_id)
+        if token is None:
+            return False
+        if not token.pause_requested:
+            token.pause_requested = True
+            logger.info(f"Pausing execution {execution_id}")
+        return True
+    
+    def _cancel_local(self, execution_id: int, reason: str = "cancelled") -> bool:
+        token = self._tokens.get(execution_id)
+        if token is None:
+            return False
+        if token.reason is not None:
+            return True
+        token.cancel(reason)
+        logger.info(f"Cancelled execution {execution_id}: {reason}")
+        return True
+    
+    async def start(self):
+        """Listen for cancellations published by other workers"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+    
+    async def _listen(self):
+        while True:
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.CHANNEL, self.PAUSE_CHANNEL)
+                try:
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is None:
+                            continue
+                        if message["channel"] == self.PAUSE_CHANNEL:
+                            self._pause_local(int(message["data"]))
+                        else:
+                            self._cancel_local(int(message["data"]))
+                finally:
+                    await pubsub.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cancellation listener error, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": len(self._tokens)
+        }
+
+
+# Global cancellation registry instance
+cancellation_registry = CancellationRegistry()
@@ -5,10 +5,29 @@ Cerebras AI service for model inference
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, AsyncGenerator, Union, Literal, overload, cast
-from cerebras.cloud.sdk import Cerebras
+import time
+from contextlib import nullcontext
+from typing import Dict, Any, List, Iterable, Optional, Tuple, AsyncGenerator, Awaitable, Callable, Union, Literal, overload, cast
+import httpx
+from cerebras.cloud.sdk import APIStatusError
 from app.core.config import settings
-from app.core.exceptions import CerebrasAPIError
+from app.core.exceptions import CustomException, CerebrasAPIError, ExecutionCancelledError
+from app.services.llm_backend import LLMBackend, CompletionResult, CompletionStream, create_backend
+from app.services.completion_cache import completion_cache
+from app.services.single_flight import single_flight
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_resilience import resilient_caller, is_retryable
+from app.services.llm_hedging import hedger
+from app.services.llm_metrics import llm_metrics
+from app.services.tokenizer import token_estimator, fit_completion_tokens
+from app.services.prompt_templates import prompt_registry, DEFAULT_SYSTEM_PROMPT
+from app.services.context_serializer import context_serializer, SerializedContext
+from app.services.model_catalog import model_catalog
+from app.services.model_router import model_router
+from app.services.llm_scheduler import Reservation
+from app.services.cancellation import CancellationToken, cancellation_registry
+from app.services.conversation_memory import conversation_memory, MemoryContext
+from app.services.task_concurrency import task_concurrency
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +35,32 @@ logger = logging.getLogger(__name__)
 class CerebrasService:
     """Service for interacting with Cerebras AI models"""
     
-    def __init__(self):
-        self.client = Cerebras(api_key=settings.CEREBRAS_API_KEY)
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend or create_backend()
         self.default_model = settings.DEFAULT_MODEL
         self.max_tokens = settings.MAX_TOKENS
         self.temperature = settings.TEMPERATURE
         self.top_p = settings.TOP_P
     
+    async def warm_up(self):
+        """Pre-warm the backend's connections so the first calls skip connection setup
+        
+        Bounded by `CEREBRAS_WARMUP_TIMEOUT` so an unreachable upstream cannot hold up startup.
+        """
+        try:
+            await asyncio.wait_for(self.backend.warm_up(), timeout=settings.CEREBRAS_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Pre-warming LLM connections did not finish within {settings.CEREBRAS_WARMUP_TIMEOUT}s; "
+                f"starting without it"
+            )
+        except Exception as e:
+            logger.warning(f"Could not pre-warm LLM connections: {e}")
+    
+    async def close(self):
+        """Close the backend and its connection pool"""
+        await self.backend.close()
+    
     @overload
     async def generate_completion(
         self,
@@ -31,10 +69,17 @@ class CerebrasService:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
-        stream: Literal[False] = False
+        stream: Literal[False] = False,
+        use_cache: bool = True,
+        coalesce: bool = True,
+        system_prompt: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        task_type: Optional[str] = None,
+        routing_hints: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Dict[str, Any]:
         ...
-
+    
     @overload
     async def generate_completion(
         self,
@@ -43,10 +88,17 @@ class CerebrasService:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
-        stream: Literal[True] = True
+        stream: Literal[True] = True,
+        use_cache: bool = True,
+        coalesce: bool = True,
+        system_prompt: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        task_type: Optional[str] = None,
+        routing_hints: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         ...
-
+    
     async def generate_completion(
         self,
         prompt: str,
@@ -54,74 +106,208 @@ class CerebrasService:
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
-        stream: bool = False
+        stream: bool = False,
+        use_cache: bool = True,
+        coalesce: bool = True,
+        system_prompt: Optional[str] = None,
+        cancel_token: Optional[CancellationToken] = None,
+        task_type: Optional[str] = None,
+        routing_hints: Optional[Dict[str, Any]] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> Union[Dict[str, Any], AsyncGenerator[Dict[str, Any], None]]:
-        """Generate completion using Cerebras model"""
+        """Generate completion using Cerebras model
+        
+        `system_prompt` replaces the default system message; pass an agent's
+        persona from the prompt registry so requests share a stable prefix.
+        Non-streaming completions are served from the completion cache when
+        `use_cache` is set and an identical request has been answered before.
+        With `coalesce`, concurrent identical requests share one upstream call.
+        The prompt is measured locally first: `max_tokens` is clamped to what
+        fits the model's context window, and prompts that cannot fit are
+        rejected with a ValidationError before any network round trip.
+        A `cancel_token` aborts the upstream call, or a stream mid-generation,
+        once it is cancelled or its deadline passes. Such calls are never
+        coalesced, since cancelling one caller must not fail the others.
+        Passing `task_type` or `routing_hints` (an agent's config) lets the
+        model router move the call to a cheaper or faster model when routing
+        is enabled. `history` holds earlier conversation messages, placed
+        between the system prompt and `prompt`.
+        """
         try:
             model = model or self.default_model
             max_tokens = max_tokens or self.max_tokens
-            temperature = temperature or self.temperature
-            top_p = top_p or self.top_p
+            temperature = self.temperature if temperature is None else temperature
+            top_p = self.top_p if top_p is None else top_p
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+                coalesce = False
             
             # Prepare messages
             messages = [
                 {
                     "role": "system",
-                    "content": "You are a helpful AI assistant powered by Cerebras models."
+                    "content": system_prompt or DEFAULT_SYSTEM_PROMPT
                 },
+                *(history or []),
                 {
                     "role": "user",
                     "content": prompt
                 }
             ]
             
+            prompt_tokens = token_estimator.count_messages(messages, model)
+            if task_type is not None or routing_hints is not None:
+                decision = model_router.route(model, prompt_tokens, max_tokens, task_type, routing_hints)
+                if decision.routed:
+                    model = decision.model
+                    prompt_tokens = token_estimator.count_messages(messages, model)
+            max_tokens, clamped = fit_completion_tokens(model, prompt_tokens, max_tokens)
+            if clamped:
+                logger.debug(f"Clamped max_tokens to {max_tokens} for a ~{prompt_tokens}-token prompt on {model}")
+            
+            request_key = completion_cache.make_key(model, messages, temperature, top_p, max_tokens)
+            
             if stream:
-                return self._stream_completion(
+                def open_stream():
+                    return self._stream_completion(
+                        messages=messages,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=top_p,
+                        estimated_prompt_tokens=prompt_tokens,
+                        cancel_token=cancel_token
+                    )
+                
+                if coalesce:
+                    return single_flight.stream(f"stream:{request_key}", open_stream)
+                return open_stream()
+            
+            cache_enabled = use_cache and completion_cache.enabled
+            if cache_enabled:
+                cached = await completion_cache.get(request_key)
+                if cached is not None:
+                    return self._cache_hit(cached)
+            
+            async def call_upstream() -> Dict[str, Any]:
+                response = await self._generate_completion(
                     messages=messages,
                     model=model,
                     max_tokens=max_tokens,
                     temperature=temperature,
-                    top_p=top_p
+                    top_p=top_p,
+                    estimated_prompt_tokens=prompt_tokens,
+                    cancel_token=cancel_token
                 )
+                if cache_enabled:
+                    await completion_cache.set(request_key, response)
+                return response
+            
+            if coalesce:
+                response = await single_flight.do(request_key, call_upstream)
             else:
-                return await self._generate_completion(
-                    messages=messages,
-                    model=model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    top_p=top_p
-                )
-                
+                response = await call_upstream()
+            
+            return response
+            
+        except CustomException:
+            raise
         except Exception as e:
             logger.error(f"Cerebras API error: {e}")
             raise CerebrasAPIError(str(e))
     
+    def _cache_hit(self, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """A cached completion, with its tokens reported as cached rather than consumed
+        
+        The stored timing and usage belong to the call that filled the cache;
+        this request neither waited for budget nor generated anything.
+        """
+        return {
+            **cached,
+            "cached": True,
+            "cached_tokens": cached.get("tokens_used") or 0,
+            "tokens_used": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "queue_wait": 0.0,
+            "time_to_first_token": None
+        }
+    
     async def _generate_completion(
         self,
         messages: list,
         model: str,
         max_tokens: int,
         temperature: float,
-        top_p: float
+        top_p: float,
+        estimated_prompt_tokens: int = 0,
+        cancel_token: Optional[CancellationToken] = None
     ) -> Dict[str, Any]:
-        """Generate non-streaming completion"""
+        """Generate non-streaming completion
+        
+        Transient upstream errors are retried, and slow calls are hedged with a
+        duplicate request when hedging is enabled. Each attempt and retry waits
+        for its own rate-limit reservation, since each one is a real upstream
+        request; a hedge is only sent if budget is available immediately.
+        Cancelling `cancel_token` abandons the call, including any wait for
+        rate-limit budget.
+        """
+        queue_wait = 0.0
+        
+        async def attempt(granted: Optional[Reservation] = None) -> CompletionResult:
+            nonlocal queue_wait
+            async with llm_scheduler.reserve(model, messages, max_tokens, granted) as reservation:
+                queue_wait += reservation.queue_wait
+                # Only the upstream call is timed, so hedge thresholds and routing see its latency
+                started = time.perf_counter()
+                try:
+                    response = await self.backend.complete(
+                        messages=messages,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=top_p
+                    )
+                except Exception:
+                    llm_metrics.record(model, None, success=False)
+                    raise
+                llm_metrics.record(model, time.perf_counter() - started)
+                reservation.actual_tokens = response.total_tokens or 0
+            return response
+        
+        def send(granted: Optional[Reservation] = None):
+            # Budget granted up front covers the first attempt; retries reserve their own
+            budgets = iter([granted])
+            return resilient_caller.call(model, lambda: attempt(next(budgets, None)))
+        
+        async def prepare_hedge():
+            granted = await llm_scheduler.try_acquire(model, messages, max_tokens)
+            return None if granted is None else lambda: send(granted)
+        
         try:
-            response = self.client.chat.completions.create(
-                messages=messages,
-                model=model,
-                max_completion_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                stream=False
-            )
+            if cancel_token is None:
+                response = await hedger.run(model, send, prepare_hedge)
+            else:
+                response = await cancel_token.run(hedger.run(model, send, prepare_hedge))
+            
+            token_estimator.record_usage(model, estimated_prompt_tokens, response.prompt_tokens)
             
             return {
-                "content": response.choices[0].message.content,
+                "content": response.content,
                 "model": model,
-                "tokens_used": getattr(response.usage, 'total_tokens', 0),
-                "finish_reason": response.choices[0].finish_reason
+                "tokens_used": response.total_tokens or 0,
+                "prompt_tokens": response.prompt_tokens,
+                "completion_tokens": response.completion_tokens,
+                "estimated_prompt_tokens": estimated_prompt_tokens,
+                "finish_reason": response.finish_reason,
+                "queue_wait": queue_wait
             }
             
+        except ExecutionCancelledError:
+            self._record_cancellation(cancel_token, max_tokens)
+            raise
+        except CustomException:
+            raise
         except Exception as e:
             logger.error(f"Cerebras completion error: {e}")
             raise CerebrasAPIError(f"Completion generation failed: {str(e)}")
@@ -132,99 +318,472 @@ class CerebrasService:
         model: str,
         max_tokens: int,
         temperature: float,
-        top_p: float
+        top_p: float,
+        estimated_prompt_tokens: int = 0,
+        cancel_token: Optional[CancellationToken] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        """Generate streaming completion"""
+        """Generate streaming completion
+        
+        Content chunks are yielded as soon as they arrive. The final chunk carries
+        the finish reason, token usage and time-to-first-token in seconds.
+        Transient errors are retried only while opening the stream; once
+        content has been yielded a failure is surfaced to the consumer. Each
+        attempt waits for its own rate-limit reservation, settled when the
+        stream ends with that attempt's usage: none for an attempt rejected by
+        upstream, the stream's usage for the one that opened. Cancelling
+        `cancel_token` abandons the wait for budget and closes the response
+        mid-generation.
+        """
+        stream: Optional[CompletionStream] = None
+        cancel_handle: Optional[int] = None
+        reservations: List[Reservation] = []
+        generated_tokens = 0
         try:
-            stream = self.client.chat.completions.create(
-                messages=messages,
-                model=model,
-                max_completion_tokens=max_tokens,
-                temperature=temperature,
-                top_p=top_p,
-                stream=True
-            )
+            start_time = time.perf_counter()
+            time_to_first_token: Optional[float] = None
+            finish_reason: Optional[str] = None
+            tokens_used = 0
+            prompt_tokens: Optional[int] = None
+            completion_tokens: Optional[int] = None
+            chunk_count = 0
+            
+            async def open_attempt() -> CompletionStream:
+                nonlocal start_time
+                # Retries are upstream requests too, charged like the first attempt
+                reservation = await llm_scheduler.acquire(model, messages, max_tokens)
+                reservations.append(reservation)
+                start_time = time.perf_counter()
+                try:
+                    return await self.backend.open_stream(
+                        messages=messages,
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        top_p=top_p
+                    )
+                except (APIStatusError, httpx.HTTPStatusError):
+                    # Rejected upstream before anything was generated
+                    reservation.actual_tokens = 0
+                    raise
+            
+            opening = resilient_caller.call(model, open_attempt)
+            if cancel_token is None:
+                stream = await opening
+            else:
+                stream = await cancel_token.run(opening)
+                # Closing the response also ends a read that is waiting on a stalled upstream
+                opened = stream
+                
+                def close_opened():
+                    asyncio.ensure_future(self._close_stream_quietly(opened))
+                
+                cancel_handle = cancel_token.add_callback(close_opened)
             
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
+            async for chunk in stream:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                tokens_used = chunk.total_tokens or tokens_used
+                prompt_tokens = chunk.prompt_tokens or prompt_tokens
+                completion_tokens = chunk.completion_tokens or completion_tokens
+                if chunk.finish_reason:
+                    finish_reason = chunk.finish_reason
+                
+                if chunk.content:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.perf_counter() - start_time
+                    chunk_count += 1
+                    if cancel_token is not None:
+                        generated_tokens += token_estimator.count_text(chunk.content)
                     yield {
-                        "content": chunk.choices[0].delta.content,
+                        "content": chunk.content,
                         "model": model,
                         "finish_reason": None
                     }
             
+            # The opened stream's reservation; earlier ones belong to failed attempts
+            reservations[-1].actual_tokens = tokens_used or None
+            token_estimator.record_usage(model, estimated_prompt_tokens, prompt_tokens)
+            
             # Send final chunk
             yield {
                 "content": "",
                 "model": model,
-                "finish_reason": "stop"
+                "finish_reason": finish_reason or "stop",
+                "tokens_used": tokens_used,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "estimated_prompt_tokens": estimated_prompt_tokens,
+                "chunks": chunk_count,
+                "time_to_first_token": time_to_first_token,
+                "total_time": time.perf_counter() - start_time,
+                "queue_wait": sum(reservation.queue_wait for reservation in reservations)
             }
             
+        except ExecutionCancelledError:
+            self._record_cancellation(cancel_token, max_tokens, generated_tokens)
+            raise
+        except CustomException:
+            raise
         except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                # The read failed because cancellation closed the response
+                self._record_cancellation(cancel_token, max_tokens, generated_tokens)
+                cancel_token.raise_if_cancelled()
+            # Failures while opening were already counted by resilient_caller
+            if stream is not None and is_retryable(e):
+                resilient_caller.get_breaker(model).record_failure()
             logger.error(f"Cerebras streaming error: {e}")
             raise CerebrasAPIError(f"Streaming generation failed: {str(e)}")
+        finally:
+            if cancel_handle is not None and cancel_token is not None:
+                cancel_token.remove_callback(cancel_handle)
+            # Release the pooled connection if the consumer stopped early
+            if stream is not None:
+                await stream.aclose()
+            for reservation in reservations:
+                await llm_scheduler.settle(reservation)
+    
+    async def _close_stream_quietly(self, stream: CompletionStream):
+        try:
+            await stream.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing cancelled stream: {e}")
+    
+    def _record_cancellation(
+        self,
+        cancel_token: Optional[CancellationToken],
+        max_tokens: int,
+        generated_tokens: int = 0
+    ):
+        """Credit a cancelled call with the completion tokens it no longer generates
+        
+        The expected completion length is the one the scheduler reserves up
+        front, capped by `max_tokens`.
+        """
+        if cancel_token is None:
+            return
+        expected_tokens = min(max_tokens, settings.LLM_COMPLETION_TOKEN_ESTIMATE)
+        tokens_saved = max(0, expected_tokens - generated_tokens)
+        cancel_token.record_tokens_saved(tokens_saved)
+        logger.info(f"LLM call cancelled ({cancel_token.reason}), about {tokens_saved} completion tokens saved")
     
     async def generate_agent_response(
         self,
         agent_prompt: str,
         context: Optional[Dict[str, Any]] = None,
         model: Optional[str] = None,
+        session_id: Optional[str] = None,
+        agent_id: Optional[int] = None,
         **kwargs
     ) -> Dict[str, Any]:
-        """Generate response for a specific agent"""
+        """Generate response for a specific agent
+        
+        With a `session_id` the agent's conversation memory for that session
+        supplies the history, so clients send only the new message, and the
+        exchange is remembered for the next call.
+        """
         try:
             # Build context-aware prompt
-            full_prompt = self._build_agent_prompt(agent_prompt, context)
+            full_prompt, serialized_context = self._build_agent_prompt(agent_prompt, context)
+            memory = await self._load_memory(agent_id, session_id)
             
             # Generate completion
             response = await self.generate_completion(
                 prompt=full_prompt,
                 model=model,
                 stream=False,
+                history=memory.to_messages() if memory else None,
                 **kwargs
             )
             
             response_dict = cast(Dict[str, Any], response)
+            if session_id is not None:
+                await conversation_memory.append(
+                    agent_id, session_id, full_prompt, response_dict["content"], response_dict["model"]
+                )
+            
             return {
                 "response": response_dict["content"],
                 "tokens_used": response_dict["tokens_used"],
                 "model": response_dict["model"],
-                "context": context
+                "context": context,
+                "cached": response_dict.get("cached", False),
+                "cached_tokens": response_dict.get("cached_tokens", 0),
+                "coalesced": response_dict.get("coalesced", False),
+                "prompt_tokens": response_dict.get("prompt_tokens"),
+                "completion_tokens": response_dict.get("completion_tokens"),
+                "queue_wait": response_dict.get("queue_wait"),
+                **self._context_report(serialized_context),
+                **self._memory_report(memory)
             }
             
+        except CustomException:
+            raise
         except Exception as e:
             logger.error(f"Agent response generation error: {e}")
             raise CerebrasAPIError(f"Agent response generation failed: {str(e)}")
     
-    def _build_agent_prompt(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> str:
-        """Build context-aware prompt for agent"""
+    async def stream_agent_response(
+        self,
+        agent_prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        session_id: Optional[str] = None,
+        agent_id: Optional[int] = None,
+        **kwargs
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream response chunks for a specific agent
+        
+        The final chunk also reports the context serialization savings. A
+        `session_id` works as in `generate_agent_response`; the exchange is
+        remembered once the stream completes.
+        """
+        full_prompt, serialized_context = self._build_agent_prompt(agent_prompt, context)
+        memory = await self._load_memory(agent_id, session_id)
+        
+        stream = await self.generate_completion(
+            prompt=full_prompt,
+            model=model,
+            stream=True,
+            history=memory.to_messages() if memory else None,
+            **kwargs
+        )
+        
+        parts = []
+        async for chunk in stream:
+            if chunk["finish_reason"] is not None:
+                if session_id is not None:
+                    await conversation_memory.append(agent_id, session_id, full_prompt, "".join(parts), chunk["model"])
+                chunk = {**chunk, **self._context_report(serialized_context), **self._memory_report(memory)}
+            else:
+                parts.append(chunk["content"])
+            yield chunk
+    
+    async def consume_stream(
+        self,
+        stream: AsyncGenerator[Dict[str, Any], None],
+        on_content: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Drain a completion stream, relaying content as it arrives
+        
+        Content is buffered and handed to `on_content` at most once per
+        STREAM_FLUSH_INTERVAL so that fast token streams do not turn into one
+        WebSocket frame per token.
+        """
+        parts = []
+        pending = []
+        last_flush = time.perf_counter()
+        final_chunk: Dict[str, Any] = {}
+        
+        async for chunk in stream:
+            if chunk["finish_reason"] is not None:
+                final_chunk = chunk
+                continue
+            
+            parts.append(chunk["content"])
+            if on_content is None:
+                continue
+            
+            pending.append(chunk["content"])
+            now = time.perf_counter()
+            if now - last_flush >= settings.STREAM_FLUSH_INTERVAL:
+                await on_content("".join(pending))
+                pending = []
+                last_flush = now
+        
+        if on_content is not None and pending:
+            await on_content("".join(pending))
+        
+        return {
+            "content": "".join(parts),
+            "model": final_chunk.get("model"),
+            "tokens_used": final_chunk.get("tokens_used", 0),
+            "prompt_tokens": final_chunk.get("prompt_tokens"),
+            "completion_tokens": final_chunk.get("completion_tokens"),
+            "finish_reason": final_chunk.get("finish_reason"),
+            "time_to_first_token": final_chunk.get("time_to_first_token"),
+            "queue_wait": final_chunk.get("queue_wait"),
+            "context_tokens_saved": final_chunk.get("context_tokens_saved", 0),
+            "coalesced": final_chunk.get("coalesced", False)
+        }
+    
+    async def generate_completions_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Run many completions with bounded concurrency, returning results in input order
+        
+        See `iter_completions_batch` for the request and result format.
+        """
+        results: List[Dict[str, Any]] = [{} for _ in requests]
+        async for index, result in self.iter_completions_batch(requests, concurrency):
+            results[index] = result
+        return results
+    
+    async def iter_completions_batch(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+        """Run many completions with bounded concurrency, yielding (index, result) as each finishes
+        
+        Each request holds the keyword arguments of `generate_agent_response`
+        (when it has an `agent_prompt`) or of `generate_completion`, plus an
+        optional `on_content` callback to stream the item and an optional
+        `slot`, an async context manager held while the item runs (such as a
+        concurrency limiter slot). At most `concurrency` items are in flight;
+        a new one starts as soon as any finishes. Every result is
+        `{"success", "result" or "error", "execution_time", "slot_wait"}`, so a
+        failed item never fails the batch; failures also carry `cancelled`.
+        """
+        window = max(1, concurrency or settings.LLM_BATCH_CONCURRENCY)
+        queued = iter(enumerate(requests))
+        running: Dict[asyncio.Task, int] = {}
+        
+        def start_next() -> bool:
+            item = next(queued, None)
+            if item is None:
+                return False
+            index, request = item
+            running[asyncio.create_task(self._run_batch_item(request))] = index
+            return True
+        
+        try:
+            while len(running) < window and start_next():
+                pass
+            
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    start_next()
+                    yield index, task.result()
+        finally:
+            # The consumer stopped early; do not leave orphaned upstream calls
+            for task in running:
+                task.cancel()
+    
+    async def _run_batch_item(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one batch item, capturing its error instead of raising"""
+        kwargs = dict(request)
+        on_content = kwargs.pop("on_content", None)
+        slot = kwargs.pop("slot", None) or nullcontext(0.0)
+        start_time = time.perf_counter()
+        slot_wait = 0.0
+        try:
+            async with slot as slot_wait:
+                result = await self._run_batch_request(kwargs, on_content)
+            
+            return {
+                "success": True,
+                "result": result,
+                "execution_time": time.perf_counter() - start_time,
+                "slot_wait": slot_wait
+            }
+        except Exception as e:
+            if isinstance(e, ExecutionCancelledError):
+                logger.info(f"Batch completion item cancelled: {e}")
+            else:
+                logger.error(f"Batch completion item failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "cancelled": isinstance(e, ExecutionCancelledError),
+                "execution_time": time.perf_counter() - start_time,
+                "slot_wait": slot_wait
+            }
+    
+    async def _run_batch_request(
+        self,
+        kwargs: Dict[str, Any],
+        on_content: Optional[Callable[[str], Awaitable[None]]]
+    ) -> Dict[str, Any]:
+        if "agent_prompt" in kwargs:
+            if on_content is None:
+                return await self.generate_agent_response(**kwargs)
+            streamed = await self.consume_stream(self.stream_agent_response(**kwargs), on_content=on_content)
+            return {
+                "response": streamed["content"],
+                "tokens_used": streamed["tokens_used"],
+                "model": streamed["model"],
+                "context": kwargs.get("context"),
+                "prompt_tokens": streamed["prompt_tokens"],
+                "completion_tokens": streamed["completion_tokens"],
+                "time_to_first_token": streamed["time_to_first_token"],
+                "queue_wait": streamed["queue_wait"],
+                "context_tokens_saved": streamed["context_tokens_saved"],
+                "coalesced": streamed["coalesced"]
+            }
+        if on_content is not None:
+            return await self.consume_stream(
+                await self.generate_completion(stream=True, **kwargs),
+                on_content=on_content
+            )
+        return await self.generate_completion(stream=False, **kwargs)
+    
+    def _build_agent_prompt(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Optional[SerializedContext]]:
+        """Build context-aware prompt for agent, serializing the context once"""
         if not context:
-            return prompt
+            return prompt, None
         
-        context_str = json.dumps(context, indent=2)
-        return f"""
-Context Information:
-{context_str}
-
-Task:
-{prompt}
-
-Please provide a response based on the context and task requirements.
-"""
+        serialized = context_serializer.serialize(context)
+        return prompt_registry.render("agent_context", context=serialized.text, prompt=prompt), serialized
+    
+    async def _load_memory(self, agent_id: Optional[int], session_id: Optional[str]) -> Optional[MemoryContext]:
+        if session_id is None:
+            return None
+        return await conversation_memory.get_context(agent_id, session_id)
+    
+    def _memory_report(self, memory: Optional[MemoryContext]) -> Dict[str, Any]:
+        """Summarise the conversation history used for a response"""
+        if memory is None:
+            return {}
+        return {
+            "history_tokens": memory.tokens,
+            "history_turns": len(memory.turns),
+            "history_summarized": memory.summary is not None
+        }
+    
+    def _context_report(self, serialized: Optional[SerializedContext]) -> Dict[str, Any]:
+        """Summarise context serialization for a response"""
+        if serialized is None:
+            return {"context_tokens_saved": 0, "truncated_context_fields": []}
+        return {
+            "context_tokens_saved": serialized.tokens_saved,
+            "truncated_context_fields": serialized.truncated_fields
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get runtime statistics for the LLM client path"""
+        return {
+            "cache": completion_cache.get_stats(),
+            "single_flight": single_flight.get_stats(),
+            "scheduler": llm_scheduler.get_stats(),
+            "resilience": resilient_caller.get_stats(),
+            "hedging": hedger.get_stats(),
+            "latency": llm_metrics.get_stats(),
+            "tokenizer": token_estimator.get_stats(),
+            "prompts": prompt_registry.get_stats(),
+            "context": context_serializer.get_stats(),
+            "model_catalog": model_catalog.get_stats(),
+            "cancellation": cancellation_registry.get_stats(),
+            "routing": model_router.get_stats(),
+            "conversation_memory": conversation_memory.get_stats(),
+            "task_concurrency": task_concurrency.get_stats(),
+            "backend": self.backend.name,
+            "backend_stats": self.backend.get_stats()
+        }
     
     async def get_available_models(self) -> list:
         """Get list of available Cerebras models"""
         try:
-            # This would typically call a models endpoint
-            # For now, return the known models
-            return [
-                "llama-4-maverick-17b-128e-instruct",
-                "llama-3-8b-instruct",
-                "llama-3-70b-instruct",
-                "llama-2-7b-chat",
-                "llama-2-13b-chat",
-                "llama-2-70b-chat"
-            ]
+            await self._refresh_model_catalog()
+            return [info.id for info in model_catalog.list_models()]
         except Exception as e:
             logger.error(f"Error getting available models: {e}")
             return []
@@ -232,11 +791,21 @@ Please provide a response based on the context and task requirements.
     async def validate_model(self, model: str) -> bool:
         """Validate if model is available"""
         try:
-            available_models = await self.get_available_models()
-            return model in available_models
+            await self._refresh_model_catalog()
+            return model_catalog.is_available(model)
         except Exception as e:
             logger.error(f"Error validating model: {e}")
             return False
+    
+    async def _refresh_model_catalog(self):
+        """Refresh the model catalog once its TTL expires"""
+        await model_catalog.refresh(
+            self._list_upstream_models if settings.MODEL_CATALOG_UPSTREAM else None
+        )
+    
+    async def _list_upstream_models(self) -> List[str]:
+        """List model ids from the backend's models endpoint"""
+        return await self.backend.list_models()
 
 
 # Global Cerebras service instance
@@ -0,0 +1,154 @@
+"""
+Two-tier cache for non-streaming LLM completions
+"""
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.core.config import settings
+from app.core.redis import cache
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    """In-process LRU cache backed by a shared Redis tier
+    
+    Lookups hit the local LRU first, then Redis; a Redis hit is promoted into
+    the local tier. Both tiers expire entries by TTL and the local tier evicts
+    the least recently used entry once `max_entries` is reached.
+    """
+    
+    KEY_PREFIX = "llm:completion:"
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        ttl: int = 300,
+        redis_ttl: int = 3600,
+        max_entry_bytes: int = 262144,
+        redis_enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.redis_enabled = redis_enabled
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "skipped_oversized": 0
+        }
+    
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        top_p: float,
+        max_tokens: int
+    ) -> str:
+        """Build a cache key from everything that determines the completion"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "top_p": top_p,
+                "max_tokens": max_tokens
+            },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a completion, checking the local tier before Redis"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._entries[key]
+        
+        if self.redis_enabled:
+            try:
+                value = await cache.get(self.KEY_PREFIX + key)
+            except Exception as e:
+                logger.warning(f"Completion cache Redis lookup failed: {e}")
+                value = None
+            
+            if value is not None:
+                self._store_local(key, value)
+                self.stats["redis_hits"] += 1
+                return value
+        
+        self.stats["misses"] += 1
+        return None
+    
+    async def set(self, key: str, value: Dict[str, Any]):
+        """Store a completion in both tiers"""
+        encoded = json.dumps(value)
+        if len(encoded) > self.max_entry_bytes:
+            self.stats["skipped_oversized"] += 1
+            return
+        
+        self._store_local(key, value)
+        self.stats["stores"] += 1
+        
+        if self.redis_enabled:
+            try:
+                await cache.set(self.KEY_PREFIX + key, value, expire=self.redis_ttl)
+            except Exception as e:
+                logger.warning(f"Completion cache Redis store failed: {e}")
+    
+    def _store_local(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    async def clear(self):
+        """Drop all cached completions from both tiers"""
+        self._entries.clear()
+        
+        if self.redis_enabled:
+            try:
+                for key in await cache.get_keys(self.KEY_PREFIX + "*"):
+                    await cache.delete(key)
+            except Exception as e:
+                logger.warning(f"Completion cache Redis clear failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        lookups = self.stats["memory_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hit_rate": (hits / lookups * 100) if lookups > 0 else 0
+        }
+
+
+# Global completion cache instance
+completion_cache = CompletionCache(
+    enabled=settings.COMPLETION_CACHE_ENABLED,
+    max_entries=settings.COMPLETION_CACHE_MAX_ENTRIES,
+    ttl=settings.COMPLETION_CACHE_TTL,
+    redis_ttl=settings.COMPLETION_CACHE_REDIS_TTL,
+    max_entry_bytes=settings.COMPLETION_CACHE_MAX_ENTRY_BYTES
+)
@@ -0,0 +1,141 @@
+"""
+Compact, size-capped serialization of task context for prompts
+"""
+
+import json
+import logging
+from typing import Dict, Any, List
+
+from app.core.config import settings
+from app.services.tokenizer import token_estimator
+
+logger = logging.getLogger(__name__)
+
+
+class SerializedContext:
+    """Context rendered for a prompt, with its cost and what the caps cut from it"""
+    
+    def __init__(self, text: str, tokens: int, tokens_saved: int, truncated_fields: List[str]):
+        self.text = text
+        self.tokens = tokens
+        self.tokens_saved = tokens_saved
+        self.truncated_fields = truncated_fields
+
+
+class ContextSerializer:
+    """Serializes prompt context once, as compact JSON within size caps
+    
+    Long strings keep their head and tail, long lists keep their first items,
+    and objects nested deeper than `max_depth` are summarised by their keys.
+    If the result still exceeds `max_chars`, the per-field cap is halved until
+    it fits. Every cut is marked in the text so the model knows data is
+    missing, and listed by path on the result. `tokens_saved` estimates only
+    the content the caps removed, so uncapped contexts cost nothing extra.
+    """
+    
+    def __init__(
+        self,
+        max_chars: int = 16000,
+        max_field_chars: int = 4000,
+        max_list_items: int = 50,
+        max_depth: int = 6
+    ):
+        self.max_chars = max_chars
+        self.max_field_chars = max_field_chars
+        self.max_list_items = max_list_items
+        self.max_depth = max_depth
+        self.stats = {
+            "serialized": 0,
+            "truncated": 0,
+            "tokens": 0,
+            "tokens_saved": 0
+        }
+    
+    def serialize(self, context: Dict[str, Any]) -> SerializedContext:
+        field_chars = self.max_field_chars
+        while True:
+            truncated: List[str] = []
+            omitted: List[str] = []
+            capped = self._cap(context, "", 0, field_chars, truncated, omitted)
+            text = self._dump(capped)
+            if len(text) <= self.max_chars or field_chars <= 64:
+                break
+            field_chars //= 2
+        
+        if len(text) > self.max_chars:
+            truncated.append("$")
+            omitted.append(text[self.max_chars:])
+            text = text[:self.max_chars] + f"...[truncated {len(text) - self.max_chars} chars]"
+        
+        tokens = token_estimator.count_text(text)
+        tokens_saved = sum(token_estimator.count_text(piece) for piece in omitted)
+        result = SerializedContext(text, tokens, tokens_saved, truncated)
+        
+        self.stats["serialized"] += 1
+        self.stats["tokens"] += tokens
+        self.stats["tokens_saved"] += result.tokens_saved
+        if truncated:
+            self.stats["truncated"] += 1
+            logger.debug(f"Truncated context fields: {', '.join(truncated)}")
+        return result
+    
+    def _cap(
+        self,
+        value: Any,
+        path: str,
+        depth: int,
+        field_chars: int,
+        truncated: List[str],
+        omitted: List[str]
+    ) -> Any:
+        if isinstance(value, str):
+            if len(value) <= field_chars:
+                return value
+            truncated.append(path or "$")
+            head = field_chars * 2 // 3
+            tail = field_chars - head
+            omitted.append(value[head:-tail])
+            return f"{value[:head]}...[{len(value) - field_chars} chars omitted]...{value[-tail:]}"
+        
+        if isinstance(value, dict):
+            if depth >= self.max_depth:
+                truncated.append(path or "$")
+                omitted.append(self._dump(value))
+                return f"{{object with keys: {', '.join(map(str, list(value)[:20]))}}}"
+            return {
+                key: self._cap(item, f"{path}.{key}" if path else str(key), depth + 1, field_chars, truncated, omitted)
+                for key, item in value.items()
+            }
+        
+        if isinstance(value, (list, tuple)):
+            if depth >= self.max_depth:
+                truncated.append(path or "$")
+                omitted.append(self._dump(value))
+                return f"[list of {len(value)} items]"
+            items = [
+                self._cap(item, f"{path}[{index}]", depth + 1, field_chars, truncated, omitted)
+                for index, item in enumerate(value[:self.max_list_items])
+            ]
+            if len(value) > self.max_list_items:
+                truncated.append(path or "$")
+                omitted.append(self._dump(value[self.max_list_items:]))
+                items.append(f"...[{len(value) - self.max_list_items} more items]")
+            return items
+        
+        return value
+    
+    @staticmethod
+    def _dump(value: Any) -> str:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+# Global context serializer instance
+context_serializer = ContextSerializer(
+    max_chars=settings.LLM_CONTEXT_MAX_CHARS,
+    max_field_chars=settings.LLM_CONTEXT_MAX_FIELD_CHARS,
+    max_list_items=settings.LLM_CONTEXT_MAX_LIST_ITEMS,
+    max_depth=settings.LLM_CONTEXT_MAX_DEPTH
+)
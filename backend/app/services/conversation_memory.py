@@ -0,0 +1,294 @@
+"""
+Bounded per-agent conversation memory with rolling summarization
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.redis import get_redis, eval_script
+from app.services.prompt_templates import prompt_registry
+from app.services.tokenizer import token_estimator
+
+logger = logging.getLogger(__name__)
+
+# Delete the summarization lock only if it still belongs to this worker
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class MemoryContext:
+    """The part of a conversation that goes into the next prompt"""
+    
+    def __init__(self, summary: Optional[str], turns: List[Dict[str, Any]], tokens: int, dropped_turns: int = 0):
+        self.summary = summary
+        self.turns = turns
+        self.tokens = tokens
+        self.dropped_turns = dropped_turns
+    
+    def to_messages(self) -> List[Dict[str, str]]:
+        """Chat messages to place between the system prompt and the new user message"""
+        messages = []
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": prompt_registry.render("conversation_summary", summary=self.summary)
+            })
+        messages.extend({"role": turn["role"], "content": turn["content"]} for turn in self.turns)
+        return messages
+
+
+class ConversationMemory:
+    """Conversation history per (agent, session), stored in Redis
+    
+    Each session keeps its recent turns verbatim plus a running summary of
+    everything older. The history put into a prompt is the summary plus as
+    many of the newest turns as fit `token_budget`, so prompt size stays
+    bounded however long the conversation runs. Once the stored turns
+    outgrow the budget, the oldest ones are folded into the summary by a
+    background LLM call and removed. Sessions expire after `ttl` seconds
+    without activity. When Redis is unavailable sessions are kept in
+    process, which is enough for a single worker.
+    """
+    
+    KEY_PREFIX = "memory:"
+    
+    def __init__(
+        self,
+        token_budget: int = 2048,
+        summary_max_tokens: int = 256,
+        ttl: int = 86400,
+        local_max_sessions: int = 1000
+    ):
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.ttl = ttl
+        self.local_max_sessions = local_max_sessions
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {
+            "turns_stored": 0,
+            "summarizations": 0,
+            "summarization_failures": 0,
+            "turns_summarized": 0,
+            "turns_dropped_from_prompts": 0
+        }
+    
+    def _key(self, agent_id: Optional[int], session_id: str) -> str:
+        return f"{self.KEY_PREFIX}{agent_id if agent_id is not None else 'default'}:{session_id}"
+    
+    async def get_context(self, agent_id: Optional[int], session_id: str) -> MemoryContext:
+        """Summary plus the newest turns that fit the token budget"""
+        key = self._key(agent_id, session_id)
+        summary, turns = await self._load(key)
+        
+        tokens = token_estimator.count_text(summary["text"]) if summary else 0
+        selected: List[Dict[str, Any]] = []
+        for turn in reversed(turns):
+            if tokens + turn["tokens"] > self.token_budget:
+                break
+            selected.append(turn)
+            tokens += turn["tokens"]
+        selected.reverse()
+        
+        dropped = len(turns) - len(selected)
+        self.stats["turns_dropped_from_prompts"] += dropped
+        return MemoryContext(summary["text"] if summary else None, selected, tokens, dropped)
+    
+    async def append(
+        self,
+        agent_id: Optional[int],
+        session_id: str,
+        user_content: str,
+        assistant_content: str,
+        model: Optional[str] = None
+    ):
+        """Store an exchange and summarize older turns in the background if they no longer fit"""
+        key = self._key(agent_id, session_id)
+        new_turns = [
+            {"role": "user", "content": user_content, "tokens": token_estimator.count_text(user_content)},
+            {"role": "assistant", "content": assistant_content, "tokens": token_estimator.count_text(assistant_content)}
+        ]
+        turns = await self._push(key, new_turns)
+        self.stats["turns_stored"] += len(new_turns)
+        
+        if sum(turn["tokens"] for turn in turns) > self.token_budget and key not in self._summarizing:
+            self._summarizing.add(key)
+            task = asyncio.create_task(self._summarize(key, model))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def get_session(self, agent_id: Optional[int], session_id: str) -> Dict[str, Any]:
+        """The stored summary and turns of a session"""
+        summary, turns = await self._load(self._key(agent_id, session_id))
+        return {
+            "session_id": session_id,
+            "summary": summary["text"] if summary else None,
+            "summarized_turns": summary["turns"] if summary else 0,
+            "turns": [{"role": turn["role"], "content": turn["content"]} for turn in turns],
+            "tokens": sum(turn["tokens"] for turn in turns)
+        }
+    
+    async def clear(self, agent_id: Optional[int], session_id: str) -> bool:
+        key = self._key(agent_id, session_id)
+        existed = self._local.pop(key, None) is not None
+        try:
+            redis = await get_redis()
+            existed = bool(await redis.delete(key + ":turns", key + ":summary")) or existed
+        except Exception as e:
+            logger.warning(f"Conversation memory Redis delete failed: {e}")
+        return existed
+    
+    async def _summarize(self, key: str, model: Optional[str]):
+        """Fold the oldest turns into the session summary, keeping about half the budget verbatim"""
+        lock_token = None
+        try:
+            lock_token = await self._acquire_lock(key)
+            if lock_token is None:
+                return
+            summary, turns = await self._load(key)
+            
+            keep_tokens = 0
+            keep = 0
+            for turn in reversed(turns):
+                if keep_tokens + turn["tokens"] > self.token_budget // 2:
+                    break
+                keep_tokens += turn["tokens"]
+                keep += 1
+            old_turns = turns[:len(turns) - keep]
+            if not old_turns:
+                return
+            
+            from app.services.cerebras_service import cerebras_service
+            
+            prompt = prompt_registry.render(
+                "conversation_summarize",
+                summary=summary["text"] if summary else "(none)",
+                messages="\n".join(f"{turn['role']}: {turn['content']}" for turn in old_turns)
+            )
+            response = await cerebras_service.generate_completion(
+                prompt,
+                model=model,
+                max_tokens=self.summary_max_tokens,
+                temperature=0.2,
+                use_cache=False,
+                task_type="summarization"
+            )
+            
+            await self._store_summary(key, {
+                "text": response["content"].strip(),
+                "turns": (summary["turns"] if summary else 0) + len(old_turns)
+            }, len(old_turns))
+            self.stats["summarizations"] += 1
+            self.stats["turns_summarized"] += len(old_turns)
+        except Exception as e:
+            self.stats["summarization_failures"] += 1
+            logger.warning(f"Conversation summarization failed for {key}: {e}")
+        finally:
+            self._summarizing.discard(key)
+            if lock_token is not None:
+                await self._release_lock(key, lock_token)
+    
+    async def _load(self, key: str) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            pipe.get(key + ":summary")
+            pipe.lrange(key + ":turns", 0, -1)
+            summary, turns = await pipe.execute()
+            return (json.loads(summary) if summary else None), [json.loads(turn) for turn in turns]
+        except Exception as e:
+            logger.warning(f"Conversation memory Redis read failed, using local store: {e}")
+        
+        session = self._local.get(key)
+        if session is None:
+            return None, []
+        return session["summary"], list(session["turns"])
+    
+    async def _push(self, key: str, turns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Append turns, returning all stored turns"""
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            pipe.rpush(key + ":turns", *[json.dumps(turn) for turn in turns])
+            pipe.expire(key + ":turns", self.ttl)
+            pipe.expire(key + ":summary", self.ttl)
+            pipe.lrange(key + ":turns", 0, -1)
+            results = await pipe.execute()
+            return [json.loads(turn) for turn in results[-1]]
+        except Exception as e:
+            logger.warning(f"Conversation memory Redis write failed, using local store: {e}")
+        
+        session = self._local_session(key)
+        session["turns"].extend(turns)
+        return list(session["turns"])
+    
+    async def _store_summary(self, key: str, summary: Dict[str, Any], summarized_turns: int):
+        """Save a new summary and drop the turns it covers; turns added meanwhile are kept"""
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            pipe.set(key + ":summary", json.dumps(summary), ex=self.ttl)
+            pipe.ltrim(key + ":turns", summarized_turns, -1)
+            await pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Conversation memory Redis write failed, using local store: {e}")
+        
+        session = self._local_session(key)
+        session["summary"] = summary
+        del session["turns"][:summarized_turns]
+    
+    def _local_session(self, key: str) -> Dict[str, Any]:
+        session = self._local.get(key)
+        if session is None:
+            session = self._local[key] = {"summary": None, "turns": []}
+            while len(self._local) > self.local_max_sessions:
+                self._local.popitem(last=False)
+        self._local.move_to_end(key)
+        return session
+    
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Keep workers sharing a session from summarizing (and trimming) it twice
+        
+        Returns the token that owns the lock, or None if another worker holds it.
+        """
+        lock_token = uuid.uuid4().hex
+        try:
+            redis = await get_redis()
+            acquired = await redis.set(key + ":lock", lock_token, nx=True, ex=120)
+            return lock_token if acquired else None
+        except Exception:
+            return lock_token
+    
+    async def _release_lock(self, key: str, lock_token: str):
+        """Release the lock unless it expired and another worker has taken it since"""
+        try:
+            redis = await get_redis()
+            await eval_script(redis, RELEASE_LOCK_SCRIPT, [key + ":lock"], lock_token)
+        except Exception:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "summarizing": len(self._summarizing),
+            "local_sessions": len(self._local)
+        }
+
+
+# Global conversation memory instance
+conversation_memory = ConversationMemory(
+    token_budget=settings.CONVERSATION_MEMORY_TOKEN_BUDGET,
+    summary_max_tokens=settings.CONVERSATION_SUMMARY_MAX_TOKENS,
+    ttl=settings.CONVERSATION_MEMORY_TTL
+)
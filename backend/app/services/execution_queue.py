@@ -0,0 +1,213 @@
+"""
+Durable Redis queue of workflow executions for worker processes
+"""
+
+import json
+import logging
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.core.redis import get_redis, eval_script
+
+logger = logging.getLogger(__name__)
+
+# Pop the oldest job and hold it until its visibility deadline, counting the delivery;
+# ids whose job was already acknowledged are dropped on the way
+RESERVE_SCRIPT = """
+while true do
+    local job_id = redis.call("rpop", KEYS[1])
+    if not job_id then
+        return nil
+    end
+    local job = redis.call("hget", KEYS[3], job_id)
+    if job then
+        local attempts = redis.call("hincrby", KEYS[4], job_id, 1)
+        redis.call("zadd", KEYS[2], ARGV[1], job_id)
+        return {job, attempts}
+    end
+end
+"""
+
+# Redeliver jobs whose deadline passed, dead-lettering those out of attempts
+REQUEUE_EXPIRED_SCRIPT = """
+local expired = redis.call("zrangebyscore", KEYS[1], "-inf", ARGV[1])
+local redelivered = 0
+local dead = {}
+for _, job_id in ipairs(expired) do
+    redis.call("zrem", KEYS[1], job_id)
+    local job = redis.call("hget", KEYS[3], job_id)
+    if job then
+        local attempts = tonumber(redis.call("hget", KEYS[4], job_id) or "0")
+        if attempts >= tonumber(ARGV[2]) then
+            redis.call("hdel", KEYS[3], job_id)
+            redis.call("hdel", KEYS[4], job_id)
+            redis.call("lpush", KEYS[5], job)
+            redis.call("ltrim", KEYS[5], 0, tonumber(ARGV[3]) - 1)
+            table.insert(dead, {job, attempts})
+        else
+            redis.call("rpush", KEYS[2], job_id)
+            redelivered = redelivered + 1
+        end
+    end
+end
+return {redelivered, dead}
+"""
+
+# Drop a finished job and its delivery count, unless it was queued again since this delivery.
+# Job ids are random hex, so finding the delivered id in the stored job identifies it.
+ACK_SCRIPT = """
+local job = redis.call("hget", KEYS[2], ARGV[1])
+if job and ARGV[2] ~= "" and not string.find(job, ARGV[2], 1, true) then
+    return 0
+end
+redis.call("zrem", KEYS[1], ARGV[1])
+redis.call("hdel", KEYS[2], ARGV[1])
+redis.call("hdel", KEYS[3], ARGV[1])
+return 1
+"""
+
+# Hand a held job back for immediate redelivery without counting the attempt
+RELEASE_SCRIPT = """
+if redis.call("zrem", KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if redis.call("hexists", KEYS[3], ARGV[1]) == 1 then
+    redis.call("hincrby", KEYS[4], ARGV[1], -1)
+    redis.call("rpush", KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+class ExecutionQueue:
+    """Executions waiting for, or held by, a worker
+    
+    Jobs are queued oldest first. A worker reserving a job holds it until a
+    visibility deadline, which it keeps extending while the execution runs,
+    and acknowledges it when the execution has finished. A job whose
+    deadline passes (its worker crashed or was killed) is delivered again;
+    after `max_attempts` deliveries it moves to the dead-letter list
+    instead. Delivery is at least once; a redelivered execution skips the
+    tasks its earlier deliveries completed. Queueing an execution again
+    while a worker still holds it (a resume racing the end of a pause)
+    supersedes that delivery, whose acknowledgement then leaves the new job
+    alone.
+    """
+    
+    KEY_PREFIX = "executions:"
+    
+    def __init__(self, visibility_timeout: float = 60.0, max_attempts: int = 3, dead_letter_max: int = 1000):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.dead_letter_max = dead_letter_max
+        self.queue_key = self.KEY_PREFIX + "queue"
+        self.processing_key = self.KEY_PREFIX + "processing"
+        self.jobs_key = self.KEY_PREFIX + "jobs"
+        self.attempts_key = self.KEY_PREFIX + "attempts"
+        self.dead_key = self.KEY_PREFIX + "dead"
+        self.stats = {"enqueued": 0, "reserved": 0, "acked": 0, "released": 0, "redelivered": 0, "dead_lettered": 0}
+    
+    async def enqueue(self, execution_id: int, timeout: Optional[float] = None):
+        """Queue an execution; `timeout` is its deadline in seconds once a worker starts it"""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "execution_id": execution_id,
+            "timeout": timeout,
+            "enqueued_at": round(time.time(), 3)
+        }
+        redis = await get_redis()
+        pipe = redis.pipeline()
+        pipe.hset(self.jobs_key, str(execution_id), json.dumps(job))
+        pipe.hset(self.attempts_key, str(execution_id), "0")
+        pipe.zrem(self.processing_key, str(execution_id))
+        pipe.lpush(self.queue_key, str(execution_id))
+        await pipe.execute()
+        self.stats["enqueued"] += 1
+    
+    async def reserve(self) -> Optional[Dict[str, Any]]:
+        """The next job, now held by the caller, or None if the queue is empty
+        
+        The job carries `attempts`, the number of times it has been delivered.
+        """
+        redis = await get_redis()
+        reserved = await eval_script(
+            redis, RESERVE_SCRIPT, [self.queue_key, self.processing_key, self.jobs_key, self.attempts_key],
+            time.time() + self.visibility_timeout
+        )
+        if reserved is None:
+            return None
+        self.stats["reserved"] += 1
+        return self._decode(reserved)
+    
+    def _decode(self, reserved: List[Any]) -> Dict[str, Any]:
+        job, attempts = reserved
+        return {**json.loads(job), "attempts": int(attempts)}
+    
+    async def extend(self, execution_ids: List[int]):
+        """Push back the visibility deadline of jobs still running"""
+        if not execution_ids:
+            return
+        redis = await get_redis()
+        deadline = time.time() + self.visibility_timeout
+        await redis.zadd(self.processing_key, {str(execution_id): deadline for execution_id in execution_ids}, xx=True)
+    
+    async def ack(self, execution_id: int, job_id: Optional[str] = None):
+        """Drop a job whose execution has finished
+        
+        With the delivered job's `job_id`, a job queued again in the meantime
+        is kept for its own delivery.
+        """
+        redis = await get_redis()
+        acked = await eval_script(
+            redis, ACK_SCRIPT, [self.processing_key, self.jobs_key, self.attempts_key], str(execution_id), job_id or ""
+        )
+        if acked:
+            self.stats["acked"] += 1
+        else:
+            logger.info(f"Execution {execution_id} was queued again while running; keeping the new job")
+    
+    async def release(self, execution_id: int):
+        """Return a held job for another worker to pick up right away"""
+        redis = await get_redis()
+        released = await eval_script(
+            redis, RELEASE_SCRIPT, [self.processing_key, self.queue_key, self.jobs_key, self.attempts_key],
+            str(execution_id)
+        )
+        if released:
+            self.stats["released"] += 1
+    
+    async def requeue_expired(self) -> List[Dict[str, Any]]:
+        """Redeliver jobs whose worker stopped extending them, returning the dead-lettered ones"""
+        redis = await get_redis()
+        redelivered, dead = await eval_script(
+            redis, REQUEUE_EXPIRED_SCRIPT,
+            [self.processing_key, self.queue_key, self.jobs_key, self.attempts_key, self.dead_key],
+            time.time(), self.max_attempts, self.dead_letter_max
+        )
+        if redelivered:
+            self.stats["redelivered"] += redelivered
+            logger.warning(f"Redelivering {redelivered} executions whose worker stopped responding")
+        self.stats["dead_lettered"] += len(dead)
+        return [self._decode(job) for job in dead]
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {**self.stats}
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            pipe.llen(self.queue_key)
+            pipe.zcard(self.processing_key)
+            pipe.llen(self.dead_key)
+            stats["queued"], stats["processing"], stats["dead"] = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not read execution queue stats: {e}")
+        return stats
+
+
+# Global execution queue instance
+execution_queue = ExecutionQueue(
+    visibility_timeout=settings.EXECUTION_QUEUE_VISIBILITY_TIMEOUT,
+    max_attempts=settings.EXECUTION_QUEUE_MAX_ATTEMPTS
+)
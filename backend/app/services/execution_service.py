@@ -3,15 +3,16 @@ Execution service for managing workflow and task executions
 """
 
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, cast
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func, desc
 from datetime import datetime, timedelta
 
 from app.models.workflow import WorkflowExecution
 from app.models.task import TaskExecution
-from app.schemas.execution import ExecutionResponse, ExecutionStats, ExecutionLog, ExecutionMetrics
+from app.schemas.execution import ExecutionResponse, ExecutionStats, ExecutionLog, ExecutionMetrics, TaskExecutionMetrics
 from app.core.exceptions import NotFoundError, ValidationError
+from app.services.cancellation import cancellation_registry
 
 logger = logging.getLogger(__name__)
 
@@ -224,6 +225,10 @@ class ExecutionService:
                     if task_execution.error_message:
                         details["error"] = task_execution.error_message
                     
+                    timing = (task_execution.execution_log or {}).get("timing")
+                    if timing:
+                        details["timing"] = timing
+                    
                     logs.append(ExecutionLog(
                         timestamp=task_execution.completed_at,
                         level=level,
@@ -275,6 +280,9 @@ class ExecutionService:
             execution.completed_at = func.now()
             self.db.commit()
             
+            # Abort in-flight LLM calls on whichever worker runs the execution
+            await cancellation_registry.cancel(execution_id)
+            
             logger.info(f"Cancelled execution: {execution_id}")
             return True
             
@@ -311,14 +319,20 @@ class ExecutionService:
             completed_tasks = len([te for te in task_executions if te.status == "completed"])
             failed_tasks = len([te for te in task_executions if te.status == "failed"])
             
-            total_tokens = sum([te.tokens_used for te in task_executions])
+            total_tokens = sum([te.tokens_used or 0 for te in task_executions])
             
             if execution.completed_at:
                 total_time = (execution.completed_at - execution.started_at).total_seconds()
             else:
                 total_time = 0
             
-            average_task_time = total_time / total_tasks if total_tasks > 0 else 0
+            tasks = [self._get_task_metrics(te) for te in task_executions]
+            task_times = [t.execution_time for t in tasks if t.execution_time is not None]
+            queue_waits = [t.queue_wait for t in tasks if t.queue_wait is not None]
+            first_token_times = [t.time_to_first_token for t in tasks if t.time_to_first_token is not None]
+            throughputs = [t.tokens_per_second for t in tasks if t.tokens_per_second is not None]
+            
+            average_task_time = sum(task_times) / len(task_times) if task_times else 0
             success_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
             
             return ExecutionMetrics(
@@ -329,9 +343,38 @@ class ExecutionService:
                 total_tokens=total_tokens,
                 total_time=total_time,
                 average_task_time=average_task_time,
-                success_rate=success_rate
+                success_rate=success_rate,
+                total_prompt_tokens=sum([t.prompt_tokens for t in tasks]),
+                total_completion_tokens=sum([t.completion_tokens for t in tasks]),
+                average_queue_wait=sum(queue_waits) / len(queue_waits) if queue_waits else 0,
+                average_time_to_first_token=sum(first_token_times) / len(first_token_times) if first_token_times else None,
+                average_tokens_per_second=sum(throughputs) / len(throughputs) if throughputs else None,
+                tasks=tasks
             )
             
         except Exception as e:
             logger.error(f"Error getting execution metrics {execution_id}: {e}")
-            raise ValidationError(f"Failed to retrieve execution metrics: {str(e)}")
\ No newline at end of file
+            raise ValidationError(f"Failed to retrieve execution metrics: {str(e)}")
+    
+    def _get_task_metrics(self, task_execution: TaskExecution) -> TaskExecutionMetrics:
+        """Per-task timing in seconds, falling back to row timestamps for tasks recorded without it"""
+        # Columns declared with `Column` read as Column objects to type checkers
+        row = cast(Any, task_execution)
+        execution_time = None
+        if row.execution_time is not None:
+            execution_time = row.execution_time / 1000
+        elif row.completed_at and row.started_at:
+            execution_time = (row.completed_at - row.started_at).total_seconds()
+        
+        return TaskExecutionMetrics(
+            task_execution_id=row.id,
+            task_id=row.task_id,
+            status=row.status,
+            execution_time=execution_time,
+            queue_wait=row.queue_wait / 1000 if row.queue_wait is not None else None,
+            time_to_first_token=row.time_to_first_token / 1000 if row.time_to_first_token is not None else None,
+            tokens_per_second=row.tokens_per_second,
+            prompt_tokens=row.prompt_tokens or 0,
+            completion_tokens=row.completion_tokens or 0,
+            tokens_used=row.tokens_used or 0
+        )
\ No newline at end of file
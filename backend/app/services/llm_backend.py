@@ -0,0 +1,308 @@
+"""
+LLM backend interface and the Cerebras implementation
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, cast
+
+import httpx
+from cerebras.cloud.sdk import AsyncCerebras
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionResult:
+    """A finished chat completion"""
+    
+    def __init__(
+        self,
+        content: str,
+        finish_reason: Optional[str],
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        total_tokens: Optional[int] = None
+    ):
+        self.content = content
+        self.finish_reason = finish_reason
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+
+
+class CompletionChunk:
+    """One streamed piece of a chat completion; usage is set on the last chunk"""
+    
+    def __init__(
+        self,
+        content: Optional[str],
+        finish_reason: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        total_tokens: Optional[int] = None
+    ):
+        self.content = content
+        self.finish_reason = finish_reason
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+
+
+class CompletionStream:
+    """An open completion stream; iterate for chunks and `aclose` to release it early"""
+    
+    def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        raise NotImplementedError
+    
+    async def aclose(self):
+        raise NotImplementedError
+
+
+class LLMBackend:
+    """Interface between CerebrasService and the model provider
+    
+    Backends raise the Cerebras SDK's API exceptions (or httpx's) so retries,
+    circuit breaking and Retry-After handling work the same for every backend.
+    """
+    
+    name = "base"
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionResult:
+        raise NotImplementedError
+    
+    async def open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionStream:
+        """Start a streaming completion, returning once the response has started"""
+        raise NotImplementedError
+    
+    async def list_models(self) -> List[str]:
+        raise NotImplementedError
+    
+    async def warm_up(self):
+        """Prepare connections before the first request; called at startup"""
+        pass
+    
+    async def close(self):
+        pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class _CerebrasStream(CompletionStream):
+    def __init__(self, stream: Any):
+        self._stream = stream
+    
+    async def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        async for chunk in self._stream:
+            usage = getattr(chunk, "usage", None)
+            choice = chunk.choices[0] if chunk.choices else None
+            yield CompletionChunk(
+                content=choice.delta.content if choice else None,
+                finish_reason=choice.finish_reason if choice else None,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                total_tokens=getattr(usage, "total_tokens", None)
+            )
+    
+    async def aclose(self):
+        # Release the pooled connection
+        await self._stream.response.aclose()
+
+
+class CerebrasBackend(LLMBackend):
+    """Cerebras Cloud API over a shared keep-alive connection pool
+    
+    The pool speaks HTTP/2 when the `h2` package is installed, so concurrent
+    calls multiplex over one connection instead of each holding their own.
+    `warm_up` opens connections (DNS, TCP and TLS) before the first real call
+    and starts a keepalive loop that pings the API whenever the pool has been
+    idle for `CEREBRAS_KEEPALIVE_PING_INTERVAL`, so idle connections are not
+    expired by the pool or dropped by the upstream load balancer.
+    """
+    
+    name = "cerebras"
+    
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        self.http2 = settings.CEREBRAS_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.CEREBRAS_HTTP2 and not self.http2:
+            logger.warning("CEREBRAS_HTTP2 is set but the h2 package is not installed; using HTTP/1.1")
+        self.http_client = self._create_http_client()
+        self.client = AsyncCerebras(
+            api_key=api_key or settings.CEREBRAS_API_KEY,
+            base_url=base_url or settings.CEREBRAS_BASE_URL,
+            http_client=self.http_client,
+            # Retries are handled by resilient_caller, per model and with a circuit breaker
+            max_retries=0
+        )
+        self._last_used = 0.0
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self.stats = {
+            "warmed_connections": 0,
+            "warm_up_time": None,
+            "keepalive_pings": 0,
+            "keepalive_failures": 0
+        }
+    
+    def _create_http_client(self) -> httpx.AsyncClient:
+        """Create the shared keep-alive connection pool used for all Cerebras calls"""
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.CEREBRAS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CEREBRAS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.CEREBRAS_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.CEREBRAS_TIMEOUT,
+                connect=settings.CEREBRAS_CONNECT_TIMEOUT
+            )
+        )
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionResult:
+        self._last_used = time.monotonic()
+        response = await self.client.chat.completions.create(
+            messages=cast(Any, messages),
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stream=False
+        )
+        usage = cast(Any, response).usage
+        choice = cast(Any, response).choices[0]
+        return CompletionResult(
+            content=choice.message.content,
+            finish_reason=choice.finish_reason,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            total_tokens=getattr(usage, "total_tokens", 0)
+        )
+    
+    async def open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionStream:
+        self._last_used = time.monotonic()
+        stream = await self.client.chat.completions.create(
+            messages=cast(Any, messages),
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p,
+            stream=True
+        )
+        return _CerebrasStream(stream)
+    
+    async def list_models(self) -> List[str]:
+        response = await self.client.get("/v1/models", cast_to=cast(Any, object))
+        return [entry["id"] for entry in response.get("data", [])]
+    
+    async def warm_up(self):
+        """Open pooled connections and start the keepalive loop"""
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*[self._ping() for _ in range(self._pooled_connections())])
+        self.stats["warmed_connections"] = sum(results)
+        self.stats["warm_up_time"] = time.perf_counter() - start_time
+        self._last_used = time.monotonic()
+        logger.info(
+            f"Pre-warmed {self.stats['warmed_connections']} Cerebras connection(s) "
+            f"over {'HTTP/2' if self.http2 else 'HTTP/1.1'} in {self.stats['warm_up_time']:.2f}s"
+        )
+        
+        if settings.CEREBRAS_KEEPALIVE_PING_INTERVAL > 0 and self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive())
+    
+    def _pooled_connections(self) -> int:
+        """Connections worth keeping open; one multiplexed HTTP/2 connection carries many calls"""
+        if self.http2:
+            return 1
+        return max(0, min(settings.CEREBRAS_PREWARM_CONNECTIONS, settings.CEREBRAS_MAX_KEEPALIVE_CONNECTIONS))
+    
+    async def _ping(self) -> bool:
+        """Make a cheap authenticated request, which opens or refreshes a pooled connection"""
+        try:
+            await self.client.get("/v1/models", cast_to=cast(Any, object))
+            return True
+        except Exception as e:
+            logger.debug(f"Cerebras connection ping failed: {e}")
+            return False
+    
+    async def _keepalive(self):
+        interval = settings.CEREBRAS_KEEPALIVE_PING_INTERVAL
+        while True:
+            idle = time.monotonic() - self._last_used
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+            self._last_used = time.monotonic()
+            results = await asyncio.gather(*[self._ping() for _ in range(self._pooled_connections())])
+            self.stats["keepalive_pings"] += len(results)
+            self.stats["keepalive_failures"] += len(results) - sum(results)
+    
+    async def close(self):
+        """Stop the keepalive loop and close the underlying HTTP connection pool"""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+        await self.client.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "http2": self.http2
+        }
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """Create the configured LLM backend, wrapped for cassette recording or replay if enabled"""
+    if settings.LLM_CASSETTE_MODE == "replay":
+        from app.services.llm_cassette import Cassette, ReplayBackend
+        return ReplayBackend(Cassette.load(settings.LLM_CASSETTE_PATH), speed=settings.LLM_CASSETTE_REPLAY_SPEED)
+    
+    name = name or settings.LLM_BACKEND
+    backend: LLMBackend
+    if name == "cerebras":
+        backend = CerebrasBackend()
+    elif name == "simulated":
+        from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+        backend = SimulatedBackend(SimulationProfile(**settings.LLM_SIMULATOR_PROFILE))
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+    
+    if settings.LLM_CASSETTE_MODE == "record":
+        from app.services.llm_cassette import Cassette, RecordingBackend
+        return RecordingBackend(backend, Cassette(settings.LLM_CASSETTE_PATH))
+    return backend
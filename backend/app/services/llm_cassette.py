@@ -0,0 +1,365 @@
+"""
+Record/replay cassettes of LLM traffic
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, List, Literal, Optional, AsyncIterator, IO
+
+import httpx
+from cerebras.cloud.sdk import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+
+from app.core.exceptions import CassetteMissError
+from app.services.llm_backend import LLMBackend, CompletionResult, CompletionChunk, CompletionStream
+from app.services.llm_resilience import get_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(messages: List[Dict[str, Any]], model: str, max_tokens: int, temperature: float, top_p: float) -> str:
+    """Identify a request by everything that shapes its completion"""
+    payload = json.dumps([model, messages, max_tokens, temperature, top_p], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded LLM interactions, one JSON object per line (gzipped for a `.gz` path)
+    
+    Each interaction holds the request key and model, the time until the
+    response (or stream) started, then either the completion, the streamed
+    chunks as `[seconds since the stream opened, content]` pairs plus usage,
+    or the upstream error. Identical requests recorded more than once are
+    replayed in recording order, cycling when exhausted.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._file: Optional[IO[str]] = None
+    
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with cassette._open("rt") as cassette_file:
+            for line in cassette_file:
+                if line.strip():
+                    cassette._add(json.loads(line))
+        logger.info(f"Loaded {len(cassette)} recorded LLM interactions from {path}")
+        return cassette
+    
+    def _open(self, mode: Literal["rt", "at"]) -> IO[str]:
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+    
+    def _add(self, interaction: Dict[str, Any]):
+        self._interactions.setdefault(interaction["key"], []).append(interaction)
+    
+    def record(self, interaction: Dict[str, Any]):
+        """Append an interaction to the cassette file"""
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = self._open("at")
+        self._file.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self._add(interaction)
+    
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        """The next recorded interaction for a request, or None if it was never recorded"""
+        interactions = self._interactions.get(key)
+        if not interactions:
+            return None
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = cursor + 1
+        return interactions[cursor % len(interactions)]
+    
+    def models(self) -> List[str]:
+        return sorted({
+            interaction["model"]
+            for interactions in self._interactions.values()
+            for interaction in interactions
+        })
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def __len__(self) -> int:
+        return sum(len(interactions) for interactions in self._interactions.values())
+
+
+def _describe_error(error: BaseException) -> Optional[Dict[str, Any]]:
+    """Serialize an upstream error so replay can raise an equivalent one"""
+    if isinstance(error, APIStatusError):
+        return {"status_code": error.status_code, "retry_after": get_retry_after(error), "message": str(error)}
+    if isinstance(error, (APIConnectionError, httpx.TransportError)):
+        return {"status_code": None, "message": str(error)}
+    return None
+
+
+def _replayed_error(error: Dict[str, Any]) -> Exception:
+    request = httpx.Request("POST", "http://replay/v1/chat/completions")
+    status_code = error.get("status_code")
+    if status_code is None:
+        return APIConnectionError(message=error.get("message") or "Connection error", request=request)
+    
+    retry_after = error.get("retry_after")
+    headers = {"retry-after": f"{retry_after:.3f}"} if retry_after is not None else {}
+    response = httpx.Response(status_code, headers=headers, request=request)
+    message = error.get("message") or f"Replayed upstream error {status_code}"
+    if status_code == 429:
+        return RateLimitError(message, response=response, body=None)
+    if status_code >= 500:
+        return InternalServerError(message, response=response, body=None)
+    return APIStatusError(message, response=response, body=None)
+
+
+class _RecordingStream(CompletionStream):
+    def __init__(self, stream: CompletionStream, interaction: Dict[str, Any], cassette: Cassette):
+        self._stream = stream
+        self._interaction = interaction
+        self._cassette = cassette
+        self._iterator: Optional[Any] = None
+    
+    def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        self._iterator = self._record()
+        return self._iterator
+    
+    async def _record(self) -> AsyncIterator[CompletionChunk]:
+        opened_at = time.perf_counter()
+        chunks = []
+        async for chunk in self._stream:
+            if chunk.content:
+                chunks.append([round(time.perf_counter() - opened_at, 4), chunk.content])
+            if chunk.finish_reason is not None:
+                # Streams abandoned before their final chunk are not recorded
+                self._cassette.record({
+                    **self._interaction,
+                    "chunks": chunks,
+                    "finish_reason": chunk.finish_reason,
+                    "prompt_tokens": chunk.prompt_tokens,
+                    "completion_tokens": chunk.completion_tokens,
+                    "total_tokens": chunk.total_tokens,
+                    "duration": round(time.perf_counter() - opened_at, 4)
+                })
+            yield chunk
+    
+    async def aclose(self):
+        if self._iterator is not None:
+            await self._iterator.aclose()
+        await self._stream.aclose()
+
+
+class RecordingBackend(LLMBackend):
+    """Passes calls through to another backend and records them to a cassette"""
+    
+    def __init__(self, backend: LLMBackend, cassette: Cassette):
+        self.backend = backend
+        self.cassette = cassette
+        self.name = f"{backend.name}+record"
+        self.stats = {"recorded": 0, "recorded_errors": 0}
+    
+    def _start_interaction(self, key: str, model: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "key": key,
+            "model": model,
+            "stream": stream,
+            "recorded_at": round(time.time(), 3)
+        }
+    
+    def _record_error(self, interaction: Dict[str, Any], error: BaseException, started_at: float):
+        described = _describe_error(error)
+        if described is None:
+            return
+        self.cassette.record({**interaction, "latency": round(time.perf_counter() - started_at, 4), "error": described})
+        self.stats["recorded_errors"] += 1
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionResult:
+        key = request_key(messages, model, max_tokens, temperature, top_p)
+        interaction = self._start_interaction(key, model, stream=False)
+        started_at = time.perf_counter()
+        try:
+            result = await self.backend.complete(messages, model, max_tokens, temperature, top_p)
+        except Exception as e:
+            self._record_error(interaction, e, started_at)
+            raise
+        
+        self.cassette.record({
+            **interaction,
+            "latency": round(time.perf_counter() - started_at, 4),
+            "content": result.content,
+            "finish_reason": result.finish_reason,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "total_tokens": result.total_tokens
+        })
+        self.stats["recorded"] += 1
+        return result
+    
+    async def open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionStream:
+        key = request_key(messages, model, max_tokens, temperature, top_p)
+        interaction = self._start_interaction(key, model, stream=True)
+        started_at = time.perf_counter()
+        try:
+            stream = await self.backend.open_stream(messages, model, max_tokens, temperature, top_p)
+        except Exception as e:
+            self._record_error(interaction, e, started_at)
+            raise
+        
+        self.stats["recorded"] += 1
+        interaction["latency"] = round(time.perf_counter() - started_at, 4)
+        return _RecordingStream(stream, interaction, self.cassette)
+    
+    async def list_models(self) -> List[str]:
+        return await self.backend.list_models()
+    
+    async def warm_up(self):
+        await self.backend.warm_up()
+    
+    async def close(self):
+        self.cassette.close()
+        await self.backend.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.backend.get_stats(),
+            "cassette": {**self.stats, "path": self.cassette.path}
+        }
+
+
+class _ReplayStream(CompletionStream):
+    def __init__(self, interaction: Dict[str, Any], speed: float):
+        self._interaction = interaction
+        self._speed = speed
+        self._iterator: Optional[Any] = None
+    
+    def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        self._iterator = self._replay()
+        return self._iterator
+    
+    async def _replay(self) -> AsyncIterator[CompletionChunk]:
+        interaction = self._interaction
+        opened_at = time.perf_counter()
+        for offset, content in interaction.get("chunks", []):
+            if self._speed > 0:
+                delay = offset / self._speed - (time.perf_counter() - opened_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield CompletionChunk(content=content)
+        
+        yield CompletionChunk(
+            content=None,
+            finish_reason=interaction.get("finish_reason") or "stop",
+            prompt_tokens=interaction.get("prompt_tokens"),
+            completion_tokens=interaction.get("completion_tokens"),
+            total_tokens=interaction.get("total_tokens")
+        )
+    
+    async def aclose(self):
+        if self._iterator is not None:
+            await self._iterator.aclose()
+
+
+class ReplayBackend(LLMBackend):
+    """Serves completions from a cassette instead of calling upstream
+    
+    Latency and chunk timing are reproduced divided by `speed`, so 1.0 is
+    the original timing, 10.0 ten times faster and 0 no delay at all.
+    Recorded upstream errors are raised again; requests that were never
+    recorded fail with CassetteMissError.
+    """
+    
+    name = "replay"
+    
+    def __init__(self, cassette: Cassette, speed: float = 1.0):
+        self.cassette = cassette
+        self.speed = speed
+        self.stats = {"replayed": 0, "replayed_errors": 0, "misses": 0}
+    
+    async def _next(self, key: str, model: str) -> Dict[str, Any]:
+        interaction = self.cassette.next(key)
+        if interaction is None:
+            self.stats["misses"] += 1
+            raise CassetteMissError(model)
+        
+        if self.speed > 0:
+            await asyncio.sleep(interaction.get("latency", 0) / self.speed)
+        if "error" in interaction:
+            self.stats["replayed_errors"] += 1
+            raise _replayed_error(interaction["error"])
+        self.stats["replayed"] += 1
+        return interaction
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionResult:
+        interaction = await self._next(request_key(messages, model, max_tokens, temperature, top_p), model)
+        if "chunks" in interaction:
+            # Recorded as a stream: rebuild the completion and wait out the generation time
+            if self.speed > 0:
+                await asyncio.sleep(interaction.get("duration", 0) / self.speed)
+            content = "".join(content for _, content in interaction["chunks"])
+        else:
+            content = interaction.get("content") or ""
+        return CompletionResult(
+            content=content,
+            finish_reason=interaction.get("finish_reason"),
+            prompt_tokens=interaction.get("prompt_tokens"),
+            completion_tokens=interaction.get("completion_tokens"),
+            total_tokens=interaction.get("total_tokens")
+        )
+    
+    async def open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionStream:
+        interaction = await self._next(request_key(messages, model, max_tokens, temperature, top_p), model)
+        if "chunks" not in interaction:
+            # Recorded without streaming: stream the whole completion as one chunk
+            interaction = {**interaction, "chunks": [[0.0, interaction.get("content") or ""]]}
+        return _ReplayStream(interaction, self.speed)
+    
+    async def list_models(self) -> List[str]:
+        return self.cassette.models()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "cassette": {
+                **self.stats,
+                "path": self.cassette.path,
+                "interactions": len(self.cassette),
+                "speed": self.speed
+            }
+        }
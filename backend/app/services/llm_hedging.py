@@ -0,0 +1,148 @@
+"""
+Hedged upstream requests to cut LLM tail latency
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Awaitable, Callable, TypeVar
+
+from app.core.config import settings
+from app.services.llm_metrics import LatencyTracker, llm_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Hedger:
+    """Sends a duplicate request when the first one is slower than usual
+    
+    If a call has not finished after the model's observed latency percentile,
+    a second identical call is started; whichever succeeds first wins and the
+    other is cancelled. Hedges draw from a budget that refills by `max_ratio`
+    per request, so at most that fraction of requests is ever duplicated. A
+    caller can also make each hedge claim upstream rate-limit budget first;
+    the hedge is skipped when none is available right away. Callers record
+    latency samples into `metrics` themselves, timing only the upstream call
+    so that waits for budget and retry backoff do not raise the threshold.
+    """
+    
+    BUDGET_CAPACITY = 10.0
+    
+    def __init__(
+        self,
+        metrics: LatencyTracker,
+        enabled: bool = False,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_ratio: float = 0.05
+    ):
+        self.metrics = metrics
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._budget = self.BUDGET_CAPACITY
+        self.stats = {
+            "requests": 0,
+            "hedges_sent": 0,
+            "hedge_wins": 0,
+            "budget_exhausted": 0,
+            "rate_limited": 0,
+            "estimated_latency_saved": 0.0
+        }
+    
+    def get_threshold(self, model: str) -> Optional[float]:
+        """Get the delay after which a request for `model` is hedged"""
+        if self.metrics.sample_count(model) < self.min_samples:
+            return None
+        return max(self.min_delay, self.metrics.percentile(model, self.percentile) or 0)
+    
+    async def run(
+        self,
+        model: str,
+        send: Callable[[], Awaitable[T]],
+        prepare_hedge: Optional[Callable[[], Awaitable[Optional[Callable[[], Awaitable[T]]]]]] = None
+    ) -> T:
+        """Run `send`, hedging it with a duplicate call if it is slow
+        
+        `prepare_hedge`, if given, returns the duplicate call to send once
+        the hedge is due, or None to skip it (e.g. no rate-limit budget).
+        """
+        self.stats["requests"] += 1
+        self._budget = min(self.BUDGET_CAPACITY, self._budget + self.max_ratio)
+        
+        threshold = self.get_threshold(model) if self.enabled else None
+        primary = asyncio.ensure_future(send())
+        hedge: Optional[asyncio.Future] = None
+        start = time.perf_counter()
+        try:
+            if threshold is None:
+                return await primary
+            
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done:
+                return primary.result()
+            
+            if self._budget < 1:
+                self.stats["budget_exhausted"] += 1
+                return await primary
+            
+            hedge_send = send if prepare_hedge is None else await prepare_hedge()
+            if hedge_send is None:
+                self.stats["rate_limited"] += 1
+                return await primary
+            
+            self._budget -= 1
+            self.stats["hedges_sent"] += 1
+            hedge = asyncio.ensure_future(hedge_send())
+            
+            # The first successful attempt wins; a failed one waits on the other
+            pending = {primary, hedge}
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+            if winner is None:
+                # Report the primary's error when both attempts fail
+                return primary.result()
+            
+            if winner is hedge:
+                self.stats["hedge_wins"] += 1
+                # The primary was still running; compare against the usual tail
+                elapsed = time.perf_counter() - start
+                tail = self.metrics.percentile(model, 0.99) or elapsed
+                self.stats["estimated_latency_saved"] += max(0.0, tail - elapsed)
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark the loser's error as retrieved
+                    task.exception()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hedge_rate": self.stats["hedges_sent"] / requests if requests > 0 else 0,
+            "thresholds": {model: self.get_threshold(model) for model in self.metrics.get_stats()}
+        }
+
+
+# Global hedger instance
+hedger = Hedger(
+    llm_metrics,
+    enabled=settings.LLM_HEDGING_ENABLED,
+    percentile=settings.LLM_HEDGE_PERCENTILE,
+    min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    min_delay=settings.LLM_HEDGE_MIN_DELAY,
+    max_ratio=settings.LLM_HEDGE_MAX_RATIO
+)
@@ -0,0 +1,73 @@
+"""
+Rolling per-model latency and error metrics for upstream LLM calls
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Deque
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelWindow:
+    """Most recent latency samples and outcomes for one model"""
+    
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+
+
+class LatencyTracker:
+    """Keeps a rolling window of upstream call latencies and errors per model"""
+    
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._models: Dict[str, _ModelWindow] = {}
+    
+    def _get(self, model: str) -> _ModelWindow:
+        if model not in self._models:
+            self._models[model] = _ModelWindow(self.window)
+        return self._models[model]
+    
+    def record(self, model: str, latency: Optional[float], success: bool = True):
+        """Record one upstream call; failed calls only count towards the error rate"""
+        data = self._get(model)
+        data.outcomes.append(success)
+        if success and latency is not None:
+            data.latencies.append(latency)
+    
+    def sample_count(self, model: str) -> int:
+        data = self._models.get(model)
+        return len(data.latencies) if data else 0
+    
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """Get the q-th latency quantile (0-1) for a model, or None without samples"""
+        data = self._models.get(model)
+        if not data or not data.latencies:
+            return None
+        latencies = sorted(data.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    
+    def error_rate(self, model: str) -> float:
+        data = self._models.get(model)
+        if not data or not data.outcomes:
+            return 0.0
+        return 1 - sum(data.outcomes) / len(data.outcomes)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            model: {
+                "samples": len(data.latencies),
+                "p50": self.percentile(model, 0.5),
+                "p95": self.percentile(model, 0.95),
+                "p99": self.percentile(model, 0.99),
+                "error_rate": self.error_rate(model)
+            }
+            for model, data in self._models.items()
+        }
+
+
+# Global latency tracker instance
+llm_metrics = LatencyTracker(window=settings.LLM_METRICS_WINDOW)
@@ -0,0 +1,224 @@
+"""
+Retry, backoff and circuit breaking for upstream LLM calls
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Any, Optional, Awaitable, Callable, TypeVar
+
+import httpx
+from cerebras.cloud.sdk import APIConnectionError, APIStatusError
+
+from app.core.config import settings
+from app.core.exceptions import CustomException, CircuitBreakerOpenError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Classify an upstream error as transient (retryable) or fatal
+    
+    Only errors from the upstream client are classified by status. The app's
+    own exceptions (cancellation, scheduler timeouts, an open circuit breaker)
+    carry HTTP status codes for API responses but never come from upstream,
+    so they are always fatal.
+    """
+    if isinstance(error, CustomException):
+        return False
+    if isinstance(error, (APIConnectionError, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    
+    if isinstance(error, APIStatusError):
+        status_code = error.status_code
+    elif isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+    else:
+        return False
+    return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Read a Retry-After hint (in seconds) from an upstream error response"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (0-based), honouring Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Per-model circuit breaker
+    
+    After `failure_threshold` consecutive transient failures the breaker opens
+    and calls fail fast for `recovery_timeout` seconds. It then lets a single
+    probe through (half-open); success closes it, failure opens it again.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, model: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected_calls = 0
+    
+    def is_accepting_calls(self) -> bool:
+        """Whether `before_call` would currently let a call through"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.recovery_timeout
+        return not (self.state == self.HALF_OPEN and self.probe_in_flight)
+    
+    def before_call(self):
+        """Raise CircuitBreakerOpenError if the call should not be attempted"""
+        if self.state == self.OPEN:
+            remaining = self.recovery_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.rejected_calls += 1
+                raise CircuitBreakerOpenError(self.model, retry_after=int(remaining) + 1)
+            self.state = self.HALF_OPEN
+        
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected_calls += 1
+                raise CircuitBreakerOpenError(self.model, retry_after=1)
+            self.probe_in_flight = True
+    
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker opened for model {self.model}")
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+    
+    def release(self):
+        """Forget an in-flight probe whose outcome says nothing about upstream health"""
+        self.probe_in_flight = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls
+        }
+
+
+class ResilientCaller:
+    """Runs upstream calls with retries and a circuit breaker per model"""
+    
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0
+    ):
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.stats = {
+            "retries": 0,
+            "retryable_errors": 0,
+            "fatal_errors": 0,
+            "exhausted": 0
+        }
+    
+    def get_breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.recovery_timeout)
+        return self._breakers[model]
+    
+    async def call(self, model: str, send: Callable[[], Awaitable[T]]) -> T:
+        """Call `send`, retrying transient failures with backoff"""
+        breaker = self.get_breaker(model)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                result = await send()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.stats["fatal_errors"] += 1
+                    breaker.release()
+                    raise
+                
+                self.stats["retryable_errors"] += 1
+                breaker.record_failure()
+                if attempt + 1 >= self.policy.max_attempts:
+                    self.stats["exhausted"] += 1
+                    raise
+                
+                delay = self.policy.compute_delay(attempt, get_retry_after(e))
+                logger.warning(
+                    f"Transient error from {model} (attempt {attempt + 1}/{self.policy.max_attempts}), "
+                    f"retrying in {delay:.2f}s: {e}"
+                )
+                self.stats["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            
+            breaker.record_success()
+            return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "circuit_breakers": {model: breaker.get_stats() for model, breaker in self._breakers.items()}
+        }
+
+
+# Global resilient caller instance
+resilient_caller = ResilientCaller(
+    RetryPolicy(
+        max_attempts=settings.LLM_MAX_RETRIES + 1,
+        base_delay=settings.LLM_RETRY_BASE_DELAY,
+        max_delay=settings.LLM_RETRY_MAX_DELAY
+    ),
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    recovery_timeout=settings.LLM_CIRCUIT_RECOVERY_TIMEOUT
+)
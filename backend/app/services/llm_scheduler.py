@@ -0,0 +1,384 @@
+"""
+Quota-aware scheduler for upstream LLM requests
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator, Deque, List, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import SchedulerTimeoutError
+from app.core.redis import get_redis, eval_script
+from app.services.tokenizer import token_estimator
+from app.services.model_catalog import model_catalog
+
+logger = logging.getLogger(__name__)
+
+# Refill both buckets, then take one request and `cost` tokens if both allow it.
+# Returns 0 when admitted, otherwise the milliseconds until the request fits.
+ACQUIRE_SCRIPT = """
+local now_parts = redis.call("TIME")
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local function refill(key, capacity, rate)
+    local data = redis.call("HMGET", key, "level", "ts")
+    local level = tonumber(data[1])
+    local ts = tonumber(data[2])
+    if level == nil then
+        return capacity
+    end
+    return math.min(capacity, level + (now - ts) * rate)
+end
+
+local request_capacity = tonumber(ARGV[1])
+local request_rate = tonumber(ARGV[2])
+local token_capacity = tonumber(ARGV[3])
+local token_rate = tonumber(ARGV[4])
+local cost = tonumber(ARGV[5])
+
+local requests = refill(KEYS[1], request_capacity, request_rate)
+local tokens = refill(KEYS[2], token_capacity, token_rate)
+
+local wait = 0
+if requests < 1 then
+    wait = math.max(wait, (1 - requests) / request_rate)
+end
+if tokens < cost then
+    wait = math.max(wait, (cost - tokens) / token_rate)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+
+redis.call("HSET", KEYS[1], "level", tostring(requests), "ts", now)
+redis.call("HSET", KEYS[2], "level", tostring(tokens), "ts", now)
+redis.call("PEXPIRE", KEYS[1], 120000)
+redis.call("PEXPIRE", KEYS[2], 120000)
+return math.ceil(wait)
+"""
+
+# Return (or charge) the difference between reserved and actual token usage
+SETTLE_SCRIPT = """
+local level = tonumber(redis.call("HGET", KEYS[1], "level"))
+if level == nil then
+    return 0
+end
+level = math.min(tonumber(ARGV[1]), level + tonumber(ARGV[2]))
+redis.call("HSET", KEYS[1], "level", tostring(level))
+return 1
+"""
+
+
+class _LocalBucket:
+    """In-process token bucket used when Redis is unavailable"""
+    
+    def __init__(self, capacity: float, rate_per_ms: float):
+        self.capacity = capacity
+        self.rate = rate_per_ms
+        self.level = capacity
+        self.updated = time.monotonic() * 1000
+    
+    def refill(self):
+        now = time.monotonic() * 1000
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_for(self, cost: float) -> float:
+        self.refill()
+        return 0 if self.level >= cost else (cost - self.level) / self.rate
+
+
+class Reservation:
+    """Budget reserved for one upstream request"""
+    
+    def __init__(self, model: str, estimated_tokens: int, queue_wait: float):
+        self.model = model
+        self.estimated_tokens = estimated_tokens
+        self.queue_wait = queue_wait
+        self.actual_tokens: Optional[int] = None
+
+
+class LLMScheduler:
+    """Admits upstream LLM requests against shared per-model rate budgets
+    
+    Every model has a requests-per-minute and a tokens-per-minute token bucket
+    kept in Redis, so all workers and replicas draw from one budget. A request
+    that does not fit waits in a per-model FIFO queue until the buckets refill,
+    rather than being sent and rejected upstream. Token cost is estimated before
+    sending and corrected with the actual usage afterwards. Every upstream
+    request takes its own reservation, retries and hedges included.
+    
+    When Redis cannot be reached the scheduler falls back to in-process
+    buckets and skips Redis for `redis_backoff` seconds, so calls do not each
+    wait out a connection attempt while it is down.
+    """
+    
+    KEY_PREFIX = "llm:bucket:"
+    QUEUE_PREFIX = "llm:queue:"
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        requests_per_minute: int = 300,
+        tokens_per_minute: int = 1000000,
+        model_limits: Optional[Dict[str, Dict[str, int]]] = None,
+        max_wait: float = 300.0,
+        completion_estimate: int = 1024,
+        redis_backoff: float = 5.0
+    ):
+        self.enabled = enabled
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.model_limits = model_limits or {}
+        self.max_wait = max_wait
+        self.completion_estimate = completion_estimate
+        self.redis_backoff = redis_backoff
+        self._redis_retry_at = 0.0
+        self._queues: Dict[str, asyncio.Lock] = {}
+        self._queue_depth: Dict[str, int] = {}
+        self._local_buckets: Dict[str, Tuple[_LocalBucket, _LocalBucket]] = {}
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "timeouts": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "estimated_tokens": 0,
+            "actual_tokens": 0,
+            "not_granted": 0,
+            "redis_failures": 0
+        }
+    
+    def get_limits(self, model: str) -> Tuple[int, int]:
+        """Get (requests_per_minute, tokens_per_minute) for a model
+        
+        Configured overrides take precedence over limits from the model catalog.
+        """
+        info = model_catalog.get(model)
+        limits = {**(info.rate_limits if info else {}), **self.model_limits.get(model, {})}
+        return (
+            limits.get("requests_per_minute", self.requests_per_minute),
+            limits.get("tokens_per_minute", self.tokens_per_minute)
+        )
+    
+    def estimate_tokens(self, messages: List[Dict[str, Any]], max_tokens: int, model: Optional[str] = None) -> int:
+        """Estimate the prompt plus completion tokens a request will consume"""
+        prompt_tokens = token_estimator.count_messages(messages, model)
+        return prompt_tokens + min(max_tokens, self.completion_estimate)
+    
+    def _request_cost(self, model: str, messages: List[Dict[str, Any]], max_tokens: int) -> int:
+        _, tokens_per_minute = self.get_limits(model)
+        # A single request can never need more than a full bucket
+        return min(self.estimate_tokens(messages, max_tokens, model), tokens_per_minute)
+    
+    async def acquire(self, model: str, messages: List[Dict[str, Any]], max_tokens: int) -> Reservation:
+        """Wait for budget for one upstream request"""
+        estimated_tokens = self._request_cost(model, messages, max_tokens)
+        if not self.enabled:
+            return Reservation(model, estimated_tokens, 0.0)
+        return Reservation(model, estimated_tokens, await self._acquire(model, estimated_tokens))
+    
+    async def try_acquire(self, model: str, messages: List[Dict[str, Any]], max_tokens: int) -> Optional[Reservation]:
+        """Take budget for one upstream request only if it is available right now
+        
+        Returns None instead of queueing, for optional requests such as hedges
+        that are better not sent than sent late or over budget.
+        """
+        estimated_tokens = self._request_cost(model, messages, max_tokens)
+        if not self.enabled:
+            return Reservation(model, estimated_tokens, 0.0)
+        
+        queue = self._queues.get(model)
+        requests_per_minute, tokens_per_minute = self.get_limits(model)
+        # Requests already queued for the model come first
+        if (queue is not None and queue.locked()) or await self._try_take(
+            model, estimated_tokens, requests_per_minute, tokens_per_minute
+        ) > 0:
+            self.stats["not_granted"] += 1
+            return None
+        
+        self.stats["admitted"] += 1
+        self.stats["estimated_tokens"] += estimated_tokens
+        return Reservation(model, estimated_tokens, 0.0)
+    
+    async def settle(self, reservation: Reservation):
+        """Correct the token bucket once a request's actual usage is known"""
+        if self.enabled and reservation.actual_tokens is not None:
+            await self._settle(reservation.model, reservation.estimated_tokens, reservation.actual_tokens)
+    
+    @asynccontextmanager
+    async def reserve(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        granted: Optional[Reservation] = None
+    ) -> AsyncIterator[Reservation]:
+        """Wait for budget, then hold a reservation for the duration of a request
+        
+        A `granted` reservation (from `try_acquire`) is held instead of waiting
+        for a new one. Set `actual_tokens` on the yielded reservation once usage
+        is known so the token bucket can be corrected.
+        """
+        reservation = granted or await self.acquire(model, messages, max_tokens)
+        try:
+            yield reservation
+        finally:
+            await self.settle(reservation)
+    
+    async def _acquire(self, model: str, cost: int) -> float:
+        requests_per_minute, tokens_per_minute = self.get_limits(model)
+        
+        queue = self._queues.setdefault(model, asyncio.Lock())
+        start = time.perf_counter()
+        throttled = queue.locked()
+        self._queue_depth[model] = self._queue_depth.get(model, 0) + 1
+        await self._update_shared_depth(model, 1)
+        try:
+            # Requests for the same model are admitted in arrival order
+            async with queue:
+                while True:
+                    wait_ms = await self._try_take(model, cost, requests_per_minute, tokens_per_minute)
+                    if wait_ms <= 0:
+                        break
+                    
+                    if time.perf_counter() - start + wait_ms / 1000 > self.max_wait:
+                        self.stats["timeouts"] += 1
+                        raise SchedulerTimeoutError(
+                            f"LLM budget for {model} exhausted; queue wait exceeded {self.max_wait:.0f}s",
+                            retry_after=int(wait_ms / 1000) + 1
+                        )
+                    
+                    throttled = True
+                    await asyncio.sleep(wait_ms / 1000)
+        finally:
+            self._queue_depth[model] -= 1
+            await self._update_shared_depth(model, -1)
+        
+        waited = time.perf_counter() - start
+        self.stats["admitted"] += 1
+        self.stats["estimated_tokens"] += cost
+        if throttled:
+            self.stats["queued"] += 1
+        self.stats["total_wait"] += waited
+        self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+        self._recent_waits.append(waited)
+        return waited
+    
+    async def _try_take(self, model: str, cost: int, requests_per_minute: int, tokens_per_minute: int) -> float:
+        """Take budget from the shared buckets; return milliseconds to wait if short"""
+        request_rate = requests_per_minute / 60000
+        token_rate = tokens_per_minute / 60000
+        if self._redis_available():
+            try:
+                redis = await get_redis()
+                return float(await eval_script(
+                    redis,
+                    ACQUIRE_SCRIPT,
+                    [f"{self.KEY_PREFIX}{model}:requests", f"{self.KEY_PREFIX}{model}:tokens"],
+                    requests_per_minute,
+                    request_rate,
+                    tokens_per_minute,
+                    token_rate,
+                    cost
+                ))
+            except Exception as e:
+                self._redis_failed(f"falling back to local budget for {model}", e)
+        
+        if model not in self._local_buckets:
+            self._local_buckets[model] = (
+                _LocalBucket(requests_per_minute, request_rate),
+                _LocalBucket(tokens_per_minute, token_rate)
+            )
+        requests, tokens = self._local_buckets[model]
+        wait_ms = max(requests.wait_for(1), tokens.wait_for(cost))
+        if wait_ms == 0:
+            requests.level -= 1
+            tokens.level -= cost
+        return wait_ms
+    
+    async def _settle(self, model: str, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket with the actual usage of a finished request"""
+        self.stats["actual_tokens"] += actual_tokens
+        _, tokens_per_minute = self.get_limits(model)
+        delta = estimated_tokens - actual_tokens
+        if delta == 0:
+            return
+        
+        if self._redis_available():
+            try:
+                redis = await get_redis()
+                await eval_script(redis, SETTLE_SCRIPT, [f"{self.KEY_PREFIX}{model}:tokens"], tokens_per_minute, delta)
+                return
+            except Exception as e:
+                self._redis_failed(f"could not settle usage for {model}", e)
+        
+        if model in self._local_buckets:
+            tokens = self._local_buckets[model][1]
+            tokens.level = min(tokens.capacity, tokens.level + delta)
+    
+    async def _update_shared_depth(self, model: str, delta: int):
+        if not self._redis_available():
+            return
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.incrby(f"{self.QUEUE_PREFIX}{model}", delta)
+                # Let counters from crashed workers age out
+                pipe.expire(f"{self.QUEUE_PREFIX}{model}", 600)
+                await pipe.execute()
+        except Exception as e:
+            self._redis_failed("could not update shared queue depth", e)
+    
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_retry_at
+    
+    def _redis_failed(self, action: str, error: Exception):
+        """Use local buckets only for the next `redis_backoff` seconds"""
+        self.stats["redis_failures"] += 1
+        if self._redis_available():
+            logger.warning(f"LLM scheduler {action}; skipping Redis for {self.redis_backoff:.0f}s: {error}")
+        self._redis_retry_at = time.monotonic() + self.redis_backoff
+    
+    async def get_queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Get local and cluster-wide queue depth per model"""
+        depths = {}
+        try:
+            redis = await get_redis()
+            for key in await redis.keys(f"{self.QUEUE_PREFIX}*"):
+                depths[key[len(self.QUEUE_PREFIX):]] = {"cluster": int(await redis.get(key) or 0)}
+        except Exception as e:
+            logger.warning(f"Could not read shared LLM queue depth: {e}")
+        
+        for model, depth in self._queue_depth.items():
+            depths.setdefault(model, {})["local"] = depth
+        return depths
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission counters, queue depth and wait times"""
+        waits = sorted(self._recent_waits)
+        admitted = self.stats["admitted"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "queue_depth": dict(self._queue_depth),
+            "average_wait": self.stats["total_wait"] / admitted if admitted > 0 else 0,
+            "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0
+        }
+
+
+# Global scheduler instance
+llm_scheduler = LLMScheduler(
+    enabled=settings.LLM_SCHEDULER_ENABLED,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    model_limits=settings.LLM_MODEL_RATE_LIMITS,
+    max_wait=settings.LLM_SCHEDULER_MAX_WAIT,
+    completion_estimate=settings.LLM_COMPLETION_TOKEN_ESTIMATE,
+    redis_backoff=settings.LLM_SCHEDULER_REDIS_BACKOFF
+)
@@ -0,0 +1,236 @@
+"""
+Local LLM backend that simulates upstream latency, streaming and failures
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+
+import httpx
+from cerebras.cloud.sdk import APIStatusError, InternalServerError, RateLimitError
+
+from app.services.llm_backend import LLMBackend, CompletionResult, CompletionChunk, CompletionStream
+from app.services.model_catalog import model_catalog
+from app.services.tokenizer import token_estimator
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the model returns a simulated answer for this request with stable wording so "
+    "repeated prompts always produce identical output and latency experiments stay "
+    "reproducible across runs while token counts follow the configured profile"
+).split()
+
+
+class SimulationProfile:
+    """How the simulated upstream behaves
+    
+    Time to first token is drawn from `latency_distribution` ("fixed",
+    "uniform", "normal" or "lognormal") around `latency` with spread `jitter`;
+    a `tail_probability` share of requests is slowed by `tail_multiplier`.
+    Tokens then arrive every `token_interval` seconds. `error_rate` fails
+    requests with a 500, and every `rate_limit_burst_interval` seconds the
+    backend answers 429 with a Retry-After for `rate_limit_burst_duration`.
+    """
+    
+    def __init__(
+        self,
+        latency: float = 0.3,
+        jitter: float = 0.0,
+        latency_distribution: str = "fixed",
+        tail_probability: float = 0.0,
+        tail_multiplier: float = 5.0,
+        token_interval: float = 0.005,
+        completion_tokens: int = 64,
+        error_rate: float = 0.0,
+        rate_limit_burst_interval: float = 0.0,
+        rate_limit_burst_duration: float = 0.0,
+        seed: int = 0
+    ):
+        if latency_distribution not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_distribution = latency_distribution
+        self.tail_probability = tail_probability
+        self.tail_multiplier = tail_multiplier
+        self.token_interval = token_interval
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_burst_interval = rate_limit_burst_interval
+        self.rate_limit_burst_duration = rate_limit_burst_duration
+        self.seed = seed
+
+
+class SimulatedUpstream:
+    """Decides content, timing and failures for simulated requests
+    
+    Content depends only on the request, so identical prompts get identical
+    answers. Latencies and failures come from a generator seeded with
+    `profile.seed`, so a run with the same request order repeats exactly.
+    Shared by SimulatedBackend and the benchmark stub server.
+    """
+    
+    def __init__(self, profile: SimulationProfile):
+        self.profile = profile
+        self._rng = random.Random(profile.seed)
+        self._started_at = time.monotonic()
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "rate_limited": 0
+        }
+    
+    def sample_latency(self) -> float:
+        """Draw a time to first token in seconds"""
+        profile = self.profile
+        if profile.latency_distribution == "uniform":
+            latency = self._rng.uniform(profile.latency - profile.jitter, profile.latency + profile.jitter)
+        elif profile.latency_distribution == "normal":
+            latency = self._rng.gauss(profile.latency, profile.jitter)
+        elif profile.latency_distribution == "lognormal":
+            # `latency` is the median and `jitter` the sigma of the underlying normal
+            latency = profile.latency * math.exp(self._rng.gauss(0.0, profile.jitter))
+        else:
+            latency = profile.latency
+        
+        if profile.tail_probability and self._rng.random() < profile.tail_probability:
+            latency *= profile.tail_multiplier
+        return max(0.0, latency)
+    
+    def check_failure(self) -> Optional[Tuple[int, Optional[float]]]:
+        """Return (status code, retry-after seconds) if this request should fail"""
+        self.stats["requests"] += 1
+        profile = self.profile
+        if profile.rate_limit_burst_interval > 0 and profile.rate_limit_burst_duration > 0:
+            position = (time.monotonic() - self._started_at) % profile.rate_limit_burst_interval
+            # The burst sits at the end of each interval so a run starts healthy
+            remaining = profile.rate_limit_burst_interval - position
+            if remaining <= profile.rate_limit_burst_duration:
+                self.stats["rate_limited"] += 1
+                return 429, remaining
+        
+        if profile.error_rate and self._rng.random() < profile.error_rate:
+            self.stats["errors"] += 1
+            return 500, None
+        return None
+    
+    def generate(self, messages: List[Dict[str, Any]], model: str, max_tokens: int) -> Tuple[List[str], int, str]:
+        """Return the completion pieces, prompt tokens and finish reason for a request"""
+        digest = hashlib.sha256(
+            json.dumps([model, messages], sort_keys=True, default=str).encode()
+        ).digest()
+        rng = random.Random(digest)
+        count = max(1, min(self.profile.completion_tokens, max_tokens))
+        pieces = [rng.choice(_WORDS) + " " for _ in range(count)]
+        finish_reason = "length" if count >= max_tokens else "stop"
+        return pieces, token_estimator.count_messages(messages), finish_reason
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+def _status_error(status_code: int, retry_after: Optional[float]) -> APIStatusError:
+    """Build the SDK error the real client raises for a failed response"""
+    headers = {"retry-after": f"{retry_after:.3f}"} if retry_after is not None else {}
+    response = httpx.Response(
+        status_code,
+        headers=headers,
+        request=httpx.Request("POST", "http://simulated/v1/chat/completions")
+    )
+    if status_code == 429:
+        return RateLimitError("Simulated rate limit", response=response, body=None)
+    return InternalServerError("Simulated upstream error", response=response, body=None)
+
+
+class _SimulatedStream(CompletionStream):
+    def __init__(self, pieces: List[str], prompt_tokens: int, finish_reason: str, token_interval: float):
+        self._pieces = pieces
+        self._prompt_tokens = prompt_tokens
+        self._finish_reason = finish_reason
+        self._token_interval = token_interval
+        self._iterator: Optional[Any] = None
+    
+    def __aiter__(self) -> AsyncIterator[CompletionChunk]:
+        self._iterator = self._generate()
+        return self._iterator
+    
+    async def _generate(self) -> AsyncIterator[CompletionChunk]:
+        for index, piece in enumerate(self._pieces):
+            if index and self._token_interval:
+                await asyncio.sleep(self._token_interval)
+            yield CompletionChunk(content=piece)
+        
+        completion_tokens = len(self._pieces)
+        yield CompletionChunk(
+            content=None,
+            finish_reason=self._finish_reason,
+            prompt_tokens=self._prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=self._prompt_tokens + completion_tokens
+        )
+    
+    async def aclose(self):
+        if self._iterator is not None:
+            await self._iterator.aclose()
+
+
+class SimulatedBackend(LLMBackend):
+    """In-process stand-in for the upstream API, for tests and benchmarks"""
+    
+    name = "simulated"
+    
+    def __init__(self, profile: Optional[SimulationProfile] = None):
+        self.upstream = SimulatedUpstream(profile or SimulationProfile())
+    
+    async def _start(self, messages: List[Dict[str, Any]], model: str, max_tokens: int) -> Tuple[List[str], int, str]:
+        failure = self.upstream.check_failure()
+        if failure is not None:
+            status_code, retry_after = failure
+            # Failed requests still cost a round trip
+            await asyncio.sleep(min(self.upstream.profile.latency, 0.05))
+            raise _status_error(status_code, retry_after)
+        
+        await asyncio.sleep(self.upstream.sample_latency())
+        return self.upstream.generate(messages, model, max_tokens)
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionResult:
+        pieces, prompt_tokens, finish_reason = await self._start(messages, model, max_tokens)
+        if len(pieces) > 1:
+            await asyncio.sleep(self.upstream.profile.token_interval * (len(pieces) - 1))
+        return CompletionResult(
+            content="".join(pieces),
+            finish_reason=finish_reason,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(pieces),
+            total_tokens=prompt_tokens + len(pieces)
+        )
+    
+    async def open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        top_p: float
+    ) -> CompletionStream:
+        pieces, prompt_tokens, finish_reason = await self._start(messages, model, max_tokens)
+        return _SimulatedStream(pieces, prompt_tokens, finish_reason, self.upstream.profile.token_interval)
+    
+    async def list_models(self) -> List[str]:
+        return [info.id for info in model_catalog.list_models()]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return self.upstream.get_stats()
@@ -0,0 +1,157 @@
+"""
+Model catalog with per-model metadata
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional, Awaitable, Callable
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "model_catalog.json")
+
+
+class ModelInfo:
+    """Metadata for one model"""
+    
+    def __init__(
+        self,
+        id: str,
+        context_window: Optional[int] = None,
+        relative_cost: float = 1.0,
+        typical_latency_ms: Optional[int] = None,
+        capabilities: Optional[List[str]] = None,
+        rate_limits: Optional[Dict[str, int]] = None
+    ):
+        self.id = id
+        self.context_window = context_window or settings.LLM_DEFAULT_CONTEXT_WINDOW
+        self.relative_cost = relative_cost
+        self.typical_latency_ms = typical_latency_ms
+        self.capabilities = capabilities or []
+        self.rate_limits = rate_limits or {}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ModelInfo":
+        return cls(
+            id=data["id"],
+            context_window=data.get("context_window"),
+            relative_cost=data.get("relative_cost", 1.0),
+            typical_latency_ms=data.get("typical_latency_ms"),
+            capabilities=data.get("capabilities"),
+            rate_limits=data.get("rate_limits")
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "context_window": self.context_window,
+            "relative_cost": self.relative_cost,
+            "typical_latency_ms": self.typical_latency_ms,
+            "capabilities": self.capabilities,
+            "rate_limits": self.rate_limits
+        }
+
+
+class ModelCatalog:
+    """Available models and their metadata, keyed by model id
+    
+    The catalog file is loaded at import so lookups never wait on I/O. With
+    `refresh`, the catalog is re-read at most once per `ttl` seconds from a
+    copy shared through Redis; when that has expired it is rebuilt from the
+    file, optionally merged with the upstream model listing, and shared again.
+    """
+    
+    REDIS_KEY = "llm:model_catalog"
+    
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, ttl: int = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._loaded_at: Optional[float] = None
+        self._models: Dict[str, ModelInfo] = self._load_file()
+        self.source = "file" if self._models else "empty"
+    
+    def _load_file(self) -> Dict[str, ModelInfo]:
+        try:
+            with open(self.path) as catalog_file:
+                data = json.load(catalog_file)
+            return {entry["id"]: ModelInfo.from_dict(entry) for entry in data.get("models", [])}
+        except Exception as e:
+            logger.error(f"Could not load model catalog from {self.path}: {e}")
+            return {}
+    
+    def get(self, model: str) -> Optional[ModelInfo]:
+        return self._models.get(model)
+    
+    def is_available(self, model: str) -> bool:
+        return model in self._models
+    
+    def list_models(self) -> List[ModelInfo]:
+        return list(self._models.values())
+    
+    def get_context_window(self, model: str) -> int:
+        info = self._models.get(model)
+        return info.context_window if info else settings.LLM_DEFAULT_CONTEXT_WINDOW
+    
+    async def refresh(
+        self,
+        fetch_upstream: Optional[Callable[[], Awaitable[List[str]]]] = None,
+        force: bool = False
+    ):
+        """Refresh the catalog if its TTL has expired"""
+        if not force and self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        self._loaded_at = time.monotonic()
+        
+        try:
+            redis = await get_redis()
+            if not force:
+                shared = await redis.get(self.REDIS_KEY)
+                if shared:
+                    self._models = {entry["id"]: ModelInfo.from_dict(entry) for entry in json.loads(shared)}
+                    self.source = "redis"
+                    return
+        except Exception as e:
+            redis = None
+            logger.warning(f"Could not read shared model catalog: {e}")
+        
+        models = self._load_file() or self._models
+        source = "file"
+        if fetch_upstream is not None:
+            try:
+                for model_id in await fetch_upstream():
+                    if model_id not in models:
+                        models[model_id] = ModelInfo(model_id)
+                source = "upstream"
+            except Exception as e:
+                logger.warning(f"Could not list upstream models: {e}")
+        
+        self._models = models
+        self.source = source
+        if redis is not None:
+            try:
+                await redis.set(
+                    self.REDIS_KEY,
+                    json.dumps([info.to_dict() for info in models.values()]),
+                    ex=self.ttl
+                )
+            except Exception as e:
+                logger.warning(f"Could not share model catalog: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "models": len(self._models),
+            "source": self.source,
+            "age": time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        }
+
+
+# Global model catalog instance
+model_catalog = ModelCatalog(
+    path=settings.MODEL_CATALOG_PATH or DEFAULT_CATALOG_PATH,
+    ttl=settings.MODEL_CATALOG_TTL
+)
@@ -0,0 +1,194 @@
+"""
+Latency- and cost-aware routing of LLM calls across catalog models
+"""
+
+import json
+import logging
+import os
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.services.llm_metrics import LatencyTracker, llm_metrics
+from app.services.llm_resilience import ResilientCaller, resilient_caller
+from app.services.model_catalog import ModelCatalog, model_catalog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "routing_policy.json")
+
+
+class RoutingDecision:
+    """The model chosen for a call and why"""
+    
+    def __init__(self, model: str, requested_model: str, reason: str):
+        self.model = model
+        self.requested_model = requested_model
+        self.reason = reason
+    
+    @property
+    def routed(self) -> bool:
+        return self.model != self.requested_model
+
+
+class ModelRouter:
+    """Picks the model for a call from a routing policy and observed model health
+    
+    The policy's rules are tried in order; the first whose conditions match
+    the call (task type, prompt size, completion budget) names a tier of
+    models. Within the tier, models whose context window is too small or
+    whose circuit breaker is open are skipped, and the rest are ranked by
+    relative cost plus latency (observed p50 once there are enough samples,
+    otherwise the catalog's typical latency), scaled up by the recent error
+    rate since failed attempts are paid for again. Calls no rule matches,
+    pinned models and agents that set `routing: "pinned"` in their config
+    keep the requested model. An agent can also force a tier with
+    `routing_tier`.
+    """
+    
+    def __init__(
+        self,
+        catalog: ModelCatalog,
+        metrics: LatencyTracker,
+        caller: ResilientCaller,
+        policy_path: str = DEFAULT_POLICY_PATH,
+        enabled: bool = False
+    ):
+        self.catalog = catalog
+        self.metrics = metrics
+        self.caller = caller
+        self.policy_path = policy_path
+        self.enabled = enabled
+        self.policy: Dict[str, Any] = self._load_policy()
+        self.stats: Dict[str, Any] = {
+            "decisions": 0,
+            "routed": 0,
+            "pinned": 0,
+            "no_candidate": 0,
+            "estimated_cost_saved": 0.0,
+            "estimated_latency_saved": 0.0,
+            "routes": {}
+        }
+    
+    def _load_policy(self) -> Dict[str, Any]:
+        try:
+            with open(self.policy_path) as policy_file:
+                return json.load(policy_file)
+        except Exception as e:
+            logger.error(f"Could not load routing policy from {self.policy_path}: {e}")
+            return {"tiers": {}, "rules": []}
+    
+    def reload_policy(self):
+        self.policy = self._load_policy()
+    
+    def route(
+        self,
+        requested_model: str,
+        prompt_tokens: int,
+        max_tokens: int,
+        task_type: Optional[str] = None,
+        hints: Optional[Dict[str, Any]] = None
+    ) -> RoutingDecision:
+        """Choose the model for a call that asked for `requested_model`"""
+        hints = hints or {}
+        if not self.enabled:
+            return RoutingDecision(requested_model, requested_model, "routing disabled")
+        
+        self.stats["decisions"] += 1
+        if hints.get("routing") == "pinned" or requested_model in self.policy.get("pinned_models", []):
+            self.stats["pinned"] += 1
+            return RoutingDecision(requested_model, requested_model, "pinned")
+        
+        tier = hints.get("routing_tier")
+        reason = f"agent tier {tier}"
+        if tier is None:
+            rule = self._match_rule(prompt_tokens, max_tokens, task_type)
+            if rule is None:
+                return RoutingDecision(requested_model, requested_model, "no matching rule")
+            tier = rule["tier"]
+            reason = f"rule {rule.get('name', tier)}"
+        
+        # A completion this large is unlikely; budget for the scheduler's usual estimate
+        needed_tokens = prompt_tokens + min(max_tokens, settings.LLM_COMPLETION_TOKEN_ESTIMATE)
+        candidates = self._candidates(tier, needed_tokens)
+        if not candidates:
+            self.stats["no_candidate"] += 1
+            return RoutingDecision(requested_model, requested_model, f"no healthy model in tier {tier}")
+        
+        model = min(candidates, key=self._score)
+        decision = RoutingDecision(model, requested_model, reason)
+        if decision.routed:
+            self._record_route(decision, needed_tokens)
+        return decision
+    
+    def _match_rule(self, prompt_tokens: int, max_tokens: int, task_type: Optional[str]) -> Optional[Dict[str, Any]]:
+        for rule in self.policy.get("rules", []):
+            if "task_types" in rule and task_type not in rule["task_types"]:
+                continue
+            if "max_prompt_tokens" in rule and prompt_tokens > rule["max_prompt_tokens"]:
+                continue
+            if "min_prompt_tokens" in rule and prompt_tokens < rule["min_prompt_tokens"]:
+                continue
+            if "max_completion_tokens" in rule and max_tokens > rule["max_completion_tokens"]:
+                continue
+            return rule
+        return None
+    
+    def _candidates(self, tier: str, needed_tokens: int) -> List[str]:
+        candidates = []
+        for model in self.policy.get("tiers", {}).get(tier, []):
+            info = self.catalog.get(model)
+            if info is None or info.context_window < needed_tokens + settings.LLM_CONTEXT_SAFETY_TOKENS:
+                continue
+            if not self.caller.get_breaker(model).is_accepting_calls():
+                continue
+            candidates.append(model)
+        return candidates
+    
+    def _latency(self, model: str) -> Optional[float]:
+        """Expected latency in seconds: observed p50 when there are enough samples"""
+        if self.metrics.sample_count(model) >= self.policy.get("min_latency_samples", 20):
+            return self.metrics.percentile(model, 0.5)
+        info = self.catalog.get(model)
+        if info is None or info.typical_latency_ms is None:
+            return None
+        return info.typical_latency_ms / 1000
+    
+    def _score(self, model: str) -> float:
+        info = self.catalog.get(model)
+        cost = info.relative_cost if info else 1.0
+        latency = self._latency(model) or 1.0
+        score = self.policy.get("cost_weight", 1.0) * cost + self.policy.get("latency_weight", 1.0) * latency
+        return score / max(0.05, 1 - self.metrics.error_rate(model))
+    
+    def _record_route(self, decision: RoutingDecision, tokens: int):
+        self.stats["routed"] += 1
+        route = f"{decision.requested_model} -> {decision.model}"
+        self.stats["routes"][route] = self.stats["routes"].get(route, 0) + 1
+        
+        requested = self.catalog.get(decision.requested_model)
+        chosen = self.catalog.get(decision.model)
+        if requested is not None and chosen is not None:
+            # Relative cost is per 1K tokens
+            self.stats["estimated_cost_saved"] += (requested.relative_cost - chosen.relative_cost) * tokens / 1000
+        requested_latency = self._latency(decision.requested_model)
+        chosen_latency = self._latency(decision.model)
+        if requested_latency is not None and chosen_latency is not None:
+            self.stats["estimated_latency_saved"] += requested_latency - chosen_latency
+        logger.debug(f"Routed {route} ({decision.reason})")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "routes": dict(self.stats["routes"])
+        }
+
+
+# Global model router instance
+model_router = ModelRouter(
+    model_catalog,
+    llm_metrics,
+    resilient_caller,
+    policy_path=settings.MODEL_ROUTING_POLICY_PATH or DEFAULT_POLICY_PATH,
+    enabled=settings.MODEL_ROUTING_ENABLED
+)
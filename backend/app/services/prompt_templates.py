@@ -0,0 +1,134 @@
+"""
+Prompt template registry
+"""
+
+import logging
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, Any, Optional, Tuple, cast
+
+from app.models.agent import Agent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant powered by Cerebras models."
+
+
+class PromptTemplate:
+    """A prompt template parsed once at registration and rendered with str.format_map"""
+    
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.source = source
+        self.fields = frozenset(
+            field_name for _, field_name, _, _ in Formatter().parse(source) if field_name
+        )
+    
+    def render(self, **values: Any) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt template '{self.name}' is missing values for: {', '.join(sorted(missing))}")
+        return self.source.format_map(values)
+
+
+class PromptRegistry:
+    """Named prompt templates plus cached per-agent system prompts
+    
+    Agent personas are static between agent updates, so each agent's system
+    prompt is rendered once and reused. Putting the persona first, in the
+    system message, keeps the start of every request for an agent identical,
+    which lets upstream prefix caching apply. Cached entries are keyed on the
+    agent's `updated_at`, so an update made through any worker is picked up.
+    """
+    
+    def __init__(self, max_agents: int = 1024):
+        self.max_agents = max_agents
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._agent_prompts: "OrderedDict[int, Tuple[Any, str]]" = OrderedDict()
+        self.stats = {
+            "agent_prompt_hits": 0,
+            "agent_prompt_misses": 0
+        }
+    
+    def register(self, name: str, source: str) -> PromptTemplate:
+        template = PromptTemplate(name, source)
+        self._templates[name] = template
+        return template
+    
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+    
+    def render(self, name: str, /, **values: Any) -> str:
+        return self._templates[name].render(**values)
+    
+    def get_agent_system_prompt(self, agent: Agent) -> str:
+        """Get the system prompt holding an agent's persona"""
+        agent_id = cast(Optional[int], agent.id)
+        if agent_id is None:
+            return self._render_agent_system_prompt(agent)
+        
+        cached = self._agent_prompts.get(agent_id)
+        if cached is not None and cached[0] == agent.updated_at:
+            self._agent_prompts.move_to_end(agent_id)
+            self.stats["agent_prompt_hits"] += 1
+            return cached[1]
+        
+        self.stats["agent_prompt_misses"] += 1
+        prompt = self._render_agent_system_prompt(agent)
+        self._agent_prompts[agent_id] = (agent.updated_at, prompt)
+        self._agent_prompts.move_to_end(agent_id)
+        while len(self._agent_prompts) > self.max_agents:
+            self._agent_prompts.popitem(last=False)
+        return prompt
+    
+    def _render_agent_system_prompt(self, agent: Agent) -> str:
+        return self.render(
+            "agent_system",
+            system=DEFAULT_SYSTEM_PROMPT,
+            role=agent.role,
+            goal=agent.goal,
+            backstory=agent.backstory
+        )
+    
+    def invalidate_agent(self, agent_id: int):
+        """Drop an agent's cached system prompt"""
+        self._agent_prompts.pop(agent_id, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "templates": len(self._templates),
+            "cached_agents": len(self._agent_prompts)
+        }
+
+
+# Global prompt registry instance
+prompt_registry = PromptRegistry()
+
+prompt_registry.register(
+    "agent_system",
+    "{system}\n\nAgent Role: {role}\nAgent Goal: {goal}\nAgent Backstory: {backstory}"
+)
+prompt_registry.register(
+    "agent_task",
+    "Task: {description}"
+)
+prompt_registry.register(
+    "agent_test",
+    "Task: {input}\n\nPlease provide a response based on your role and goal."
+)
+prompt_registry.register(
+    "agent_context",
+    "Context Information:\n{context}\n\nTask:\n{prompt}\n\n"
+    "Please provide a response based on the context and task requirements."
+)
+prompt_registry.register(
+    "conversation_summary",
+    "Summary of the earlier conversation:\n{summary}"
+)
+prompt_registry.register(
+    "conversation_summarize",
+    "Update the summary of a conversation with the new messages below. Keep facts, "
+    "decisions, names and open questions; drop pleasantries. Be concise.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{messages}\n\nUpdated summary:"
+)
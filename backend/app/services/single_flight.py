@@ -0,0 +1,434 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Dict, Any, Optional, AsyncGenerator, Awaitable, Callable, List
+
+from app.core.config import settings
+from app.core.exceptions import CerebrasAPIError
+from app.core.redis import get_redis, eval_script
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if it still belongs to this flight
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock only if it still belongs to this flight
+REFRESH_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _shared_copy(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A result served from another caller's upstream call
+    
+    The usage was consumed (and is reported) by the caller that made the
+    call, so it is moved to `coalesced_tokens` rather than counted again.
+    """
+    if result.get("coalesced"):
+        return dict(result)
+    return {
+        **result,
+        "coalesced": True,
+        "coalesced_tokens": result.get("tokens_used") or 0,
+        "tokens_used": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0
+    }
+
+
+class _LeaderLost(Exception):
+    """The remote leader went away without publishing a result"""
+
+
+class _Flight:
+    """A shared in-flight call and the number of callers waiting on it"""
+    
+    def __init__(self):
+        self.task: Optional["asyncio.Future[Dict[str, Any]]"] = None
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """A shared in-flight stream whose chunks are replayed to every subscriber"""
+    
+    def __init__(self):
+        self.chunks: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = asyncio.Condition()
+        self.task: Optional["asyncio.Future[None]"] = None
+        self.subscribers = 0
+    
+    async def publish(self, chunk: Dict[str, Any]):
+        async with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+    
+    async def finish(self, error: Optional[BaseException] = None):
+        async with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+    
+    async def subscribe(self) -> AsyncGenerator[Dict[str, Any], None]:
+        index = 0
+        while True:
+            async with self.condition:
+                await self.condition.wait_for(lambda: index < len(self.chunks) or self.done)
+                chunks = self.chunks[index:]
+                done, error = self.done, self.error
+            
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            
+            if done and index >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """Shares one upstream call between concurrent identical requests
+    
+    Within a worker, callers with the same key await one shared task (or, for
+    streams, replay one shared chunk buffer). Across workers, the first worker
+    to take a Redis lock becomes the leader and publishes its result or stream
+    chunks to a Redis stream; other workers read that stream instead of calling
+    upstream. The leader keeps its lock alive while running, so followers fall
+    back to their own call if the leader disappears. Only the caller whose
+    call reached upstream reports its token usage; every other caller's
+    result is marked `coalesced` with the usage zeroed.
+    """
+    
+    LOCK_PREFIX = "llm:inflight:lock:"
+    STREAM_PREFIX = "llm:inflight:stream:"
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        distributed: bool = True,
+        lock_ttl: int = 30,
+        flush_interval: float = 0.05,
+        stream_ttl: int = 60
+    ):
+        self.enabled = enabled
+        self.distributed = distributed
+        self.lock_ttl_ms = lock_ttl * 1000
+        self.flush_interval = flush_interval
+        self.stream_ttl = stream_ttl
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.stats = {
+            "leaders": 0,
+            "local_followers": 0,
+            "remote_followers": 0,
+            "remote_fallbacks": 0
+        }
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run `fn` once for all concurrent callers with the same key"""
+        if not self.enabled:
+            return await fn()
+        
+        flight = self._calls.get(key)
+        leader = flight is None
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._run(key, fn))
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+            self._calls[key] = flight
+            self.stats["leaders"] += 1
+        else:
+            self.stats["local_followers"] += 1
+        task = flight.task
+        assert task is not None
+        
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(task)
+            return dict(result) if leader else _shared_copy(result)
+        except asyncio.CancelledError:
+            # Stop the upstream call once nobody is waiting for it
+            if flight.waiters <= 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+    
+    async def stream(
+        self,
+        key: str,
+        fn: Callable[[], AsyncGenerator[Dict[str, Any], None]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream `fn` once for all concurrent subscribers with the same key
+        
+        Subscribers that join late first receive the chunks already produced.
+        """
+        if not self.enabled:
+            async for chunk in fn():
+                yield chunk
+            return
+        
+        flight = self._streams.get(key)
+        leader = flight is None
+        if flight is None:
+            flight = _StreamFlight()
+            flight.task = asyncio.ensure_future(self._pump(key, flight, fn))
+            flight.task.add_done_callback(lambda _: self._forget(self._streams, key, flight))
+            self._streams[key] = flight
+            self.stats["leaders"] += 1
+        else:
+            self.stats["local_followers"] += 1
+        task = flight.task
+        assert task is not None
+        
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.subscribe():
+                # Only the final chunk carries usage
+                yield chunk if leader or "tokens_used" not in chunk else _shared_copy(chunk)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not task.done():
+                task.cancel()
+    
+    @staticmethod
+    def _forget(flights: Dict[str, Any], key: str, flight: Any):
+        if flights.get(key) is flight:
+            del flights[key]
+    
+    async def _get_redis(self):
+        if not self.distributed:
+            return None
+        try:
+            return await get_redis()
+        except Exception as e:
+            logger.warning(f"Single-flight running without Redis: {e}")
+            return None
+    
+    async def _acquire(self, redis, key: str):
+        """Take the leader lock or return the id of the flight holding it
+        
+        Returns a tuple of (is_leader, flight_id); flight_id is None when Redis
+        could not be reached.
+        """
+        lock_key = self.LOCK_PREFIX + key
+        while True:
+            try:
+                flight_id = uuid.uuid4().hex
+                if await redis.set(lock_key, flight_id, nx=True, px=self.lock_ttl_ms):
+                    return True, flight_id
+                remote_id = await redis.get(lock_key)
+            except Exception as e:
+                logger.warning(f"Single-flight lock failed for {key}: {e}")
+                return False, None
+            
+            if remote_id is not None:
+                return False, remote_id
+    
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        redis = await self._get_redis()
+        if redis is None:
+            return await fn()
+        
+        is_leader, flight_id = await self._acquire(redis, key)
+        if flight_id is None:
+            return await fn()
+        
+        if is_leader:
+            return await self._lead(redis, key, flight_id, fn)
+        
+        self.stats["remote_followers"] += 1
+        try:
+            async for entry in self._follow(redis, key, flight_id):
+                if entry["type"] == "result":
+                    return _shared_copy(json.loads(entry["data"]))
+        except _LeaderLost:
+            pass
+        
+        self.stats["remote_fallbacks"] += 1
+        return await fn()
+    
+    async def _lead(self, redis, key: str, flight_id: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        stream_key = self.STREAM_PREFIX + key + ":" + flight_id
+        heartbeat = asyncio.ensure_future(self._heartbeat(redis, key, flight_id))
+        try:
+            result = await fn()
+        except Exception as e:
+            await self._publish(redis, stream_key, {"type": "error", "message": str(e)})
+            raise
+        else:
+            await self._publish(redis, stream_key, {"type": "result", "data": json.dumps(result)})
+            return result
+        finally:
+            heartbeat.cancel()
+            await self._release(redis, key, flight_id)
+    
+    async def _pump(self, key: str, flight: _StreamFlight, fn: Callable[[], AsyncGenerator[Dict[str, Any], None]]):
+        try:
+            async for chunk in self._stream_source(key, fn):
+                await flight.publish(chunk)
+            await flight.finish()
+        except asyncio.CancelledError:
+            await flight.finish(CerebrasAPIError("Streaming generation was cancelled"))
+            raise
+        except Exception as e:
+            await flight.finish(e)
+    
+    async def _stream_source(
+        self,
+        key: str,
+        fn: Callable[[], AsyncGenerator[Dict[str, Any], None]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        redis = await self._get_redis()
+        is_leader, flight_id = (await self._acquire(redis, key)) if redis is not None else (False, None)
+        
+        if flight_id is None:
+            async for chunk in fn():
+                yield chunk
+            return
+        
+        if is_leader:
+            async for chunk in self._lead_stream(redis, key, flight_id, fn):
+                yield chunk
+            return
+        
+        self.stats["remote_followers"] += 1
+        yielded = False
+        try:
+            async for entry in self._follow(redis, key, flight_id):
+                if entry["type"] == "chunks":
+                    for chunk in json.loads(entry["data"]):
+                        yielded = True
+                        yield chunk if "tokens_used" not in chunk else _shared_copy(chunk)
+                elif entry["type"] == "done":
+                    return
+        except _LeaderLost:
+            if yielded:
+                raise CerebrasAPIError("Coalesced stream was interrupted before completion")
+        
+        self.stats["remote_fallbacks"] += 1
+        async for chunk in fn():
+            yield chunk
+    
+    async def _lead_stream(
+        self,
+        redis,
+        key: str,
+        flight_id: str,
+        fn: Callable[[], AsyncGenerator[Dict[str, Any], None]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        stream_key = self.STREAM_PREFIX + key + ":" + flight_id
+        heartbeat = asyncio.ensure_future(self._heartbeat(redis, key, flight_id))
+        pending: List[Dict[str, Any]] = []
+        last_flush = time.perf_counter()
+        try:
+            async for chunk in fn():
+                pending.append(chunk)
+                yield chunk
+                
+                now = time.perf_counter()
+                if chunk.get("finish_reason") is not None or now - last_flush >= self.flush_interval:
+                    await self._publish(redis, stream_key, {"type": "chunks", "data": json.dumps(pending)})
+                    pending = []
+                    last_flush = now
+            
+            if pending:
+                await self._publish(redis, stream_key, {"type": "chunks", "data": json.dumps(pending)})
+            await self._publish(redis, stream_key, {"type": "done"})
+        except Exception as e:
+            await self._publish(redis, stream_key, {"type": "error", "message": str(e)})
+            raise
+        finally:
+            heartbeat.cancel()
+            await self._release(redis, key, flight_id)
+    
+    async def _follow(self, redis, key: str, flight_id: str) -> AsyncGenerator[Dict[str, str], None]:
+        """Read a remote leader's published entries until it finishes
+        
+        Raises `_LeaderLost` if the leader's lock disappears before a final
+        entry is seen.
+        """
+        lock_key = self.LOCK_PREFIX + key
+        stream_key = self.STREAM_PREFIX + key + ":" + flight_id
+        last_id = "0"
+        
+        while True:
+            try:
+                response = await redis.xread({stream_key: last_id}, count=100, block=1000)
+                if not response and await redis.get(lock_key) != flight_id:
+                    # The leader may have published and released in between
+                    response = await redis.xread({stream_key: last_id}, count=100)
+                    if not response:
+                        raise _LeaderLost()
+            except _LeaderLost:
+                raise
+            except Exception as e:
+                logger.warning(f"Single-flight follower lost Redis for {key}: {e}")
+                raise _LeaderLost()
+            
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    if fields["type"] == "error":
+                        raise CerebrasAPIError(f"Coalesced request failed: {fields.get('message', '')}")
+                    yield fields
+                    if fields["type"] in ("result", "done"):
+                        return
+    
+    async def _publish(self, redis, stream_key: str, fields: Dict[str, str]):
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.xadd(stream_key, fields)
+                pipe.expire(stream_key, self.stream_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Single-flight publish failed for {stream_key}: {e}")
+    
+    async def _heartbeat(self, redis, key: str, flight_id: str):
+        interval = self.lock_ttl_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await eval_script(redis, REFRESH_LOCK_SCRIPT, [self.LOCK_PREFIX + key], flight_id, self.lock_ttl_ms)
+            except Exception as e:
+                logger.warning(f"Single-flight heartbeat failed for {key}: {e}")
+    
+    async def _release(self, redis, key: str, flight_id: str):
+        try:
+            await eval_script(redis, RELEASE_LOCK_SCRIPT, [self.LOCK_PREFIX + key], flight_id)
+        except Exception as e:
+            logger.warning(f"Single-flight release failed for {key}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters and the number of shared in-flight calls"""
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "distributed": self.distributed,
+            "in_flight": len(self._calls) + len(self._streams)
+        }
+
+
+# Global single-flight instance
+single_flight = SingleFlight(
+    enabled=settings.SINGLE_FLIGHT_ENABLED,
+    distributed=settings.SINGLE_FLIGHT_DISTRIBUTED,
+    lock_ttl=settings.SINGLE_FLIGHT_LOCK_TTL,
+    flush_interval=settings.STREAM_FLUSH_INTERVAL
+)
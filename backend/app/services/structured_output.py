@@ -0,0 +1,211 @@
+"""
+Incremental parsing and validation of structured (JSON) agent output
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_JSON_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None)
+}
+
+
+def validate_value(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Check a value against a JSON Schema subset, returning error messages
+    
+    Supports `type` (a name or a list of names), `enum`, `properties`,
+    `required`, `items`, `minimum`/`maximum` and `minLength`/`maxLength`,
+    which covers the output schemas tasks declare without pulling in a full
+    JSON Schema implementation.
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected is not None:
+        names = expected if isinstance(expected, list) else [expected]
+        # bool is an int in Python but not a JSON number
+        matches = any(
+            isinstance(value, _JSON_TYPES.get(name, object))
+            and not (isinstance(value, bool) and name in ("number", "integer"))
+            for name in names
+        )
+        if not matches:
+            return [f"{path}: expected {' or '.join(names)}, got {type(value).__name__}"]
+    
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{path}: {value} is below the minimum {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            errors.append(f"{path}: {value} is above the maximum {schema['maximum']}")
+    if isinstance(value, str):
+        if "minLength" in schema and len(value) < schema["minLength"]:
+            errors.append(f"{path}: shorter than {schema['minLength']} characters")
+        if "maxLength" in schema and len(value) > schema["maxLength"]:
+            errors.append(f"{path}: longer than {schema['maxLength']} characters")
+    if isinstance(value, dict):
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: required field missing")
+        for name, field_schema in schema.get("properties", {}).items():
+            if name in value:
+                errors.extend(validate_value(value[name], field_schema, f"{path}.{name}"))
+    if isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for index, item in enumerate(value):
+            errors.extend(validate_value(item, schema["items"], f"{path}[{index}]"))
+    return errors
+
+
+class IncrementalJSONParser:
+    """Parses a streamed JSON object, yielding each top-level field once its value is complete
+    
+    Text before the opening brace (prose, a ```json fence) is skipped. Only
+    the scanning position and the current field are kept between calls, so
+    feeding a long completion token by token stays linear.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self._finished = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+    
+    @property
+    def finished(self) -> bool:
+        """Whether the top-level object has closed"""
+        return self._finished
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume more text, returning the (field, value) pairs it completed"""
+        self._buffer += text
+        fields: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+        
+        while self._position < len(buffer) and not self._finished:
+            index = self._position
+            char = buffer[index]
+            self._position += 1
+            
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None and self._key_start is not None:
+                        self._key = json.loads(buffer[self._key_start:index + 1])
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None and self._value_start is None:
+                    self._key_start = index
+            elif char == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = index + 1
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_field(buffer[:index], fields)
+                    self._finished = True
+            elif char == "," and self._depth == 1:
+                self._complete_field(buffer[:index], fields)
+        
+        return fields
+    
+    def _complete_field(self, buffer: str, fields: List[Tuple[str, Any]]):
+        if self._key is not None and self._value_start is not None:
+            raw = buffer[self._value_start:].strip()
+            try:
+                fields.append((self._key, json.loads(raw)))
+            except ValueError:
+                logger.debug(f"Skipping unparseable value for field {self._key}: {raw[:80]}")
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+
+class StructuredOutput:
+    """Fields of a streamed structured response, available as soon as each one completes
+    
+    Each field is checked against its property in the optional JSON
+    `schema` as it arrives; invalid fields are recorded as errors and never
+    made available. `wait_for` lets a consumer start as soon as the fields it
+    needs exist, without waiting for the rest of the generation.
+    """
+    
+    def __init__(self, schema: Optional[Dict[str, Any]] = None):
+        self.schema = schema or {}
+        self.parser = IncrementalJSONParser()
+        self.fields: Dict[str, Any] = {}
+        self.errors: List[str] = []
+        self.closed = False
+        self._fed = False
+        self._changed = asyncio.Event()
+    
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume streamed text, returning the newly available valid fields"""
+        self._fed = True
+        available = []
+        properties = self.schema.get("properties", {})
+        for name, value in self.parser.feed(text):
+            errors = validate_value(value, properties[name], f"$.{name}") if name in properties else []
+            if errors:
+                self.errors.extend(errors)
+                continue
+            self.fields[name] = value
+            available.append((name, value))
+        
+        if available:
+            self._notify()
+        return available
+    
+    def close(self, text: Optional[str] = None) -> List[str]:
+        """Finish the output, parsing `text` if nothing was streamed, and return all errors"""
+        if text is not None and not self._fed:
+            self.feed(text)
+        if not self.parser.finished:
+            self.errors.append("$: response is not a complete JSON object")
+        for name in self.schema.get("required", []):
+            if name not in self.fields and not any(error.startswith(f"$.{name}") for error in self.errors):
+                self.errors.append(f"$.{name}: required field missing")
+        self.closed = True
+        self._notify()
+        return self.errors
+    
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def wait_for(self, names: List[str]) -> Optional[Dict[str, Any]]:
+        """The named fields once all are available, or None if the output closed without them"""
+        while True:
+            if all(name in self.fields for name in names):
+                return {name: self.fields[name] for name in names}
+            if self.closed:
+                return None
+            await self._changed.wait()
@@ -0,0 +1,136 @@
+"""
+Layered concurrency limits for AI tasks run by workflows
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Limit:
+    """A semaphore plus the number of callers holding or waiting on it"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.semaphore = asyncio.Semaphore(size)
+        self.users = 0
+        self.in_flight = 0
+
+
+class TaskConcurrencyLimiter:
+    """Caps AI tasks in flight per worker: globally, per workflow, per agent and per model
+    
+    A task holds a slot at every level while it runs, so a 200-task
+    workflow proceeds at a sustained rate instead of opening 200 upstream
+    calls at once, and one busy agent or model cannot take the whole
+    worker. Levels are always acquired in the same order (workflow, agent,
+    model, global) so tasks never deadlock on each other's slots. A limit of
+    0 or None disables that level. Per-key semaphores are dropped once idle,
+    so a changed workflow `max_concurrency` applies from its next idle
+    period.
+    """
+    
+    def __init__(
+        self,
+        max_global: Optional[int] = 64,
+        per_workflow: Optional[int] = 16,
+        per_agent: Optional[int] = 16,
+        per_model: Optional[int] = 32
+    ):
+        self.max_global = max_global
+        self.per_workflow = per_workflow
+        self.per_agent = per_agent
+        self.per_model = per_model
+        self._limits: Dict[Tuple[str, Any], _Limit] = {}
+        self.stats = {"acquired": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0}
+    
+    def workflow_limit(self, workflow_config: Optional[Dict[str, Any]]) -> Optional[int]:
+        """A workflow's own `max_concurrency`, else the per-workflow default"""
+        return (workflow_config or {}).get("max_concurrency") or self.per_workflow
+    
+    @asynccontextmanager
+    async def slot(
+        self,
+        workflow_id: Optional[int] = None,
+        agent_id: Optional[int] = None,
+        model: Optional[str] = None,
+        workflow_limit: Optional[int] = None
+    ) -> AsyncIterator[float]:
+        """Hold a slot at every applicable level, yielding the seconds spent waiting for it"""
+        levels = [
+            ("workflow", workflow_id, workflow_limit or self.per_workflow),
+            ("agent", agent_id, self.per_agent),
+            ("model", model, self.per_model),
+            ("global", None, self.max_global)
+        ]
+        entered: List[Tuple[Tuple[str, Any], _Limit]] = []
+        acquired: List[_Limit] = []
+        started = time.perf_counter()
+        try:
+            for level, key, size in levels:
+                if not size or (key is None and level != "global"):
+                    continue
+                limit_key = (level, key)
+                limit = self._limits.get(limit_key)
+                if limit is None:
+                    limit = self._limits[limit_key] = _Limit(size)
+                limit.users += 1
+                entered.append((limit_key, limit))
+                await limit.semaphore.acquire()
+                limit.in_flight += 1
+                acquired.append(limit)
+            
+            wait = time.perf_counter() - started
+            self._record_wait(wait)
+            yield wait
+        finally:
+            for limit in reversed(acquired):
+                limit.in_flight -= 1
+                limit.semaphore.release()
+            for limit_key, limit in entered:
+                limit.users -= 1
+                if limit.users == 0 and self._limits.get(limit_key) is limit:
+                    del self._limits[limit_key]
+    
+    def _record_wait(self, wait: float):
+        self.stats["acquired"] += 1
+        # Anything beyond scheduling jitter means a limit was saturated
+        if wait > 0.001:
+            self.stats["waited"] += 1
+            self.stats["total_wait"] += wait
+            self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        in_flight: Dict[str, Dict[str, int]] = {}
+        waiting = 0
+        for (level, key), limit in self._limits.items():
+            in_flight.setdefault(level, {})[str(key)] = limit.in_flight
+            waiting += limit.users - limit.in_flight
+        return {
+            **self.stats,
+            "total_wait": round(self.stats["total_wait"], 3),
+            "max_wait": round(self.stats["max_wait"], 3),
+            "limits": {
+                "global": self.max_global,
+                "per_workflow": self.per_workflow,
+                "per_agent": self.per_agent,
+                "per_model": self.per_model
+            },
+            "in_flight": in_flight,
+            "waiting": waiting
+        }
+
+
+# Global task concurrency limiter instance
+task_concurrency = TaskConcurrencyLimiter(
+    max_global=settings.WORKFLOW_MAX_CONCURRENT_TASKS,
+    per_workflow=settings.WORKFLOW_MAX_CONCURRENT_TASKS_PER_WORKFLOW,
+    per_agent=settings.WORKFLOW_MAX_CONCURRENT_TASKS_PER_AGENT,
+    per_model=settings.WORKFLOW_MAX_CONCURRENT_TASKS_PER_MODEL
+)
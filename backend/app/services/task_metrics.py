@@ -0,0 +1,61 @@
+"""
+Per-task timing and throughput recorded on task executions
+"""
+
+from typing import Dict, Any, Optional, cast
+
+from app.models.task import TaskExecution
+
+
+def record_task_metrics(
+    task_execution: TaskExecution,
+    execution_time: float,
+    response: Optional[Dict[str, Any]] = None
+):
+    """Store a task's timing on its execution row and in its `execution_log`
+    
+    `execution_time` is the task's wall time in seconds and `response` the
+    AI task's generation result, if it produced one. Columns hold
+    milliseconds; the log's `timing` entry holds seconds. Throughput is
+    completion tokens over the time spent upstream, i.e. excluding the wait
+    for rate-limit budget. Cached responses did not wait or generate, so they
+    report no queue wait, no throughput and no tokens consumed; the tokens
+    the cache saved are logged as `cached_tokens`. Responses coalesced onto
+    another caller's upstream call arrive with their usage already zeroed.
+    """
+    # Columns declared with `Column` read as Column objects to type checkers
+    row = cast(Any, task_execution)
+    row.execution_time = int(execution_time * 1000)
+    timing: Dict[str, Any] = {"execution_time": round(execution_time, 4)}
+    
+    if response is not None:
+        cached = response.get("cached", False)
+        queue_wait = 0.0 if cached else (response.get("queue_wait") or 0.0)
+        time_to_first_token = None if cached else response.get("time_to_first_token")
+        prompt_tokens = 0 if cached else (response.get("prompt_tokens") or 0)
+        completion_tokens = 0 if cached else (response.get("completion_tokens") or 0)
+        
+        upstream_time = execution_time - queue_wait
+        tokens_per_second = None
+        if not cached and completion_tokens and upstream_time > 0:
+            tokens_per_second = round(completion_tokens / upstream_time, 2)
+        
+        row.queue_wait = int(queue_wait * 1000)
+        if time_to_first_token is not None:
+            row.time_to_first_token = int(time_to_first_token * 1000)
+        row.tokens_per_second = tokens_per_second
+        row.prompt_tokens = prompt_tokens
+        row.completion_tokens = completion_tokens
+        
+        timing.update({
+            "queue_wait": round(queue_wait, 4),
+            "time_to_first_token": round(time_to_first_token, 4) if time_to_first_token is not None else None,
+            "tokens_per_second": tokens_per_second,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached": cached,
+            "cached_tokens": response.get("cached_tokens", 0) if cached else 0,
+            "coalesced": response.get("coalesced", False)
+        })
+    
+    row.execution_log = {**(row.execution_log or {}), "timing": timing}
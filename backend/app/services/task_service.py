@@ -4,6 +4,7 @@ Task service for managing AI tasks
 
 import asyncio
 import logging
+import time
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
@@ -13,6 +14,7 @@ from app.models.workflow import Workflow
 from app.models.agent import Agent
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse, TaskExecutionResponse
 from app.core.exceptions import NotFoundError, ValidationError, AgentExecutionError
+from app.services.task_metrics import record_task_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -192,46 +194,46 @@ class TaskService:
     
     async def _execute_ai_task(self, task_execution: TaskExecution, task: Task):
         """Execute AI task using agent"""
+        start_time = time.perf_counter()
         try:
             from app.services.cerebras_service import cerebras_service
+            from app.services.prompt_templates import prompt_registry
             
             # Get agent
             agent = self.db.query(Agent).filter(Agent.id == task.agent_id).first()
             if not agent:
                 raise Exception(f"Agent {task.agent_id} not found")
             
-            # Build prompt
-            prompt = f"""
-Agent Role: {agent.role}
-Agent Goal: {agent.goal}
-Agent Backstory: {agent.backstory}
-
-Task: {task.description}
-Input Data: {task_execution.input_data}
-"""
-            
             # Generate response
             response = await cerebras_service.generate_agent_response(
-                agent_prompt=prompt,
+                agent_prompt=prompt_registry.render("agent_task", description=task.description),
+                system_prompt=prompt_registry.get_agent_system_prompt(agent),
                 context=task_execution.input_data,
                 model=agent.model,
                 max_tokens=agent.max_tokens,
                 temperature=float(agent.temperature),
-                top_p=float(agent.top_p)
+                top_p=float(agent.top_p),
+                use_cache=(agent.config or {}).get("cache_enabled", True),
+                task_type=(task.config or {}).get("task_type", task.task_type),
+                routing_hints=agent.config or {}
             )
             
             # Update task execution
             task_execution.status = "completed"
             task_execution.output_data = {
                 "response": response["response"],
-                "tokens_used": response["tokens_used"]
+                "tokens_used": response["tokens_used"],
+                "cached": response.get("cached", False),
+                "context_tokens_saved": response.get("context_tokens_saved", 0)
             }
             task_execution.tokens_used = response["tokens_used"]
+            record_task_metrics(task_execution, time.perf_counter() - start_time, response)
             
         except Exception as e:
             logger.error(f"Error executing AI task {task.id}: {e}")
             task_execution.status = "failed"
             task_execution.error_message = str(e)
+            record_task_metrics(task_execution, time.perf_counter() - start_time)
     
     async def get_task_executions(
         self,
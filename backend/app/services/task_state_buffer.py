@@ -0,0 +1,96 @@
+"""
+Batched persistence of task execution state
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.task import TaskExecution
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class TaskStateBuffer:
+    """Writes task execution rows in batches instead of committing every transition
+    
+    New rows are inserted together in one multi-row INSERT (which also
+    assigns their ids) without committing. A task reaching a terminal status
+    is committed straight away, so a finished task is durable as soon as it
+    finishes and a resumed execution can rely on it. Other changes wait for
+    the next commit, which `start` bounds: a background flush commits them
+    within `flush_interval`, so no transaction stays open across a long LLM
+    call. The executor keeps each task's state on its row in memory and
+    never reads back what it wrote.
+    """
+    
+    def __init__(self, db: Session, flush_interval: float = 0.5):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._flusher: Optional[asyncio.Task] = None
+        self.stats = {"inserted": 0, "recorded": 0, "flushes": 0, "background_flushes": 0}
+    
+    def start(self):
+        """Commit buffered changes in the background every `flush_interval` until `stop`"""
+        if self._flusher is None and self.flush_interval > 0:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+    
+    async def stop(self):
+        """Stop the background flush; changes still buffered are left to the caller's flush"""
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+    
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+                self.stats["background_flushes"] += 1
+            except Exception as e:
+                logger.error(f"Background flush of task state failed: {e}")
+    
+    def insert(self, task_executions: List[TaskExecution]):
+        """Insert new rows in one statement, assigning their ids"""
+        if not task_executions:
+            return
+        self.db.add_all(task_executions)
+        self.db.flush()
+        self.stats["inserted"] += len(task_executions)
+        self._pending += len(task_executions)
+        self._maybe_flush()
+    
+    def record(self, task_execution: TaskExecution, urgent: bool = False):
+        """Note a state change already applied to the row, committing if one is due"""
+        self.stats["recorded"] += 1
+        self._pending += 1
+        self._maybe_flush(urgent or task_execution.status in TERMINAL_STATUSES)
+    
+    def _maybe_flush(self, urgent: bool = False):
+        if urgent or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Commit every buffered change"""
+        if self._pending:
+            self.db.commit()
+            self.stats["flushes"] += 1
+            self._pending = 0
+        self._last_flush = time.monotonic()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self._pending}
@@ -0,0 +1,119 @@
+"""
+Local token estimation and context-window budgeting
+"""
+
+import logging
+import math
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.services.model_catalog import model_catalog
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and runs of other non-space characters, as BPE tokenizers split them
+_PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]+")
+
+# Chat formatting tokens added around every message
+MESSAGE_OVERHEAD = 4
+
+
+class TokenEstimator:
+    """Estimates token counts locally, calibrated against actual upstream usage
+    
+    The base estimate follows how BPE tokenizers split text: common words are
+    one token, long words roughly one token per four characters, numbers one
+    token per three digits and punctuation one token per two characters.
+    Each model keeps a running ratio of actual to estimated prompt tokens that
+    corrects later estimates.
+    """
+    
+    CALIBRATION_ALPHA = 0.1
+    MIN_RATIO = 0.5
+    MAX_RATIO = 2.0
+    
+    def __init__(self):
+        self._ratios: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._absolute_error: Dict[str, float] = {}
+    
+    def count_text(self, text: str) -> int:
+        """Estimate the tokens in a piece of text"""
+        tokens = 0
+        for piece in _PIECE_PATTERN.findall(text):
+            if piece[0].isdigit():
+                tokens += 1
+            elif piece[0].isascii() and piece[0].isalpha():
+                tokens += max(1, math.ceil(len(piece) / 4))
+            else:
+                tokens += max(1, math.ceil(len(piece) / 2))
+        return tokens
+    
+    def count_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+        """Estimate the prompt tokens of a chat request"""
+        tokens = sum(self.count_text(str(message.get("content", ""))) + MESSAGE_OVERHEAD for message in messages)
+        if model is None:
+            return tokens
+        return math.ceil(tokens * self._ratios.get(model, 1.0))
+    
+    def record_usage(self, model: str, estimated_prompt_tokens: int, actual_prompt_tokens: Optional[int]):
+        """Feed back the prompt tokens the upstream API actually counted"""
+        if not actual_prompt_tokens or estimated_prompt_tokens <= 0:
+            return
+        
+        ratio = self._ratios.get(model, 1.0)
+        # The estimate was already scaled by the current ratio
+        observed = ratio * actual_prompt_tokens / estimated_prompt_tokens
+        ratio += self.CALIBRATION_ALPHA * (observed - ratio)
+        self._ratios[model] = min(self.MAX_RATIO, max(self.MIN_RATIO, ratio))
+        
+        samples = self._samples.get(model, 0) + 1
+        error = abs(actual_prompt_tokens - estimated_prompt_tokens) / actual_prompt_tokens
+        self._absolute_error[model] = self._absolute_error.get(model, 0.0) + (error - self._absolute_error.get(model, 0.0)) / samples
+        self._samples[model] = samples
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            model: {
+                "samples": samples,
+                "calibration_ratio": self._ratios.get(model, 1.0),
+                "mean_absolute_error": self._absolute_error.get(model, 0.0)
+            }
+            for model, samples in self._samples.items()
+        }
+
+
+def get_context_window(model: str) -> int:
+    """Get the context window of a model"""
+    if model in settings.LLM_MODEL_CONTEXT_WINDOWS:
+        return settings.LLM_MODEL_CONTEXT_WINDOWS[model]
+    return model_catalog.get_context_window(model)
+
+
+def fit_completion_tokens(model: str, prompt_tokens: int, max_tokens: int) -> Tuple[int, bool]:
+    """Clamp `max_tokens` to what fits in the model's context window after the prompt
+    
+    Returns the completion budget and whether it was clamped. Raises
+    ValidationError if the prompt leaves no useful room for a completion.
+    """
+    context_window = get_context_window(model)
+    available = context_window - prompt_tokens - settings.LLM_CONTEXT_SAFETY_TOKENS
+    if available < settings.LLM_MIN_COMPLETION_TOKENS:
+        raise ValidationError(
+            f"Prompt of about {prompt_tokens} tokens does not fit the {context_window}-token context window of {model}",
+            details={
+                "model": model,
+                "prompt_tokens": prompt_tokens,
+                "context_window": context_window
+            }
+        )
+    
+    if max_tokens > available:
+        return available, True
+    return max_tokens, False
+
+
+# Global token estimator instance
+token_estimator = TokenEstimator()
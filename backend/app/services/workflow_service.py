@@ -4,7 +4,10 @@ Workflow service for managing AI workflows
 
 import asyncio
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Set
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
@@ -12,8 +15,17 @@ from app.models.workflow import Workflow, WorkflowExecution
 from app.models.task import Task, TaskExecution
 from app.models.agent import Agent
 from app.schemas.workflow import WorkflowCreate, WorkflowUpdate, WorkflowResponse, WorkflowExecutionResponse
-from app.core.exceptions import NotFoundError, ValidationError, WorkflowExecutionError
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.exceptions import NotFoundError, ValidationError, WorkflowExecutionError, ExecutionCancelledError, ExecutionPausedError
 from app.core.websocket import websocket_manager
+from app.services.prompt_templates import prompt_registry
+from app.services.cancellation import CancellationToken, cancellation_registry
+from app.services.task_metrics import record_task_metrics
+from app.services.structured_output import StructuredOutput
+from app.services.task_concurrency import task_concurrency
+from app.services.execution_queue import execution_queue
+from app.services.task_state_buffer import TaskStateBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +35,7 @@ class WorkflowService:
     
     def __init__(self, db: Session):
         self.db = db
+        self.task_states = TaskStateBuffer(db, settings.TASK_STATE_FLUSH_INTERVAL)
     
     async def get_workflows(
         self,
@@ -125,8 +138,17 @@ class WorkflowService:
             logger.error(f"Error deleting workflow {workflow_id}: {e}")
             raise ValidationError(f"Failed to delete workflow: {str(e)}")
     
-    async def execute_workflow(self, workflow_id: int, input_data: Optional[Dict[str, Any]] = None) -> WorkflowExecutionResponse:
-        """Execute a workflow"""
+    async def execute_workflow(
+        self,
+        workflow_id: int,
+        input_data: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> WorkflowExecutionResponse:
+        """Execute a workflow
+        
+        The execution is cancelled once `timeout` seconds pass, falling back to
+        the workflow's `timeout` config and then WORKFLOW_EXECUTION_TIMEOUT.
+        """
         try:
             workflow = self.db.query(Workflow).filter(Workflow.id == workflow_id).first()
             
@@ -151,8 +173,8 @@ class WorkflowService:
             workflow.execution_count += 1
             self.db.commit()
             
-            # Start workflow execution asynchronously
-            asyncio.create_task(self._execute_workflow_async(execution.id))
+            timeout = timeout or (workflow.config or {}).get("timeout") or settings.WORKFLOW_EXECUTION_TIMEOUT
+            queued = await self._start_execution(execution.id, timeout)
             
             # Notify WebSocket subscribers
             await websocket_manager.broadcast_workflow_update(
@@ -161,7 +183,7 @@ class WorkflowService:
                     "type": "workflow_started",
                     "workflow_id": workflow_id,
                     "execution_id": execution.id,
-                    "status": "running"
+                    "status": "queued" if queued else "running"
                 }
             )
             
@@ -173,17 +195,63 @@ class WorkflowService:
             logger.error(f"Error executing workflow {workflow_id}: {e}")
             raise WorkflowExecutionError(str(workflow_id), str(e))
     
+    async def _start_execution(self, execution_id: int, timeout: Optional[float]) -> bool:
+        """Queue an execution for a worker, or run it in this process; True if queued
+        
+        With EXECUTION_QUEUE_ENABLED executions go to the durable queue that
+        worker processes consume. If the queue cannot be reached the execution
+        runs here instead.
+        """
+        if settings.EXECUTION_QUEUE_ENABLED:
+            try:
+                await execution_queue.enqueue(execution_id, timeout)
+                return True
+            except Exception as e:
+                logger.warning(f"Could not queue execution {execution_id}, running it in process: {e}")
+        
+        # Register the deadline before starting so an early cancel is not missed
+        cancellation_registry.register(execution_id, timeout)
+        asyncio.create_task(self._run_execution(execution_id))
+        return False
+    
+    async def _run_execution(self, execution_id: int):
+        """Run an execution on its own session, which outlives the request that started it
+        
+        The session does not expire objects on commit: the executor keeps task
+        and execution state in memory rather than reloading rows it wrote.
+        """
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            await WorkflowService(db)._execute_workflow_async(execution_id)
+        finally:
+            db.close()
+    
     async def _execute_workflow_async(self, execution_id: int):
-        """Execute workflow asynchronously"""
+        """Execute workflow asynchronously
+        
+        Tasks completed by an earlier run of the execution (before it was
+        paused, or on a worker that died) are not run again; their recorded
+        outputs are reused.
+        """
+        cancel_token = cancellation_registry.get(execution_id) or cancellation_registry.register(execution_id)
         try:
             execution = self.db.query(WorkflowExecution).filter(WorkflowExecution.id == execution_id).first()
             
-            if not execution:
+            # A redelivered job may belong to an execution that already finished or was paused
+            if not execution or execution.status in ("completed", "failed", "cancelled", "paused"):
                 return
             
+            workflow = self.db.query(Workflow).filter(Workflow.id == execution.workflow_id).first()
+            if workflow is None:
+                raise NotFoundError("Workflow", str(execution.workflow_id))
+            if workflow.status == "paused":
+                raise ExecutionPausedError()
+            
             # Update status to running
             execution.status = "running"
+            completed = self._load_checkpoint(execution)
             self.db.commit()
+            self.task_states.start()
             
             # Get workflow tasks
             tasks = self.db.query(Task).filter(
@@ -200,14 +268,16 @@ class WorkflowService:
                 return
             
             # Execute tasks based on workflow type
-            workflow = self.db.query(Workflow).filter(Workflow.id == execution.workflow_id).first()
-            
             if workflow.workflow_type == "linear":
-                await self._execute_linear_workflow(execution, tasks)
+                await self._execute_linear_workflow(execution, tasks, cancel_token, completed)
             elif workflow.workflow_type == "parallel":
-                await self._execute_parallel_workflow(execution, tasks)
+                await self._execute_parallel_workflow(execution, tasks, cancel_token, completed)
+            elif workflow.workflow_type == "dag":
+                max_parallelism = (workflow.config or {}).get("max_parallelism") or settings.WORKFLOW_DAG_MAX_PARALLELISM
+                await self._execute_dag_workflow(execution, tasks, cancel_token, max_parallelism, completed)
             else:
-                await self._execute_linear_workflow(execution, tasks)
+                await self._execute_linear_workflow(execution, tasks, cancel_token, completed)
+            self.task_states.flush()
             
             # Update execution status
             execution.status = "completed"
@@ -225,6 +295,18 @@ class WorkflowService:
                 }
             )
             
+        except ExecutionCancelledError as e:
+            await self._record_cancelled_execution(execution_id, cancel_token, e)
+        except ExecutionPausedError:
+            self.task_states.flush()
+            await self._record_paused_execution(execution_id)
+        except asyncio.CancelledError:
+            # The worker is shutting down; keep what completed so the next delivery can skip it
+            try:
+                self.task_states.flush()
+            except Exception as e:
+                logger.warning(f"Could not save progress of execution {execution_id}: {e}")
+            raise
         except Exception as e:
             logger.error(f"Error in workflow execution {execution_id}: {e}")
             
@@ -247,125 +329,703 @@ class WorkflowService:
                     "error": str(e)
                 }
             )
+        finally:
+            await self.task_states.stop()
+            cancellation_registry.unregister(execution_id, cancel_token)
     
-    async def _execute_linear_workflow(self, execution: WorkflowExecution, tasks: List[Task]):
-        """Execute workflow tasks linearly"""
-        for task in tasks:
-            try:
-                # Execute task
-                await self._execute_task(execution, task)
+    async def _record_cancelled_execution(
+        self,
+        execution_id: int,
+        cancel_token: CancellationToken,
+        error: ExecutionCancelledError
+    ):
+        """Mark an execution stopped by cancellation or its deadline"""
+        logger.info(f"Workflow execution {execution_id} stopped: {cancel_token.reason}")
+        
+        execution = self.db.query(WorkflowExecution).filter(WorkflowExecution.id == execution_id).first()
+        if not execution:
+            return
+        
+        status = "failed" if cancel_token.deadline_exceeded else "cancelled"
+        execution.status = status
+        execution.error_message = error.message
+        execution.completed_at = func.now()
+        execution.output_data = {
+            **(execution.output_data or {}),
+            "tokens_saved_by_cancellation": cancel_token.tokens_saved
+        }
+        self.db.commit()
+        
+        # Notify WebSocket subscribers
+        await websocket_manager.broadcast_workflow_update(
+            str(execution.workflow_id),
+            {
+                "type": "workflow_cancelled",
+                "workflow_id": execution.workflow_id,
+                "execution_id": execution.id,
+                "status": status,
+                "reason": cancel_token.reason,
+                "tokens_saved": cancel_token.tokens_saved
+            }
+        )
+    
+    def _load_checkpoint(self, execution: WorkflowExecution) -> Dict[int, TaskExecution]:
+        """Task executions completed by earlier runs of an execution, by task
+        
+        Rows an interrupted run left running are marked cancelled; their
+        tasks run again.
+        """
+        completed: Dict[int, TaskExecution] = {}
+        task_executions = self.db.query(TaskExecution).filter(
+            TaskExecution.workflow_execution_id == execution.id
+        ).all()
+        for task_execution in task_executions:
+            if task_execution.status == "completed":
+                completed[task_execution.task_id] = task_execution
+            elif task_execution.status == "running":
+                task_execution.status = "cancelled"
+                task_execution.error_message = "Interrupted before completing; run again on resume"
+                task_execution.completed_at = datetime.now(timezone.utc)
+        
+        if completed:
+            logger.info(f"Execution {execution.id} resuming with {len(completed)} tasks already completed")
+        return completed
+    
+    async def _record_paused_execution(self, execution_id: int):
+        """Mark an execution stopped at a task boundary by a pause
+        
+        If the workflow was resumed while the execution was pausing, it is
+        started again straight away instead.
+        """
+        execution = self.db.query(WorkflowExecution).filter(WorkflowExecution.id == execution_id).first()
+        if not execution:
+            return
+        
+        completed_tasks = sorted(
+            task_id for (task_id,) in self.db.query(TaskExecution.task_id).filter(
+                and_(
+                    TaskExecution.workflow_execution_id == execution_id,
+                    TaskExecution.status == "completed"
+                )
+            )
+        )
+        execution.output_data = {**(execution.output_data or {}), "completed_tasks": completed_tasks}
+        
+        workflow = self.db.query(Workflow).filter(Workflow.id == execution.workflow_id).first()
+        if workflow is not None and workflow.status != "paused":
+            execution.status = "pending"
+            self.db.commit()
+            timeout = (workflow.config or {}).get("timeout") or settings.WORKFLOW_EXECUTION_TIMEOUT
+            await self._start_execution(execution_id, timeout)
+            return
+        
+        execution.status = "paused"
+        self.db.commit()
+        logger.info(f"Workflow execution {execution_id} paused after {len(completed_tasks)} completed tasks")
+        
+        # Notify WebSocket subscribers
+        await websocket_manager.broadcast_workflow_update(
+            str(execution.workflow_id),
+            {
+                "type": "workflow_paused",
+                "workflow_id": execution.workflow_id,
+                "execution_id": execution.id,
+                "status": "paused",
+                "completed_tasks": completed_tasks
+            }
+        )
+    
+    def _pause_requested(self, cancel_token: Optional[CancellationToken]) -> bool:
+        return cancel_token is not None and cancel_token.pause_requested
+    
+    def _task_cancel_token(self, task: Task, cancel_token: Optional[CancellationToken]) -> Optional[CancellationToken]:
+        """Derive a task's token from its execution's
+        
+        The task's own `timeout` config is started by `_task_slot` once the
+        task holds its concurrency slot, so waiting for a slot does not use
+        up the task's deadline.
+        """
+        timeout = (task.config or {}).get("timeout")
+        if cancel_token is not None:
+            return cancel_token.child()
+        return CancellationToken() if timeout else None
+    
+    def _record_task_cancellation(
+        self,
+        task_execution: TaskExecution,
+        task_token: Optional[CancellationToken],
+        error_message: str
+    ):
+        """Mark a task execution stopped by cancellation or its deadline"""
+        deadline_exceeded = task_token is not None and task_token.deadline_exceeded
+        task_execution.status = "failed" if deadline_exceeded else "cancelled"
+        task_execution.error_message = error_message
+        task_execution.output_data = {
+            "tokens_saved_by_cancellation": task_token.tokens_saved if task_token is not None else 0
+        }
+    
+    async def _execute_linear_workflow(
+        self,
+        execution: WorkflowExecution,
+        tasks: List[Task],
+        cancel_token: Optional[CancellationToken] = None,
+        completed: Optional[Dict[int, TaskExecution]] = None
+    ):
+        """Execute workflow tasks linearly
+        
+        A task whose config lists `input_fields` gets those fields of the
+        previous task's structured output (see `output_schema`) merged into
+        its input, and starts as soon as they have been generated rather than
+        when the previous task finishes streaming. If the previous task then
+        fails, the tasks already started on its fields are cancelled. The
+        workflow stops at the first failed task. Tasks in `completed` are not
+        run again, and a pause takes effect before the next task starts.
+        """
+        completed = completed or {}
+        runs: List[asyncio.Task] = []
+        output: Optional[StructuredOutput] = None
+        previous_run: Optional[asyncio.Task] = None
+        previous_token: Optional[CancellationToken] = None
+        try:
+            for task in tasks:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
                 
-                # Check if task failed
-                task_execution = self.db.query(TaskExecution).filter(
-                    and_(
-                        TaskExecution.task_id == task.id,
-                        TaskExecution.workflow_execution_id == execution.id
-                    )
-                ).first()
+                if task.id in completed:
+                    output = self._checkpointed_output(task, completed[task.id])
+                    previous_run, previous_token = None, None
+                    continue
                 
-                if task_execution and task_execution.status == "failed":
+                input_fields = (task.config or {}).get("input_fields")
+                upstream_fields = None
+                upstream_token = None
+                if input_fields and output is not None:
+                    upstream_fields = await output.wait_for(input_fields)
+                    if upstream_fields is None:
+                        logger.warning(f"Task {task.id} not started: previous task did not produce {input_fields}")
+                        break
+                    if previous_run is not None:
+                        upstream_token = self._upstream_token(previous_run, previous_token or cancel_token)
+                elif runs:
+                    await asyncio.gather(*runs)
+                
+                if any(self._run_failed(run) for run in runs):
                     break
-                    
+                
+                if self._pause_requested(cancel_token):
+                    await asyncio.gather(*runs)
+                    raise ExecutionPausedError()
+                
+                output = self._structured_output(task)
+                previous_run = asyncio.create_task(
+                    self._execute_task(execution, task, cancel_token, output, upstream_fields, upstream_token)
+                )
+                previous_token = upstream_token
+                runs.append(previous_run)
+            
+            await asyncio.gather(*runs)
+        finally:
+            for run in runs:
+                if not run.done():
+                    run.cancel()
+    
+    def _run_failed(self, run: asyncio.Task) -> bool:
+        if not run.done() or run.cancelled() or run.exception() is not None:
+            return False
+        task_execution = run.result()
+        return task_execution is not None and task_execution.status == "failed"
+    
+    def _upstream_token(self, upstream: asyncio.Task, parent: Optional[CancellationToken]) -> CancellationToken:
+        """A token for a task started on `upstream`'s fields, cancelled if `upstream` fails"""
+        token = parent.child() if parent is not None else CancellationToken()
+        upstream.add_done_callback(
+            lambda run: token.cancel("upstream task failed") if self._run_failed(run) else None
+        )
+        return token
+    
+    def _structured_output(self, task: Task) -> Optional[StructuredOutput]:
+        """Incremental parser for AI tasks whose config declares an `output_schema`"""
+        schema = (task.config or {}).get("output_schema")
+        if task.task_type != "ai_task" or schema is None:
+            return None
+        return StructuredOutput(schema)
+    
+    def _checkpointed_output(self, task: Task, task_execution: TaskExecution) -> Optional[StructuredOutput]:
+        """The structured output of a task completed by an earlier run, parsed from its stored response"""
+        output = self._structured_output(task)
+        if output is not None:
+            output.close((task_execution.output_data or {}).get("response", ""))
+        return output
+    
+    async def _execute_parallel_workflow(
+        self,
+        execution: WorkflowExecution,
+        tasks: List[Task],
+        cancel_token: Optional[CancellationToken] = None,
+        completed: Optional[Dict[int, TaskExecution]] = None
+    ):
+        """Execute workflow tasks in parallel
+        
+        AI tasks run through the batch completion API, each holding a
+        concurrency slot (see `task_concurrency`) while it runs, so at most
+        the workflow's `max_concurrency` of them are in flight and each one is
+        recorded as soon as it finishes. Cancelling the execution aborts
+        every task still in flight. Tasks in `completed` are not run again;
+        a pause lets the tasks already started finish and starts no more.
+        """
+        from app.services.cerebras_service import cerebras_service
+        
+        workflow_limit = task_concurrency.workflow_limit(tasks[0].workflow.config if tasks[0].workflow else None)
+        tasks = [task for task in tasks if task.id not in (completed or {})]
+        if not tasks:
+            return
+        
+        batch_requests = []
+        batch_tasks = []
+        task_executions = [self._new_task_execution(execution, task) for task in tasks]
+        self.task_states.insert(task_executions)
+        for task, task_execution in zip(tasks, task_executions):
+            if task.task_type != "ai_task":
+                task_execution.status = "completed"
+                task_execution.output_data = {"message": "Task completed"}
+                await self._finish_task_execution(task_execution, task)
+                continue
+            
+            try:
+                task_token = self._task_cancel_token(task, cancel_token)
+                request = self._build_ai_task_request(task_execution, task)
+                request["cancel_token"] = task_token
+                request["slot"] = self._task_slot(task, request["model"], task_token)
+                batch_requests.append(request)
+                batch_tasks.append((task_execution, task, task_token))
             except Exception as e:
-                logger.error(f"Error executing task {task.id}: {e}")
-                break
+                logger.error(f"Error executing AI task {task.id}: {e}")
+                task_execution.status = "failed"
+                task_execution.error_message = str(e)
+                await self._finish_task_execution(task_execution, task)
+        
+        def unpaused_requests():
+            for request in batch_requests:
+                if self._pause_requested(cancel_token):
+                    return
+                yield request
+        
+        finished: Set[int] = set()
+        batch = cerebras_service.iter_completions_batch(unpaused_requests(), concurrency=workflow_limit)
+        async for index, item in batch:
+            finished.add(index)
+            task_execution, task, task_token = batch_tasks[index]
+            if item["success"]:
+                self._record_ai_task_result(
+                    task_execution,
+                    self._add_slot_wait(item["result"], item["slot_wait"]),
+                    item["execution_time"],
+                    self._structured_output(task)
+                )
+            else:
+                record_task_metrics(task_execution, item["execution_time"])
+                if item.get("cancelled"):
+                    self._record_task_cancellation(task_execution, task_token, item["error"])
+                else:
+                    logger.error(f"Error executing AI task {task.id}: {item['error']}")
+                    task_execution.status = "failed"
+                    task_execution.error_message = item["error"]
+            await self._finish_task_execution(task_execution, task)
+        
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
+        if len(finished) < len(batch_tasks):
+            # Paused: drop the records of tasks that never started so they run on resume
+            for index, (task_execution, _, _) in enumerate(batch_tasks):
+                if index not in finished:
+                    self.db.delete(task_execution)
+            raise ExecutionPausedError()
+    
+    async def _execute_dag_workflow(
+        self,
+        execution: WorkflowExecution,
+        tasks: List[Task],
+        cancel_token: Optional[CancellationToken] = None,
+        max_parallelism: int = 8,
+        completed: Optional[Dict[int, TaskExecution]] = None
+    ):
+        """Execute workflow tasks in dependency order
+        
+        Each task starts as soon as every task in its `dependencies` has
+        completed, with at most `max_parallelism` running at once; ready
+        tasks start in `order`. Tasks downstream of a failed or cancelled
+        task are skipped and listed in the execution's
+        `output_data.skipped_tasks`. Tasks in `completed` count as done
+        without running again. A pause starts no new tasks and stops once
+        the running ones finish.
+        """
+        completed = completed or {}
+        dependencies = self._task_graph(tasks)
+        tasks_by_id = {task.id: task for task in tasks}
+        dependents: Dict[int, List[int]] = {task.id: [] for task in tasks}
+        for task_id, task_dependencies in dependencies.items():
+            for dependency in task_dependencies:
+                dependents[dependency].append(task_id)
+        
+        waiting = {
+            task_id: {dependency for dependency in task_dependencies if dependency not in completed}
+            for task_id, task_dependencies in dependencies.items()
+            if task_id not in completed
+        }
+        ready = [task.id for task in tasks if task.id in waiting and not waiting[task.id]]
+        running: Dict[asyncio.Task, int] = {}
+        skipped: List[int] = []
+        try:
+            while ready or running:
+                while ready and len(running) < max_parallelism and not self._pause_requested(cancel_token):
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    task = tasks_by_id[ready.pop(0)]
+                    running[asyncio.create_task(self._execute_task(execution, task, cancel_token))] = task.id
+                
+                if not running:
+                    raise ExecutionPausedError()
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for run in done:
+                    task_id = running.pop(run)
+                    task_execution = run.result()
+                    if task_execution is not None and task_execution.status == "completed":
+                        for dependent in dependents[task_id]:
+                            if dependent not in waiting:
+                                continue
+                            waiting[dependent].discard(task_id)
+                            if not waiting[dependent]:
+                                ready.append(dependent)
+                        ready.sort(key=lambda ready_id: tasks_by_id[ready_id].order or 0)
+                    else:
+                        skipped.extend(self._skip_dependents(task_id, dependents, waiting))
+        finally:
+            for run in running:
+                run.cancel()
+        
+        if skipped:
+            logger.info(f"Execution {execution.id} skipped tasks {skipped} after upstream failures")
+            execution.output_data = {**(execution.output_data or {}), "skipped_tasks": skipped}
+            self.db.commit()
     
-    async def _execute_parallel_workflow(self, execution: WorkflowExecution, tasks: List[Task]):
-        """Execute workflow tasks in parallel"""
-        # Create tasks for parallel execution
-        task_coroutines = [self._execute_task(execution, task) for task in tasks]
+    def _task_graph(self, tasks: List[Task]) -> Dict[int, List[int]]:
+        """Map each task to the tasks it depends on, rejecting dependency cycles
+        
+        Dependencies on tasks outside the execution (inactive or from another
+        workflow) are ignored.
+        """
+        task_ids = {task.id for task in tasks}
+        graph: Dict[int, List[int]] = {}
+        for task in tasks:
+            dependencies = task.dependencies or []
+            if task.id in dependencies:
+                raise ValidationError(f"Task {task.id} depends on itself")
+            ignored = [dependency for dependency in dependencies if dependency not in task_ids]
+            if ignored:
+                logger.warning(f"Task {task.id} dependencies {ignored} are not active tasks of this workflow; ignoring them")
+            graph[task.id] = [dependency for dependency in dependencies if dependency in task_ids]
         
-        # Execute all tasks in parallel
-        await asyncio.gather(*task_coroutines, return_exceptions=True)
+        # Kahn's algorithm: whatever cannot be ordered lies on or behind a cycle
+        remaining = {task_id: len(dependencies) for task_id, dependencies in graph.items()}
+        dependents: Dict[int, List[int]] = {task_id: [] for task_id in graph}
+        for task_id, dependencies in graph.items():
+            for dependency in dependencies:
+                dependents[dependency].append(task_id)
+        ready = [task_id for task_id, count in remaining.items() if count == 0]
+        while ready:
+            for dependent in dependents[ready.pop()]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        blocked = sorted(task_id for task_id, count in remaining.items() if count > 0)
+        if blocked:
+            raise ValidationError("Task dependencies contain a cycle", {"tasks": blocked})
+        return graph
+    
+    def _skip_dependents(
+        self,
+        task_id: int,
+        dependents: Dict[int, List[int]],
+        waiting: Dict[int, Set[int]]
+    ) -> List[int]:
+        """Drop every task downstream of `task_id` from the schedule"""
+        skipped = []
+        pending = list(dependents[task_id])
+        while pending:
+            dependent = pending.pop()
+            if waiting.pop(dependent, None) is None:
+                continue
+            skipped.append(dependent)
+            pending.extend(dependents[dependent])
+        return sorted(skipped)
     
-    async def _execute_task(self, execution: WorkflowExecution, task: Task):
-        """Execute a single task"""
+    async def _execute_task(
+        self,
+        execution: WorkflowExecution,
+        task: Task,
+        cancel_token: Optional[CancellationToken] = None,
+        output: Optional[StructuredOutput] = None,
+        upstream_fields: Optional[Dict[str, Any]] = None,
+        upstream_token: Optional[CancellationToken] = None
+    ) -> Optional[TaskExecution]:
+        """Execute a single task
+        
+        `upstream_fields` are merged into the task's input; an AI task's
+        response is parsed into `output` as it streams. Cancelling
+        `upstream_token` cancels only this task, not the execution.
+        """
+        task_execution = None
+        task_token = self._task_cancel_token(task, upstream_token or cancel_token)
         try:
             # Create task execution record
-            task_execution = TaskExecution(
-                task_id=task.id,
-                workflow_execution_id=execution.id,
-                input_data=task.input_data,
-                status="running"
-            )
-            
-            self.db.add(task_execution)
-            self.db.commit()
-            self.db.refresh(task_execution)
+            input_data = {**(task.input_data or {}), **upstream_fields} if upstream_fields else task.input_data
+            task_execution = self._start_task_execution(execution, task, input_data)
             
             # Execute task based on type
             if task.task_type == "ai_task":
-                await self._execute_ai_task(task_execution, task)
+                await self._execute_ai_task(task_execution, task, task_token, output)
             else:
                 # Handle other task types
                 task_execution.status = "completed"
                 task_execution.output_data = {"message": "Task completed"}
             
-            task_execution.completed_at = func.now()
-            self.db.commit()
-            
-            # Notify WebSocket subscribers
-            await websocket_manager.broadcast_agent_update(
-                str(task.agent_id),
-                {
-                    "type": "task_completed",
-                    "task_id": task.id,
-                    "execution_id": task_execution.id,
-                    "status": task_execution.status
-                }
-            )
+            await self._finish_task_execution(task_execution, task)
             
+        except ExecutionCancelledError as e:
+            if task_execution is not None:
+                self._record_task_cancellation(task_execution, task_token, e.message)
+                await self._finish_task_execution(task_execution, task)
+            # A task's own deadline only fails the task; cancelling the execution stops the workflow
+            if cancel_token is not None and cancel_token.cancelled:
+                raise
         except Exception as e:
             logger.error(f"Error executing task {task.id}: {e}")
             
-            task_execution.status = "failed"
-            task_execution.error_message = str(e)
-            task_execution.completed_at = func.now()
-            self.db.commit()
+            if task_execution is not None:
+                task_execution.status = "failed"
+                task_execution.error_message = str(e)
+                task_execution.completed_at = datetime.now(timezone.utc)
+                self.task_states.record(task_execution)
+        finally:
+            # Wake tasks waiting on fields this one will no longer produce
+            if output is not None and not output.closed:
+                output.close()
+        
+        return task_execution
+    
+    def _new_task_execution(
+        self,
+        execution: WorkflowExecution,
+        task: Task,
+        input_data: Optional[Dict[str, Any]] = None
+    ) -> TaskExecution:
+        """The running execution record for a task, not yet inserted"""
+        return TaskExecution(
+            task_id=task.id,
+            workflow_execution_id=execution.id,
+            input_data=input_data if input_data is not None else task.input_data,
+            status="running",
+            started_at=datetime.now(timezone.utc)
+        )
+    
+    def _start_task_execution(
+        self,
+        execution: WorkflowExecution,
+        task: Task,
+        input_data: Optional[Dict[str, Any]] = None
+    ) -> TaskExecution:
+        """Insert the running execution record for a task"""
+        task_execution = self._new_task_execution(execution, task, input_data)
+        self.task_states.insert([task_execution])
+        return task_execution
+    
+    async def _finish_task_execution(self, task_execution: TaskExecution, task: Task):
+        """Record a finished task execution and notify subscribers"""
+        # A client-side timestamp keeps the row's update batchable with others
+        task_execution.completed_at = datetime.now(timezone.utc)
+        self.task_states.record(task_execution)
+        
+        # Notify WebSocket subscribers
+        await websocket_manager.broadcast_agent_update(
+            str(task.agent_id),
+            {
+                "type": "task_completed",
+                "task_id": task.id,
+                "execution_id": task_execution.id,
+                "status": task_execution.status
+            }
+        )
     
-    async def _execute_ai_task(self, task_execution: TaskExecution, task: Task):
+    async def _execute_ai_task(
+        self,
+        task_execution: TaskExecution,
+        task: Task,
+        cancel_token: Optional[CancellationToken] = None,
+        output: Optional[StructuredOutput] = None
+    ):
         """Execute AI task using agent"""
+        start_time = time.perf_counter()
         try:
-            from app.services.agent_service import AgentService
             from app.services.cerebras_service import cerebras_service
             
-            # Get agent
-            agent = self.db.query(Agent).filter(Agent.id == task.agent_id).first()
-            if not agent:
-                raise Exception(f"Agent {task.agent_id} not found")
+            generation_kwargs = self._build_ai_task_request(task_execution, task, output)
+            generation_kwargs["cancel_token"] = cancel_token
+            on_content = generation_kwargs.pop("on_content", None)
             
-            # Build prompt
-            prompt = f"""
-Agent Role: {agent.role}
-Agent Goal: {agent.goal}
-Agent Backstory: {agent.backstory}
-
-Task: {task.description}
-Input Data: {task.input_data}
-"""
+            # Generate response once the task holds a concurrency slot
+            async with self._task_slot(task, generation_kwargs["model"], cancel_token) as slot_wait:
+                if on_content is not None:
+                    response = await self._stream_ai_task(on_content, **generation_kwargs)
+                else:
+                    response = await cerebras_service.generate_agent_response(**generation_kwargs)
             
-            # Generate response
-            response = await cerebras_service.generate_agent_response(
-                agent_prompt=prompt,
-                context=task.input_data,
-                model=agent.model,
-                max_tokens=agent.max_tokens,
-                temperature=float(agent.temperature),
-                top_p=float(agent.top_p)
-            )
-            
-            # Update task execution
-            task_execution.status = "completed"
-            task_execution.output_data = {
-                "response": response["response"],
-                "tokens_used": response["tokens_used"]
-            }
-            task_execution.tokens_used = response["tokens_used"]
+            response = self._add_slot_wait(response, slot_wait)
+            self._record_ai_task_result(task_execution, response, time.perf_counter() - start_time, output)
             
+        except ExecutionCancelledError:
+            record_task_metrics(task_execution, time.perf_counter() - start_time)
+            raise
         except Exception as e:
             logger.error(f"Error executing AI task {task.id}: {e}")
             task_execution.status = "failed"
             task_execution.error_message = str(e)
+            record_task_metrics(task_execution, time.perf_counter() - start_time)
+    
+    @asynccontextmanager
+    async def _task_slot(self, task: Task, model: Optional[str], task_token: Optional[CancellationToken] = None):
+        """The concurrency slot an AI task holds while it calls the model
+        
+        The task's `timeout` starts on `task_token` once the slot is held.
+        """
+        async with task_concurrency.slot(
+            workflow_id=task.workflow_id,
+            agent_id=task.agent_id,
+            model=model,
+            workflow_limit=task_concurrency.workflow_limit(task.workflow.config if task.workflow else None)
+        ) as slot_wait:
+            timeout = (task.config or {}).get("timeout")
+            if task_token is not None and timeout:
+                task_token.start_timeout(timeout)
+            yield slot_wait
+    
+    def _add_slot_wait(self, response: Dict[str, Any], slot_wait: float) -> Dict[str, Any]:
+        """Count time spent waiting for a concurrency slot as queue wait"""
+        return {**response, "queue_wait": (response.get("queue_wait") or 0.0) + slot_wait}
+    
+    def _build_ai_task_request(
+        self,
+        task_execution: TaskExecution,
+        task: Task,
+        output: Optional[StructuredOutput] = None
+    ) -> Dict[str, Any]:
+        """Build the generation arguments for an AI task
+        
+        Tasks configured with `stream` get an `on_content` callback that relays
+        generated text to workflow subscribers as `task_token` messages. With
+        an `output`, the response is streamed into it and each field is
+        announced as a `task_field` message as soon as it is complete.
+        """
+        # Get agent
+        # Served from the session's identity map after the first task of an agent
+        agent = self.db.get(Agent, task.agent_id)
+        if not agent:
+            raise Exception(f"Agent {task.agent_id} not found")
+        
+        generation_kwargs: Dict[str, Any] = dict(
+            agent_prompt=prompt_registry.render("agent_task", description=task.description),
+            system_prompt=prompt_registry.get_agent_system_prompt(agent),
+            context=task_execution.input_data,
+            model=agent.model,
+            max_tokens=agent.max_tokens,
+            temperature=float(agent.temperature),
+            top_p=float(agent.top_p),
+            use_cache=(agent.config or {}).get("cache_enabled", True),
+            task_type=(task.config or {}).get("task_type", task.task_type),
+            routing_hints=agent.config or {}
+        )
+        
+        stream = (task.config or {}).get("stream")
+        if stream or output is not None:
+            async def relay(content: str):
+                if stream:
+                    await websocket_manager.broadcast_workflow_update(
+                        str(task.workflow_id),
+                        {
+                            "type": "task_token",
+                            "task_id": task.id,
+                            "execution_id": task_execution.id,
+                            "content": content
+                        }
+                    )
+                if output is not None:
+                    for name, value in output.feed(content):
+                        await websocket_manager.broadcast_workflow_update(
+                            str(task.workflow_id),
+                            {
+                                "type": "task_field",
+                                "task_id": task.id,
+                                "execution_id": task_execution.id,
+                                "field": name,
+                                "value": value
+                            }
+                        )
+            
+            generation_kwargs["on_content"] = relay
+        
+        return generation_kwargs
+    
+    def _record_ai_task_result(
+        self,
+        task_execution: TaskExecution,
+        response: Dict[str, Any],
+        execution_time: float,
+        output: Optional[StructuredOutput] = None
+    ):
+        """Store an AI task's response and timing on its execution record
+        
+        A task with an `output` stores the parsed fields, and fails if they do
+        not match its output schema.
+        """
+        task_execution.status = "completed"
+        task_execution.output_data = {
+            "response": response["response"],
+            "tokens_used": response["tokens_used"],
+            "cached": response.get("cached", False),
+            "context_tokens_saved": response.get("context_tokens_saved", 0)
+        }
+        if response.get("time_to_first_token") is not None:
+            task_execution.output_data["time_to_first_token"] = response["time_to_first_token"]
+        task_execution.tokens_used = response["tokens_used"]
+        record_task_metrics(task_execution, execution_time, response)
+        
+        if output is not None:
+            errors = output.close(response["response"])
+            task_execution.output_data["structured"] = output.fields
+            if errors:
+                task_execution.output_data["validation_errors"] = errors
+                task_execution.status = "failed"
+                task_execution.error_message = f"Structured output does not match the output schema: {'; '.join(errors[:5])}"
+    
+    async def _stream_ai_task(self, on_content: Callable[[str], Awaitable[None]], **kwargs) -> Dict[str, Any]:
+        """Stream an AI task's response to workflow subscribers while it is generated"""
+        from app.services.cerebras_service import cerebras_service
+        
+        result = await cerebras_service.consume_stream(
+            cerebras_service.stream_agent_response(**kwargs),
+            on_content=on_content
+        )
+        
+        return {
+            "response": result["content"],
+            "tokens_used": result["tokens_used"],
+            "prompt_tokens": result["prompt_tokens"],
+            "completion_tokens": result["completion_tokens"],
+            "time_to_first_token": result["time_to_first_token"],
+            "queue_wait": result["queue_wait"],
+            "context_tokens_saved": result["context_tokens_saved"]
+        }
     
     async def get_workflow_executions(
         self,
@@ -400,7 +1060,12 @@ Input Data: {task.input_data}
             raise ValidationError(f"Failed to retrieve workflow execution: {str(e)}")
     
     async def pause_workflow(self, workflow_id: int) -> bool:
-        """Pause a workflow"""
+        """Pause a workflow
+        
+        Running executions stop before their next task starts, once the tasks
+        already in flight finish; queued ones are paused when a worker picks
+        them up.
+        """
         try:
             workflow = self.db.query(Workflow).filter(Workflow.id == workflow_id).first()
             
@@ -410,7 +1075,16 @@ Input Data: {task.input_data}
             workflow.status = "paused"
             self.db.commit()
             
-            logger.info(f"Paused workflow: {workflow.name}")
+            running = self.db.query(WorkflowExecution.id).filter(
+                and_(
+                    WorkflowExecution.workflow_id == workflow_id,
+                    WorkflowExecution.status == "running"
+                )
+            ).all()
+            for (execution_id,) in running:
+                await cancellation_registry.pause(execution_id)
+            
+            logger.info(f"Paused workflow: {workflow.name} ({len(running)} running executions)")
             return True
             
         except Exception as e:
@@ -419,7 +1093,7 @@ Input Data: {task.input_data}
             raise ValidationError(f"Failed to pause workflow: {str(e)}")
     
     async def resume_workflow(self, workflow_id: int) -> bool:
-        """Resume a workflow"""
+        """Resume a workflow, restarting its paused executions from their checkpoints"""
         try:
             workflow = self.db.query(Workflow).filter(Workflow.id == workflow_id).first()
             
@@ -427,9 +1101,21 @@ Input Data: {task.input_data}
                 return False
             
             workflow.status = "active"
+            paused = self.db.query(WorkflowExecution).filter(
+                and_(
+                    WorkflowExecution.workflow_id == workflow_id,
+                    WorkflowExecution.status == "paused"
+                )
+            ).all()
+            for execution in paused:
+                execution.status = "pending"
             self.db.commit()
             
-            logger.info(f"Resumed workflow: {workflow.name}")
+            timeout = (workflow.config or {}).get("timeout") or settings.WORKFLOW_EXECUTION_TIMEOUT
+            for execution in paused:
+                await self._start_execution(execution.id, timeout)
+            
+            logger.info(f"Resumed workflow: {workflow.name} ({len(paused)} paused executions)")
             return True
             
         except Exception as e:
@@ -446,9 +1132,23 @@ Input Data: {task.input_data}
                 return False
             
             workflow.status = "cancelled"
+            
+            # Stop executions that are still running, not just the workflow record
+            running = self.db.query(WorkflowExecution).filter(
+                and_(
+                    WorkflowExecution.workflow_id == workflow_id,
+                    WorkflowExecution.status.in_(["pending", "running", "paused"])
+                )
+            ).all()
+            for execution in running:
+                execution.status = "cancelled"
+                execution.completed_at = func.now()
             self.db.commit()
             
-            logger.info(f"Cancelled workflow: {workflow.name}")
+            for execution in running:
+                await cancellation_registry.cancel(execution.id)
+            
+            logger.info(f"Cancelled workflow: {workflow.name} ({len(running)} running executions)")
             return True
             
         except Exception as e:
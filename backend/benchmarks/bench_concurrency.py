@@ -0,0 +1,87 @@
+"""
+Benchmark concurrent `generate_agent_response` throughput against a local stub server
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_concurrency --requests 256 --concurrency 1,8,32,128,256
+
+Pass `--backend simulated` to skip HTTP and use the in-process simulated backend.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional
+
+from app.services.cerebras_service import CerebrasService
+from app.services.llm_backend import LLMBackend, CerebrasBackend
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+from benchmarks.stub_server import StubServer
+
+
+async def _run_level(service, concurrency: int, total_requests: int) -> dict:
+    """Issue `total_requests` calls with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    
+    async def one_call(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await service.generate_agent_response(
+                agent_prompt=f"Benchmark request {index}",
+                context={"index": index}
+            )
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "elapsed": elapsed,
+        "throughput": total_requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    }
+
+
+async def _main(args: argparse.Namespace):
+    profile = SimulationProfile(latency=args.latency, jitter=args.jitter, latency_distribution="normal")
+    server: Optional[StubServer] = None
+    backend: LLMBackend
+    if args.backend == "simulated":
+        backend = SimulatedBackend(profile)
+    else:
+        server = StubServer(profile=profile)
+        server.start_in_thread()
+        backend = CerebrasBackend(base_url=server.base_url, api_key="stub-key")
+    
+    service = CerebrasService(backend=backend)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    
+    print(f"Stub latency {args.latency:.3f}s, {args.requests} requests per level")
+    print(f"{'concurrency':>12} {'elapsed(s)':>11} {'req/s':>9} {'p50(s)':>8} {'p99(s)':>8}")
+    try:
+        for level in levels:
+            result = await _run_level(service, level, args.requests)
+            print(
+                f"{result['concurrency']:>12} {result['elapsed']:>11.2f} "
+                f"{result['throughput']:>9.1f} {result['p50']:>8.3f} {result['p99']:>8.3f}"
+            )
+    finally:
+        await service.close()
+        if server is not None:
+            server.stop_thread()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent generate_agent_response benchmark")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", default="1,8,32,128,256")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--backend", default="http", choices=["http", "simulated"])
+    asyncio.run(_main(parser.parse_args()))
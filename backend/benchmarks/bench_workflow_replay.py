@@ -0,0 +1,71 @@
+"""
+Benchmark workflow execution offline by replaying recorded LLM traffic
+
+Record a cassette first by running the platform (or a workflow) with
+LLM_CASSETTE_MODE=record, then replay the same workflow against a database
+holding the same workflow, tasks and agents:
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_workflow_replay --cassette cassettes/llm.jsonl.gz --workflow-id 1 --runs 5 --speed 10
+
+No tokens are spent; requests missing from the cassette fail their task and
+are counted as misses.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.database import SessionLocal
+from app.models.workflow import WorkflowExecution
+from app.services.cerebras_service import cerebras_service
+from app.services.completion_cache import completion_cache
+from app.services.execution_service import ExecutionService
+from app.services.llm_cassette import Cassette, ReplayBackend
+from app.services.workflow_service import WorkflowService
+
+
+async def _main(args: argparse.Namespace):
+    backend = ReplayBackend(Cassette.load(args.cassette), speed=args.speed)
+    await cerebras_service.backend.close()
+    cerebras_service.backend = backend
+    # Every run should go through the replayed upstream, not the completion cache
+    completion_cache.enabled = False
+    
+    db = SessionLocal(expire_on_commit=False)
+    durations = []
+    print(f"Replaying workflow {args.workflow_id} at {args.speed}x, {args.runs} runs")
+    print(f"{'run':>4} {'status':>10} {'elapsed(s)':>11} {'avg task(s)':>12} {'avg queue(s)':>13} {'tok/s':>8}")
+    try:
+        for run in range(args.runs):
+            execution = WorkflowExecution(workflow_id=args.workflow_id, status="pending")
+            db.add(execution)
+            db.commit()
+            
+            start = time.perf_counter()
+            await WorkflowService(db)._execute_workflow_async(execution.id)
+            elapsed = time.perf_counter() - start
+            durations.append(elapsed)
+            
+            db.refresh(execution)
+            metrics = await ExecutionService(db).get_execution_metrics(execution.id)
+            assert metrics is not None
+            print(
+                f"{run + 1:>4} {execution.status:>10} {elapsed:>11.2f} {metrics.average_task_time:>12.3f} "
+                f"{metrics.average_queue_wait:>13.3f} {metrics.average_tokens_per_second or 0:>8.1f}"
+            )
+    finally:
+        db.close()
+        await cerebras_service.close()
+    
+    print(f"median {statistics.median(durations):.2f}s; cassette {backend.get_stats()['cassette']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded workflow's LLM traffic")
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--workflow-id", type=int, required=True)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--speed", type=float, default=1.0, help="timing divisor; 0 replays without delays")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,219 @@
+"""
+Local stub of the Cerebras chat completions endpoint for benchmarks
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from aiohttp import web
+
+from app.services.llm_simulator import SimulatedUpstream, SimulationProfile
+
+
+class StubServer:
+    """OpenAI-compatible `/v1/chat/completions` stub with artificial latency
+    
+    Latency, streaming cadence, errors and 429 bursts follow a
+    SimulationProfile, the same behaviour as the in-process simulated backend.
+    """
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.5,
+        jitter: float = 0.05,
+        completion_tokens: int = 64,
+        token_interval: float = 0.005,
+        profile: Optional[SimulationProfile] = None
+    ):
+        self.host = host
+        self.port = port
+        self.upstream = SimulatedUpstream(profile or SimulationProfile(
+            latency=latency,
+            jitter=jitter,
+            latency_distribution="normal",
+            completion_tokens=completion_tokens,
+            token_interval=token_interval
+        ))
+        self.requests_served = 0
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    def _build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_get("/v1/models", self._models)
+        return app
+    
+    async def _models(self, request: web.Request) -> web.Response:
+        """Model listing, also used as the client's connection keepalive ping"""
+        return web.json_response({"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+    
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests_served += 1
+        
+        failure = self.upstream.check_failure()
+        if failure is not None:
+            status_code, retry_after = failure
+            headers = {"Retry-After": f"{retry_after:.3f}"} if retry_after is not None else {}
+            return web.json_response(
+                {"message": "Simulated upstream failure", "type": "simulated_error", "code": str(status_code)},
+                status=status_code,
+                headers=headers
+            )
+        
+        model = body.get("model", "stub-model")
+        max_tokens = body.get("max_tokens") or self.upstream.profile.completion_tokens
+        pieces, prompt_tokens, finish_reason = self.upstream.generate(body.get("messages", []), model, max_tokens)
+        
+        await asyncio.sleep(self.upstream.sample_latency())
+        
+        if body.get("stream"):
+            return await self._stream_response(request, model, pieces, prompt_tokens, finish_reason)
+        
+        await asyncio.sleep(self.upstream.profile.token_interval * (len(pieces) - 1))
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "system_fingerprint": "stub",
+            "choices": [{
+                "index": 0,
+                "finish_reason": finish_reason,
+                "message": {"role": "assistant", "content": "".join(pieces)}
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(pieces),
+                "total_tokens": prompt_tokens + len(pieces)
+            },
+            "time_info": {}
+        })
+    
+    async def _stream_response(
+        self,
+        request: web.Request,
+        model: str,
+        pieces: List[str],
+        prompt_tokens: int,
+        final_reason: str
+    ) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        
+        for index, piece in enumerate(pieces):
+            finish_reason = final_reason if index == len(pieces) - 1 else None
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "system_fingerprint": "stub",
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": finish_reason}]
+            }
+            if finish_reason:
+                chunk["usage"] = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(pieces),
+                    "total_tokens": prompt_tokens + len(pieces)
+                }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(self.upstream.profile.token_interval)
+        
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+    
+    async def start(self):
+        """Start serving on the current event loop"""
+        self._runner = web.AppRunner(self._build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Resolve the ephemeral port when started with port=0
+        server = getattr(site, "_server", None)
+        if server is not None and server.sockets:
+            self.port = server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        """Stop serving"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    def start_in_thread(self):
+        """Run the server on a dedicated event loop in a background thread"""
+        started = threading.Event()
+        
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+        
+        self._thread = threading.Thread(target=run, name="stub-server", daemon=True)
+        self._thread.start()
+        started.wait()
+    
+    def stop_thread(self):
+        """Stop a server started with `start_in_thread`"""
+        if self._loop and self._thread:
+            asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+async def _serve(args: argparse.Namespace):
+    server = StubServer(
+        host=args.host,
+        port=args.port,
+        profile=SimulationProfile(
+            latency=args.latency,
+            jitter=args.jitter,
+            latency_distribution=args.latency_distribution,
+            tail_probability=args.tail_probability,
+            tail_multiplier=args.tail_multiplier,
+            completion_tokens=args.completion_tokens,
+            token_interval=args.token_interval,
+            error_rate=args.error_rate,
+            rate_limit_burst_interval=args.rate_limit_burst_interval,
+            rate_limit_burst_duration=args.rate_limit_burst_duration,
+            seed=args.seed
+        )
+    )
+    await server.start()
+    print(f"Stub server listening on {server.base_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Cerebras API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--latency-distribution", default="normal", choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-multiplier", type=float, default=5.0)
+    parser.add_argument("--completion-tokens", type=int, default=64)
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-burst-interval", type=float, default=0.0)
+    parser.add_argument("--rate-limit-burst-duration", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_serve(parser.parse_args()))
@@ -21,6 +21,8 @@ from app.api.v1.api import api_router
 from app.core.exceptions import CustomException
 from app.core.middleware import LoggingMiddleware, RateLimitMiddleware
 from app.core.websocket import websocket_manager
+from app.services.cerebras_service import cerebras_service
+from app.services.cancellation import cancellation_registry
 
 # Configure logging
 logging.basicConfig(
@@ -48,12 +50,23 @@ async def lifespan(app: FastAPI):
     await websocket_manager.initialize()
     logger.info("WebSocket manager initialized")
     
+    # Listen for cancellations issued through other workers
+    await cancellation_registry.start()
+    logger.info("Cancellation listener started")
+    
+    # Open LLM connections now rather than on the first request
+    await cerebras_service.warm_up()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down CrewAI Cerebras Platform...")
     await websocket_manager.disconnect_all()
     logger.info("WebSocket connections closed")
+    await websocket_manager.close()
+    await cancellation_registry.stop()
+    await cerebras_service.close()
+    logger.info("Cerebras client closed")
 
 
 # Create FastAPI application
@@ -0,0 +1,36 @@
+"""
+Test batch completions
+"""
+
+import asyncio
+import pytest
+from app.services.cerebras_service import CerebrasService
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_order_bounds_concurrency_and_isolates_errors():
+    """Test results come back in input order with per-item errors"""
+    service = CerebrasService()
+    in_flight = []
+    peak = []
+    
+    async def generate_completion(prompt, stream=False, **kwargs):
+        in_flight.append(prompt)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01 * (5 - int(prompt)))
+        in_flight.remove(prompt)
+        if prompt == "2":
+            raise ValueError("upstream failed")
+        return {"content": prompt}
+    
+    service.generate_completion = generate_completion
+    results = await service.generate_completions_batch(
+        [{"prompt": str(i)} for i in range(5)],
+        concurrency=2
+    )
+    
+    assert [result["success"] for result in results] == [True, True, False, True, True]
+    assert [result["result"]["content"] for result in results if result["success"]] == ["0", "1", "3", "4"]
+    assert "upstream failed" in results[2]["error"]
+    assert max(peak) == 2
+    await service.close()
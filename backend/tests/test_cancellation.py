@@ -0,0 +1,61 @@
+"""
+Test deadlines and cancellation of LLM calls
+"""
+
+import asyncio
+import pytest
+from app.core.exceptions import ExecutionCancelledError, DeadlineExceededError
+from app.services.cancellation import CancellationToken
+from app.services.cerebras_service import CerebrasService
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+
+@pytest.mark.asyncio
+async def test_run_abandons_work_on_cancel():
+    """Test a cancelled token stops the awaited call and cancels it"""
+    token = CancellationToken()
+    started = asyncio.Event()
+    
+    async def slow_call():
+        started.set()
+        await asyncio.sleep(10)
+    
+    call = asyncio.create_task(token.run(slow_call()))
+    await started.wait()
+    token.cancel()
+    
+    with pytest.raises(ExecutionCancelledError):
+        await asyncio.wait_for(call, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_child_inherits_parent_deadline():
+    """Test a task token expires with its execution's deadline"""
+    parent = CancellationToken(timeout=0.05)
+    child = parent.child(timeout=10)
+    
+    with pytest.raises(DeadlineExceededError):
+        await child.run(asyncio.sleep(10))
+    assert parent.deadline_exceeded
+
+
+@pytest.mark.asyncio
+async def test_stream_cancelled_mid_generation_records_savings():
+    """Test cancelling a stream stops it early and credits the tokens not generated"""
+    service = CerebrasService(backend=SimulatedBackend(SimulationProfile(
+        latency=0.0, token_interval=0.01, completion_tokens=500
+    )))
+    execution_token = CancellationToken()
+    task_token = execution_token.child()
+    chunks = 0
+    
+    stream = await service.generate_completion("Write a report", max_tokens=500, stream=True, cancel_token=task_token)
+    with pytest.raises(ExecutionCancelledError):
+        async for chunk in stream:
+            chunks += 1
+            if chunks == 5:
+                execution_token.cancel()
+    
+    assert chunks == 5
+    assert 0 < execution_token.tokens_saved <= 500
+    assert execution_token.tokens_saved == task_token.tokens_saved
@@ -0,0 +1,66 @@
+"""
+Test completion cache
+"""
+
+import pytest
+from app.services.completion_cache import CompletionCache
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+def make_cache(**kwargs) -> CompletionCache:
+    return CompletionCache(redis_enabled=False, **kwargs)
+
+
+def test_key_depends_on_sampling_parameters():
+    """Test that every request parameter is part of the key"""
+    key = CompletionCache.make_key("model-a", MESSAGES, 0.0, 0.9, 100)
+    assert key == CompletionCache.make_key("model-a", MESSAGES, 0.0, 0.9, 100)
+    assert key != CompletionCache.make_key("model-b", MESSAGES, 0.0, 0.9, 100)
+    assert key != CompletionCache.make_key("model-a", MESSAGES, 0.5, 0.9, 100)
+    assert key != CompletionCache.make_key("model-a", MESSAGES, 0.0, 0.8, 100)
+    assert key != CompletionCache.make_key("model-a", MESSAGES, 0.0, 0.9, 200)
+
+
+@pytest.mark.asyncio
+async def test_hit_and_miss_counters():
+    """Test cache hits and misses are counted"""
+    cache = make_cache()
+    assert await cache.get("key") is None
+    await cache.set("key", {"content": "cached"})
+    assert await cache.get("key") == {"content": "cached"}
+    
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    """Test least recently used entries are evicted first"""
+    cache = make_cache(max_entries=2)
+    await cache.set("a", {"content": "a"})
+    await cache.set("b", {"content": "b"})
+    await cache.get("a")
+    await cache.set("c", {"content": "c"})
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_ignored():
+    """Test entries past their TTL are not returned"""
+    cache = make_cache(ttl=0)
+    await cache.set("key", {"content": "stale"})
+    assert await cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_oversized_entries_are_skipped():
+    """Test responses above the size cap are not stored"""
+    cache = make_cache(max_entry_bytes=16)
+    await cache.set("key", {"content": "x" * 100})
+    assert await cache.get("key") is None
+    assert cache.get_stats()["skipped_oversized"] == 1
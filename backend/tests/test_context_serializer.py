@@ -0,0 +1,34 @@
+"""
+Test prompt context serialization
+"""
+
+import json
+
+from app.services.context_serializer import ContextSerializer
+
+
+def test_small_context_is_emitted_whole_as_compact_json():
+    """Test small contexts are emitted whole as compact JSON"""
+    serializer = ContextSerializer()
+    context = {"customer": {"name": "Ada", "orders": [1, 2, 3]}}
+    result = serializer.serialize(context)
+    assert json.loads(result.text) == context
+    assert result.truncated_fields == []
+    assert result.tokens_saved == 0
+
+
+def test_oversized_fields_are_truncated_and_reported():
+    """Test long strings, long lists and deep nesting are capped"""
+    serializer = ContextSerializer(max_chars=1000, max_field_chars=100, max_list_items=3, max_depth=2)
+    context = {
+        "notes": "x" * 500,
+        "items": list(range(10)),
+        "deep": {"a": {"b": {"c": 1}}}
+    }
+    result = serializer.serialize(context)
+    assert len(result.text) <= 1000
+    assert set(result.truncated_fields) == {"notes", "items", "deep.a"}
+    assert "chars omitted" in result.text
+    assert "7 more items" in result.text
+    assert result.tokens_saved > 0
+    assert serializer.get_stats()["tokens_saved"] == result.tokens_saved
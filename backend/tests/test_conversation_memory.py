@@ -0,0 +1,104 @@
+"""
+Test bounded conversation memory
+"""
+
+import asyncio
+
+import pytest
+import app.services.cerebras_service
+import app.services.conversation_memory as conversation_memory_module
+from app.services.cerebras_service import CerebrasService
+from app.services.conversation_memory import ConversationMemory, RELEASE_LOCK_SCRIPT, conversation_memory
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+
+def make_service() -> CerebrasService:
+    return CerebrasService(backend=SimulatedBackend(SimulationProfile(latency=0.0, token_interval=0.0, completion_tokens=8)))
+
+
+class LockRedis:
+    """Just enough Redis for the summarization lock"""
+    
+    def __init__(self):
+        self.values = {}
+    
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+    
+    async def eval(self, script, numkeys, key, token):
+        assert script == RELEASE_LOCK_SCRIPT
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_history_stays_within_token_budget():
+    """Test only the newest turns that fit the budget are put in the prompt"""
+    memory = ConversationMemory(token_budget=120)
+    memory._summarizing.add(memory._key(1, "budget"))  # keep this test off the LLM
+    
+    for i in range(10):
+        await memory.append(1, "budget", f"question {i} " + "word " * 20, f"answer {i} " + "word " * 20)
+    context = await memory.get_context(1, "budget")
+    
+    assert 0 < context.tokens <= 120
+    assert context.dropped_turns > 0
+    assert context.turns[-1]["content"].startswith("answer 9")
+
+
+@pytest.mark.asyncio
+async def test_older_turns_are_summarized(monkeypatch):
+    """Test overflowing turns are folded into a summary and removed"""
+    monkeypatch.setattr(app.services.cerebras_service, "cerebras_service", make_service())
+    memory = ConversationMemory(token_budget=120)
+    
+    for i in range(6):
+        await memory.append(2, "summary", f"question {i} " + "word " * 20, f"answer {i} " + "word " * 20)
+        await asyncio.gather(*memory._tasks)
+    session = await memory.get_session(2, "summary")
+    
+    assert session["summary"]
+    assert session["summarized_turns"] > 0
+    assert session["tokens"] <= 120
+    assert len(session["turns"]) + session["summarized_turns"] == 12
+
+
+@pytest.mark.asyncio
+async def test_agent_response_remembers_session():
+    """Test a session id supplies earlier turns to the next agent call"""
+    service = make_service()
+    
+    first = await service.generate_agent_response("Hello", session_id="chat", agent_id=3, use_cache=False)
+    second = await service.generate_agent_response("And then?", session_id="chat", agent_id=3, use_cache=False)
+    
+    assert first["history_turns"] == 0
+    assert second["history_turns"] == 2
+    assert second["prompt_tokens"] > first["prompt_tokens"]
+    await conversation_memory.clear(3, "chat")
+
+
+@pytest.mark.asyncio
+async def test_expired_lock_holder_does_not_release_new_holder(monkeypatch):
+    """Test a worker whose lock expired cannot release the lock another worker took since"""
+    redis = LockRedis()
+    
+    async def get_redis():
+        return redis
+    
+    monkeypatch.setattr(conversation_memory_module, "get_redis", get_redis)
+    memory = ConversationMemory()
+    
+    first = await memory._acquire_lock("session")
+    assert await memory._acquire_lock("session") is None
+    del redis.values["session:lock"]  # the first holder's lock expires
+    second = await memory._acquire_lock("session")
+    
+    await memory._release_lock("session", first)
+    assert redis.values["session:lock"] == second
+    await memory._release_lock("session", second)
+    assert "session:lock" not in redis.values
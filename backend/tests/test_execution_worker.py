@@ -0,0 +1,107 @@
+"""
+Test the execution worker's acknowledgement and shutdown handling
+"""
+
+import asyncio
+
+import pytest
+
+import worker
+import app.services.workflow_service as workflow_service_module
+from app.services.workflow_service import WorkflowService
+
+
+class FakeQueue:
+    """In-memory stand-in recording how the worker settles each job
+    
+    Like the Redis queue, a job queued again replaces the stored job, an
+    acknowledgement naming an older delivery leaves it in place, and queued
+    ids whose job is gone are skipped.
+    """
+    
+    visibility_timeout = 30.0
+    
+    def __init__(self, execution_ids):
+        self.jobs = []
+        self.enqueued = 0
+        self.stored = {}
+        self.acked = []
+        self.released = []
+        for execution_id in execution_ids:
+            self._add(execution_id)
+    
+    def _add(self, execution_id):
+        self.enqueued += 1
+        job = {"job_id": str(self.enqueued), "execution_id": execution_id, "timeout": None, "attempts": 1}
+        self.stored[execution_id] = job["job_id"]
+        self.jobs.append(job)
+    
+    async def enqueue(self, execution_id, timeout=None):
+        self._add(execution_id)
+    
+    async def reserve(self):
+        while self.jobs:
+            job = self.jobs.pop(0)
+            if job["execution_id"] in self.stored:
+                return {**job, "job_id": self.stored[job["execution_id"]]}
+        return None
+    
+    async def requeue_expired(self):
+        return []
+    
+    async def extend(self, execution_ids):
+        pass
+    
+    async def ack(self, execution_id, job_id=None):
+        self.acked.append(execution_id)
+        if job_id is None or self.stored.get(execution_id) == job_id:
+            self.stored.pop(execution_id, None)
+    
+    async def release(self, execution_id):
+        self.released.append(execution_id)
+
+
+@pytest.mark.asyncio
+async def test_finished_executions_acked_and_unfinished_released(monkeypatch):
+    """Test a stopping worker acks what finished and hands back what did not"""
+    async def execute(self, execution_id):
+        await asyncio.sleep(10 if execution_id == 2 else 0)
+    
+    monkeypatch.setattr(WorkflowService, "_execute_workflow_async", execute)
+    queue = FakeQueue([1, 2])
+    execution_worker = worker.ExecutionWorker(queue, concurrency=2, poll_interval=0.01, shutdown_grace=0.05)
+    
+    run = asyncio.create_task(execution_worker.run())
+    await asyncio.sleep(0.1)
+    execution_worker.stop()
+    await asyncio.wait_for(run, 2)
+    
+    assert queue.acked == [1]
+    assert queue.released == [2]
+
+
+@pytest.mark.asyncio
+async def test_execution_resumed_while_pausing_is_delivered_again(monkeypatch):
+    """Test acknowledging a paused delivery keeps the job its resume queued"""
+    runs = []
+    
+    async def execute(self, execution_id):
+        runs.append(execution_id)
+        if len(runs) == 1:
+            # The workflow was resumed while this delivery was pausing, so it queues itself again
+            await self._start_execution(execution_id, None)
+    
+    queue = FakeQueue([1])
+    monkeypatch.setattr(WorkflowService, "_execute_workflow_async", execute)
+    monkeypatch.setattr(workflow_service_module, "execution_queue", queue)
+    monkeypatch.setattr(workflow_service_module.settings, "EXECUTION_QUEUE_ENABLED", True)
+    execution_worker = worker.ExecutionWorker(queue, poll_interval=0.01, shutdown_grace=0.05)
+    
+    run = asyncio.create_task(execution_worker.run())
+    await asyncio.sleep(0.1)
+    execution_worker.stop()
+    await asyncio.wait_for(run, 2)
+    
+    assert runs == [1, 1]
+    assert queue.acked == [1, 1]
+    assert queue.stored == {}
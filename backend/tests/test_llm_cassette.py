@@ -0,0 +1,55 @@
+"""
+Test LLM record/replay cassettes
+"""
+
+import pytest
+from app.core.exceptions import CassetteMissError
+from app.services.llm_cassette import Cassette, RecordingBackend, ReplayBackend
+from app.services.llm_resilience import is_retryable, get_retry_after
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+MESSAGES = [{"role": "user", "content": "Summarise the report"}]
+
+
+def make_recorder(path: str, **options) -> RecordingBackend:
+    profile = SimulationProfile(latency=0.0, token_interval=0.0, completion_tokens=8, **options)
+    return RecordingBackend(SimulatedBackend(profile), Cassette(path))
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_recorded_completion_and_stream(tmp_path):
+    """Test recorded completions and streams replay identically from disk"""
+    path = str(tmp_path / "llm.jsonl.gz")
+    recorder = make_recorder(path)
+    recorded = await recorder.complete(MESSAGES, "model", 100, 0.6, 0.9)
+    stream = await recorder.open_stream(MESSAGES, "model", 4, 0.6, 0.9)
+    recorded_chunks = [chunk.content async for chunk in stream]
+    await recorder.close()
+    
+    replay = ReplayBackend(Cassette.load(path), speed=0)
+    replayed = await replay.complete(MESSAGES, "model", 100, 0.6, 0.9)
+    replayed_stream = await replay.open_stream(MESSAGES, "model", 4, 0.6, 0.9)
+    replayed_chunks = [chunk.content async for chunk in replayed_stream]
+    
+    assert replayed.content == recorded.content
+    assert replayed.completion_tokens == 8
+    assert replayed_chunks == recorded_chunks
+
+
+@pytest.mark.asyncio
+async def test_replay_raises_recorded_errors_and_misses(tmp_path):
+    """Test recorded 429s replay as retryable errors and unrecorded requests miss"""
+    path = str(tmp_path / "llm.jsonl")
+    recorder = make_recorder(path, rate_limit_burst_interval=60.0, rate_limit_burst_duration=60.0)
+    with pytest.raises(Exception):
+        await recorder.complete(MESSAGES, "model", 100, 0.6, 0.9)
+    await recorder.close()
+    
+    replay = ReplayBackend(Cassette.load(path), speed=0)
+    with pytest.raises(Exception) as exc_info:
+        await replay.complete(MESSAGES, "model", 100, 0.6, 0.9)
+    assert is_retryable(exc_info.value)
+    assert get_retry_after(exc_info.value) > 0
+    
+    with pytest.raises(CassetteMissError):
+        await replay.complete(MESSAGES, "other-model", 100, 0.6, 0.9)
@@ -0,0 +1,96 @@
+"""
+Test hedged LLM requests
+"""
+
+import asyncio
+import pytest
+import app.services.cerebras_service as cerebras_module
+from app.core.config import settings
+from app.services.cerebras_service import CerebrasService
+from app.services.llm_hedging import Hedger
+from app.services.llm_metrics import LatencyTracker
+from app.services.llm_scheduler import LLMScheduler, Reservation
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+
+def make_hedger(max_ratio: float = 1.0) -> Hedger:
+    metrics = LatencyTracker()
+    for _ in range(20):
+        metrics.record("model", 0.01)
+    return Hedger(metrics, enabled=True, min_samples=20, min_delay=0.01, max_ratio=max_ratio)
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged():
+    """Test a duplicate request wins when the first one stalls"""
+    hedger = make_hedger()
+    calls = []
+    
+    async def send():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return len(calls)
+    
+    assert await asyncio.wait_for(hedger.run("model", send), timeout=1) == 2
+    assert hedger.stats["hedges_sent"] == 1
+    assert hedger.stats["hedge_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_is_capped():
+    """Test no hedge is sent once the budget is spent"""
+    hedger = make_hedger(max_ratio=0)
+    hedger._budget = 0
+    
+    async def send():
+        await asyncio.sleep(0.05)
+        return "ok"
+    
+    assert await hedger.run("model", send) == "ok"
+    assert hedger.stats["hedges_sent"] == 0
+    assert hedger.stats["budget_exhausted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_is_skipped_without_rate_limit_budget():
+    """Test no hedge is sent when its rate-limit reservation is not granted"""
+    hedger = make_hedger()
+    calls = []
+    
+    async def send():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+    
+    async def no_budget():
+        return None
+    
+    assert await hedger.run("model", send, no_budget) == "ok"
+    assert len(calls) == 1
+    assert hedger.stats["hedges_sent"] == 0
+    assert hedger.stats["rate_limited"] == 1
+
+
+class SlowBudgetScheduler(LLMScheduler):
+    """Makes every request wait for rate-limit budget"""
+    
+    async def acquire(self, model, messages, max_tokens):
+        await asyncio.sleep(0.2)
+        return Reservation(model, 0, 0.2)
+
+
+@pytest.mark.asyncio
+async def test_latency_samples_exclude_wait_for_budget(monkeypatch):
+    """Test only the upstream call is timed, not the wait for its reservation"""
+    metrics = LatencyTracker()
+    monkeypatch.setattr(cerebras_module, "llm_metrics", metrics)
+    monkeypatch.setattr(cerebras_module, "hedger", Hedger(metrics))
+    monkeypatch.setattr(cerebras_module, "llm_scheduler", SlowBudgetScheduler(enabled=False))
+    service = CerebrasService(backend=SimulatedBackend(SimulationProfile(latency=0.0, token_interval=0.0)))
+    
+    result = await service.generate_completion("Hello", use_cache=False, coalesce=False)
+    
+    assert result["queue_wait"] == pytest.approx(0.2)
+    assert metrics.sample_count(settings.DEFAULT_MODEL) == 1
+    assert metrics.percentile(settings.DEFAULT_MODEL, 0.5) < 0.1
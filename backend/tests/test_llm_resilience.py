@@ -0,0 +1,102 @@
+"""
+Test LLM retry and circuit breaker handling
+"""
+
+import httpx
+import pytest
+from cerebras.cloud.sdk import APIStatusError
+from app.core.exceptions import CircuitBreakerOpenError, RateLimitError, SchedulerTimeoutError
+from app.services.llm_resilience import ResilientCaller, RetryPolicy, is_retryable
+
+
+def upstream_error(status_code: int) -> APIStatusError:
+    response = httpx.Response(status_code, request=httpx.Request("POST", "http://upstream/v1/chat/completions"))
+    return APIStatusError(f"upstream returned {status_code}", response=response, body=None)
+
+
+def make_caller(max_attempts: int = 3, failure_threshold: int = 5) -> ResilientCaller:
+    return ResilientCaller(
+        RetryPolicy(max_attempts=max_attempts, base_delay=0, max_delay=0),
+        failure_threshold=failure_threshold,
+        recovery_timeout=60
+    )
+
+
+def test_error_classification():
+    """Test 429 and 5xx are retryable while other 4xx are fatal"""
+    assert is_retryable(upstream_error(429))
+    assert is_retryable(upstream_error(503))
+    assert not is_retryable(upstream_error(400))
+    assert not is_retryable(ValueError("bad input"))
+    # The app's own errors carry status codes for API responses but are never upstream failures
+    assert not is_retryable(CircuitBreakerOpenError("model"))
+    assert not is_retryable(RateLimitError())
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    """Test a transient failure is retried until it succeeds"""
+    caller = make_caller()
+    attempts = []
+    
+    async def send():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise upstream_error(503)
+        return "ok"
+    
+    assert await caller.call("model", send) == "ok"
+    assert len(attempts) == 3
+    assert caller.get_stats()["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fatal_errors_are_not_retried():
+    """Test a fatal failure is raised immediately"""
+    caller = make_caller()
+    attempts = []
+    
+    async def send():
+        attempts.append(1)
+        raise upstream_error(400)
+    
+    with pytest.raises(APIStatusError):
+        await caller.call("model", send)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_repeated_failures():
+    """Test the breaker fails fast once the failure threshold is reached"""
+    caller = make_caller(max_attempts=1, failure_threshold=2)
+    
+    async def send():
+        raise upstream_error(502)
+    
+    for _ in range(2):
+        with pytest.raises(APIStatusError):
+            await caller.call("model", send)
+    
+    with pytest.raises(CircuitBreakerOpenError):
+        await caller.call("model", send)
+    assert caller.get_breaker("model").state == "open"
+    # Other models are unaffected
+    assert caller.get_breaker("other-model").state == "closed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [CircuitBreakerOpenError("other-model"), SchedulerTimeoutError()])
+async def test_local_errors_are_raised_once_without_breaker_failure(error):
+    """Test an open breaker or scheduler timeout inside a call is neither retried nor counted"""
+    caller = make_caller(failure_threshold=1)
+    attempts = []
+    
+    async def send():
+        attempts.append(1)
+        raise error
+    
+    with pytest.raises(type(error)):
+        await caller.call("model", send)
+    assert len(attempts) == 1
+    assert caller.get_stats()["retries"] == 0
+    assert caller.get_breaker("model").state == "closed"
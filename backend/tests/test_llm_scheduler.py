@@ -0,0 +1,185 @@
+"""
+Test LLM request scheduler
+"""
+
+import asyncio
+import time
+import httpx
+import pytest
+from cerebras.cloud.sdk import APIStatusError
+import app.services.cerebras_service as cerebras_module
+import app.services.llm_scheduler as llm_scheduler_module
+from app.core.config import settings
+from app.core.exceptions import SchedulerTimeoutError, DeadlineExceededError
+from app.services.cancellation import CancellationToken
+from app.services.cerebras_service import CerebrasService
+from app.services.llm_resilience import ResilientCaller, RetryPolicy
+from app.services.llm_scheduler import LLMScheduler, _LocalBucket
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+MESSAGES = [{"role": "user", "content": "x" * 400}]
+
+
+def test_estimate_includes_prompt_and_completion():
+    """Test token estimates cover the prompt and the reserved completion"""
+    scheduler = LLMScheduler(completion_estimate=100)
+    assert scheduler.estimate_tokens(MESSAGES, max_tokens=1000) == 104 + 100
+    assert scheduler.estimate_tokens(MESSAGES, max_tokens=10) == 104 + 10
+
+
+def test_per_model_limits_override_defaults():
+    """Test per-model limits take precedence over the defaults"""
+    scheduler = LLMScheduler(
+        requests_per_minute=10,
+        tokens_per_minute=1000,
+        model_limits={"small-model": {"tokens_per_minute": 50}}
+    )
+    assert scheduler.get_limits("small-model") == (10, 50)
+    assert scheduler.get_limits("other-model") == (10, 1000)
+
+
+def test_local_bucket_reports_wait_when_empty():
+    """Test an exhausted bucket reports the time until it refills"""
+    bucket = _LocalBucket(capacity=10, rate_per_ms=0.01)
+    assert bucket.wait_for(10) == 0
+    bucket.level = 0
+    assert bucket.wait_for(5) == pytest.approx(500, rel=0.05)
+
+
+@pytest.mark.asyncio
+async def test_disabled_scheduler_admits_immediately():
+    """Test a disabled scheduler never queues"""
+    scheduler = LLMScheduler(enabled=False)
+    async with scheduler.reserve("model", MESSAGES, 100) as reservation:
+        assert reservation.queue_wait == 0
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_never_queues(monkeypatch):
+    """Test an immediate reservation is refused once the budget is spent"""
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis([]))
+    scheduler = LLMScheduler(requests_per_minute=1, redis_backoff=60)
+    
+    assert await scheduler.try_acquire("model", MESSAGES, 100) is not None
+    assert await scheduler.try_acquire("model", MESSAGES, 100) is None
+    assert scheduler.get_stats()["not_granted"] == 1
+
+
+def upstream_error(status_code: int) -> APIStatusError:
+    response = httpx.Response(status_code, request=httpx.Request("POST", "http://upstream/v1/chat/completions"))
+    return APIStatusError(f"upstream returned {status_code}", response=response, body=None)
+
+
+class FlakyBackend(SimulatedBackend):
+    """Fails its first completion and its first stream with a transient error"""
+    
+    def __init__(self):
+        super().__init__(SimulationProfile(latency=0.0, token_interval=0.0, completion_tokens=8))
+        self.calls = 0
+        self.streams = 0
+    
+    async def complete(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise upstream_error(503)
+        return await super().complete(*args, **kwargs)
+    
+    async def open_stream(self, *args, **kwargs):
+        self.streams += 1
+        if self.streams == 1:
+            raise upstream_error(503)
+        return await super().open_stream(*args, **kwargs)
+
+
+def unreachable_redis(counter):
+    async def get_redis():
+        counter.append(1)
+        raise ConnectionError("Redis is down")
+    return get_redis
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_backs_off_to_local_budget(monkeypatch):
+    """Test one Redis failure sends later reservations straight to the local buckets"""
+    connects = []
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis(connects))
+    scheduler = LLMScheduler(requests_per_minute=60, redis_backoff=60)
+    
+    for _ in range(3):
+        async with scheduler.reserve("model", MESSAGES, 100) as reservation:
+            reservation.actual_tokens = 50
+    
+    assert len(connects) == 1
+    assert scheduler.get_stats()["redis_failures"] == 1
+    assert scheduler._local_buckets["model"][0].level == pytest.approx(57, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_each_retry_takes_a_reservation(monkeypatch):
+    """Test a retried completion is charged once per upstream attempt"""
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis([]))
+    scheduler = LLMScheduler(redis_backoff=60)
+    monkeypatch.setattr(cerebras_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(cerebras_module, "resilient_caller", ResilientCaller(RetryPolicy(base_delay=0, max_delay=0)))
+    service = CerebrasService(backend=FlakyBackend())
+    
+    result = await service.generate_completion("Hello", use_cache=False, coalesce=False)
+    
+    assert result["completion_tokens"] == 8
+    assert scheduler.get_stats()["admitted"] == 2
+
+
+@pytest.mark.asyncio
+async def test_exhausted_local_budget_does_not_trip_circuit_breaker(monkeypatch):
+    """Test scheduler timeouts are raised once, without retries or breaker failures"""
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis([]))
+    scheduler = LLMScheduler(requests_per_minute=1, max_wait=0, redis_backoff=60)
+    caller = ResilientCaller(RetryPolicy(base_delay=0, max_delay=0), failure_threshold=2)
+    monkeypatch.setattr(cerebras_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(cerebras_module, "resilient_caller", caller)
+    service = CerebrasService(backend=SimulatedBackend(SimulationProfile(latency=0.0, token_interval=0.0)))
+    
+    await service.generate_completion("Hello", use_cache=False, coalesce=False)
+    for _ in range(3):
+        with pytest.raises(SchedulerTimeoutError):
+            await service.generate_completion("Hello", use_cache=False, coalesce=False)
+    
+    assert scheduler.get_stats()["timeouts"] == 3
+    assert caller.get_stats()["retries"] == 0
+    assert caller.get_breaker(settings.DEFAULT_MODEL).state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_each_stream_retry_reservation_is_settled(monkeypatch):
+    """Test a retried stream takes a reservation per attempt and settles them"""
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis([]))
+    scheduler = LLMScheduler(tokens_per_minute=60000, redis_backoff=60)
+    monkeypatch.setattr(cerebras_module, "llm_scheduler", scheduler)
+    monkeypatch.setattr(cerebras_module, "resilient_caller", ResilientCaller(RetryPolicy(base_delay=0, max_delay=0)))
+    service = CerebrasService(backend=FlakyBackend())
+    
+    streamed = await service.consume_stream(await service.generate_completion("Hello", stream=True, coalesce=False))
+    
+    assert streamed["completion_tokens"] == 8
+    assert scheduler.get_stats()["admitted"] == 2
+    assert scheduler.get_stats()["actual_tokens"] == streamed["tokens_used"]
+    # Only the tokens actually generated stay charged
+    tokens = scheduler._local_buckets[settings.DEFAULT_MODEL][1]
+    assert tokens.level == pytest.approx(tokens.capacity - streamed["tokens_used"], abs=20)
+
+
+@pytest.mark.asyncio
+async def test_stream_budget_wait_is_abandoned_on_cancellation(monkeypatch):
+    """Test a cancel token's deadline ends a stream's wait for rate-limit budget"""
+    monkeypatch.setattr(llm_scheduler_module, "get_redis", unreachable_redis([]))
+    scheduler = LLMScheduler(requests_per_minute=1, max_wait=60, redis_backoff=60)
+    monkeypatch.setattr(cerebras_module, "llm_scheduler", scheduler)
+    service = CerebrasService(backend=SimulatedBackend(SimulationProfile(latency=0.0, token_interval=0.0)))
+    await scheduler.acquire(settings.DEFAULT_MODEL, MESSAGES, 100)
+    
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceededError):
+        stream = await service.generate_completion("Hello", stream=True, cancel_token=CancellationToken(timeout=0.1))
+        await service.consume_stream(stream)
+    
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,78 @@
+"""
+Test the simulated LLM backend
+"""
+
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.cerebras_service import CerebrasService
+from app.services.llm_resilience import is_retryable, get_retry_after
+from app.services.llm_simulator import SimulatedBackend, SimulationProfile
+
+MESSAGES = [{"role": "user", "content": "Summarise the report"}]
+
+
+def make_backend(**options) -> SimulatedBackend:
+    return SimulatedBackend(SimulationProfile(latency=0.0, token_interval=0.0, completion_tokens=8, **options))
+
+
+@pytest.mark.asyncio
+async def test_output_is_deterministic():
+    """Test identical requests get identical completions and usage"""
+    first = await make_backend().complete(MESSAGES, "model", 100, 0.6, 0.9)
+    second = await make_backend(seed=7).complete(MESSAGES, "model", 100, 0.6, 0.9)
+    
+    assert first.content == second.content
+    assert first.completion_tokens == 8
+    assert first.finish_reason == "stop"
+    assert first.total_tokens == first.prompt_tokens + 8
+
+
+@pytest.mark.asyncio
+async def test_stream_matches_completion():
+    """Test streamed chunks join to the non-streaming content and end with usage"""
+    backend = make_backend()
+    result = await backend.complete(MESSAGES, "model", 4, 0.6, 0.9)
+    stream = await backend.open_stream(MESSAGES, "model", 4, 0.6, 0.9)
+    chunks = [chunk async for chunk in stream]
+    
+    assert "".join(chunk.content for chunk in chunks if chunk.content) == result.content
+    assert chunks[-1].finish_reason == "length"
+    assert chunks[-1].completion_tokens == 4
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_burst_carries_retry_after():
+    """Test a 429 burst raises a retryable error with a Retry-After hint"""
+    backend = make_backend(rate_limit_burst_interval=60.0, rate_limit_burst_duration=60.0)
+    
+    with pytest.raises(Exception) as exc_info:
+        await backend.complete(MESSAGES, "model", 100, 0.6, 0.9)
+    
+    assert is_retryable(exc_info.value)
+    assert 0 < get_retry_after(exc_info.value) <= 60.0
+
+
+@pytest.mark.asyncio
+async def test_service_runs_on_simulated_backend():
+    """Test CerebrasService completes through a pluggable backend"""
+    service = CerebrasService(backend=make_backend())
+    
+    result = await service.generate_completion("Hello", use_cache=False, coalesce=False)
+    
+    assert result["completion_tokens"] == 8
+    assert result["content"]
+    assert service.get_stats()["backend"] == "simulated"
+
+
+@pytest.mark.asyncio
+async def test_stalled_warm_up_does_not_block_startup(monkeypatch):
+    """Test pre-warming gives up after the warm-up timeout"""
+    class StalledBackend(SimulatedBackend):
+        async def warm_up(self):
+            await asyncio.sleep(10)
+    
+    monkeypatch.setattr(settings, "CEREBRAS_WARMUP_TIMEOUT", 0.01)
+    service = CerebrasService(backend=StalledBackend(SimulationProfile()))
+    
+    await asyncio.wait_for(service.warm_up(), timeout=1)
@@ -0,0 +1,49 @@
+"""
+Test latency- and cost-aware model routing
+"""
+
+from app.services.llm_metrics import LatencyTracker
+from app.services.llm_resilience import ResilientCaller, RetryPolicy
+from app.services.model_catalog import model_catalog
+from app.services.model_router import ModelRouter
+
+LARGE_MODEL = "llama-4-maverick-17b-128e-instruct"
+
+
+def make_router() -> ModelRouter:
+    caller = ResilientCaller(RetryPolicy(max_attempts=1), failure_threshold=1, recovery_timeout=60)
+    return ModelRouter(model_catalog, LatencyTracker(), caller, enabled=True)
+
+
+def test_simple_task_routes_to_cheapest_small_model():
+    """Test a classification task moves to the cheapest, fastest small model"""
+    router = make_router()
+    
+    decision = router.route(LARGE_MODEL, prompt_tokens=200, max_tokens=4096, task_type="classification")
+    
+    assert decision.routed
+    assert decision.model == "llama-3-8b-instruct"
+    assert router.get_stats()["estimated_cost_saved"] > 0
+
+
+def test_pinned_agent_and_unmatched_calls_keep_their_model():
+    """Test pinned agents and calls no rule matches are not rerouted"""
+    router = make_router()
+    
+    pinned = router.route(LARGE_MODEL, 200, 4096, "classification", {"routing": "pinned"})
+    unmatched = router.route(LARGE_MODEL, 2000, 4096, "ai_task")
+    
+    assert pinned.model == LARGE_MODEL
+    assert unmatched.model == LARGE_MODEL
+
+
+def test_unhealthy_and_slow_models_are_avoided():
+    """Test an open circuit breaker or high observed latency moves traffic elsewhere"""
+    router = make_router()
+    router.caller.get_breaker("llama-3-8b-instruct").record_failure()
+    for _ in range(20):
+        router.metrics.record("llama-2-7b-chat", 3.0)
+    
+    decision = router.route(LARGE_MODEL, 200, 4096, "classification")
+    
+    assert decision.model == "llama-2-13b-chat"
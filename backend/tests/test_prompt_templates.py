@@ -0,0 +1,38 @@
+"""
+Test prompt template registry
+"""
+
+from datetime import datetime
+
+import pytest
+from app.models.agent import Agent
+from app.services.prompt_templates import PromptRegistry
+
+
+def make_agent(**kwargs) -> Agent:
+    values = dict(id=1, name="Researcher", role="Researcher", goal="Find facts", backstory="Curious")
+    values.update(kwargs)
+    return Agent(**values)
+
+
+def test_template_reports_missing_values():
+    """Test rendering fails clearly when a field is missing"""
+    registry = PromptRegistry()
+    registry.register("greeting", "Hello {name}")
+    assert registry.render("greeting", name="Ada") == "Hello Ada"
+    with pytest.raises(KeyError):
+        registry.render("greeting")
+
+
+def test_agent_system_prompt_is_cached_until_agent_changes():
+    """Test the persona is rendered once and refreshed after an update"""
+    registry = PromptRegistry()
+    registry.register("agent_system", "{system} {role} {goal} {backstory}")
+    agent = make_agent()
+    
+    first = registry.get_agent_system_prompt(agent)
+    assert registry.get_agent_system_prompt(agent) is first
+    assert registry.stats["agent_prompt_hits"] == 1
+    
+    updated = make_agent(goal="Write reports", updated_at=datetime(2024, 1, 1))
+    assert "Write reports" in registry.get_agent_system_prompt(updated)
@@ -0,0 +1,90 @@
+"""
+Test single-flight request coalescing
+"""
+
+import asyncio
+import pytest
+from app.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_upstream_call():
+    """Test identical concurrent calls run the upstream call once"""
+    single_flight = SingleFlight(distributed=False)
+    calls = 0
+    
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"content": "shared"}
+    
+    results = await asyncio.gather(*[single_flight.do("key", upstream) for _ in range(5)])
+    
+    assert calls == 1
+    assert all(result["content"] == "shared" for result in results)
+    assert single_flight.get_stats()["local_followers"] == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_replay_all_chunks():
+    """Test every subscriber of a shared stream receives every chunk"""
+    single_flight = SingleFlight(distributed=False)
+    calls = 0
+    
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        for index in range(3):
+            await asyncio.sleep(0.01)
+            yield {"content": str(index), "finish_reason": None}
+        yield {"content": "", "finish_reason": "stop"}
+    
+    async def consume():
+        return [chunk["content"] async for chunk in single_flight.stream("key", upstream)]
+    
+    results = await asyncio.gather(consume(), consume())
+    
+    assert calls == 1
+    assert results == [["0", "1", "2", ""], ["0", "1", "2", ""]]
+
+
+@pytest.mark.asyncio
+async def test_only_the_leader_reports_token_consumption():
+    """Test followers' results are marked coalesced with their usage zeroed"""
+    single_flight = SingleFlight(distributed=False)
+    
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return {"content": "shared", "tokens_used": 30, "prompt_tokens": 20, "completion_tokens": 10}
+    
+    leader, *followers = await asyncio.gather(*[single_flight.do("key", upstream) for _ in range(3)])
+    
+    assert leader["tokens_used"] == 30 and leader["completion_tokens"] == 10
+    assert "coalesced" not in leader
+    for follower in followers:
+        assert follower["content"] == "shared"
+        assert follower["coalesced"] is True
+        assert follower["coalesced_tokens"] == 30
+        assert follower["tokens_used"] == follower["prompt_tokens"] == follower["completion_tokens"] == 0
+    assert sum(result["tokens_used"] for result in [leader, *followers]) == 30
+
+
+@pytest.mark.asyncio
+async def test_only_the_stream_leader_reports_token_consumption():
+    """Test a shared stream's final chunk carries usage for its leader only"""
+    single_flight = SingleFlight(distributed=False)
+    
+    async def upstream():
+        await asyncio.sleep(0.01)
+        yield {"content": "a", "finish_reason": None}
+        yield {"content": "", "finish_reason": "stop", "tokens_used": 12, "completion_tokens": 4}
+    
+    async def consume():
+        return [chunk async for chunk in single_flight.stream("key", upstream)]
+    
+    leader, follower = await asyncio.gather(consume(), consume())
+    
+    assert leader[-1]["tokens_used"] == 12
+    assert follower[-1]["tokens_used"] == 0 and follower[-1]["coalesced"] is True
+    assert follower[0] == leader[0] == {"content": "a", "finish_reason": None}
@@ -0,0 +1,59 @@
+"""
+Test incremental structured-output parsing
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.structured_output import StructuredOutput
+
+
+SCHEMA = {
+    "type": "object",
+    "required": ["title", "score"],
+    "properties": {
+        "title": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "score": {"type": "integer", "maximum": 100}
+    }
+}
+
+
+def test_fields_emitted_as_they_complete():
+    """Test each field is available once its value closes, across chunk boundaries"""
+    output = StructuredOutput(SCHEMA)
+    
+    assert output.feed('Here you go:\n```json\n{"title": "a, \\"b\\"", "ta') == [("title", 'a, "b"')]
+    assert output.feed('gs": ["x", "y"], "sco') == [("tags", ["x", "y"])]
+    assert output.feed('re": 7}\n```') == [("score", 7)]
+    assert output.close() == []
+    assert output.fields == {"title": 'a, "b"', "tags": ["x", "y"], "score": 7}
+
+
+def test_invalid_and_missing_fields_reported():
+    """Test fields breaking the schema are withheld and missing required fields are reported"""
+    output = StructuredOutput(SCHEMA)
+    
+    errors = output.close('{"title": 3, "tags": ["x", 1], "score": 5')
+    
+    assert output.fields == {}
+    assert "$.title: expected string, got int" in errors
+    assert "$.tags[1]: expected string, got int" in errors
+    assert "$: response is not a complete JSON object" in errors
+    assert "$.score: required field missing" in errors
+
+
+@pytest.mark.asyncio
+async def test_wait_for_returns_before_output_closes():
+    """Test a consumer gets its fields without waiting for the rest of the response"""
+    output = StructuredOutput(SCHEMA)
+    waiter = asyncio.create_task(output.wait_for(["title"]))
+    
+    output.feed('{"title": "first", "score"')
+    assert await asyncio.wait_for(waiter, 1) == {"title": "first"}
+    assert not output.closed
+    
+    missing = asyncio.create_task(output.wait_for(["tags"]))
+    output.close()
+    assert await asyncio.wait_for(missing, 1) is None
@@ -0,0 +1,93 @@
+"""
+Test layered task concurrency limits
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import app.services.cerebras_service as cerebras_module
+import app.services.workflow_service as workflow_service_module
+from app.services.cancellation import CancellationToken
+from app.services.task_concurrency import TaskConcurrencyLimiter
+from app.services.workflow_service import WorkflowService
+
+
+async def run_tasks(limiter, keys, duration=0.02):
+    """Run one task per (workflow, agent, model) key, returning the peak number in flight"""
+    in_flight = 0
+    peak = 0
+    
+    async def task(workflow_id, agent_id, model):
+        nonlocal in_flight, peak
+        async with limiter.slot(workflow_id, agent_id, model):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(duration)
+            in_flight -= 1
+    
+    await asyncio.gather(*(task(*key) for key in keys))
+    return peak
+
+
+@pytest.mark.asyncio
+async def test_tightest_level_bounds_tasks_in_flight():
+    """Test each level caps concurrency and idle limits are dropped"""
+    limiter = TaskConcurrencyLimiter(max_global=10, per_workflow=6, per_agent=3, per_model=None)
+    
+    assert await run_tasks(limiter, [(1, 1, "m")] * 12) == 3
+    assert await run_tasks(limiter, [(1, agent_id % 4, "m") for agent_id in range(12)]) == 6
+    assert await run_tasks(limiter, [(workflow_id % 4, workflow_id, "m") for workflow_id in range(24)]) == 10
+    
+    stats = limiter.get_stats()
+    assert stats["acquired"] == 48
+    assert stats["waited"] > 0
+    assert stats["in_flight"] == {}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_releases_its_slots():
+    """Test a task cancelled while queued neither holds nor leaks a slot"""
+    limiter = TaskConcurrencyLimiter(max_global=1, per_workflow=None, per_agent=None, per_model=None)
+    
+    async with limiter.slot(1, 1, "m"):
+        waiter = asyncio.create_task(run_tasks(limiter, [(1, 1, "m")]))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+    
+    assert await asyncio.wait_for(run_tasks(limiter, [(1, 1, "m")] * 2, duration=0), 1) == 1
+    assert limiter.get_stats()["waiting"] == 0
+
+
+async def generate_slowly(cancel_token=None, **kwargs):
+    await cancel_token.run(asyncio.sleep(0.1))
+    return {"response": "done"}
+
+
+@pytest.mark.asyncio
+async def test_task_timeout_starts_once_its_slot_is_held(monkeypatch):
+    """Test a task's deadline is not used up while it waits for a concurrency slot"""
+    monkeypatch.setattr(workflow_service_module, "task_concurrency", TaskConcurrencyLimiter(per_workflow=1))
+    monkeypatch.setattr(cerebras_module.cerebras_service, "generate_agent_response", generate_slowly)
+    service = WorkflowService(MagicMock())
+    service._build_ai_task_request = lambda task_execution, task, output=None: {"model": "m"}
+    service._record_ai_task_result = lambda task_execution, *args: setattr(task_execution, "status", "completed")
+    
+    # Each task takes 0.1s of its 0.15s timeout; the second waits 0.1s for the first's slot
+    tasks = [
+        SimpleNamespace(id=task_id, workflow_id=1, agent_id=task_id, workflow=None, config={"timeout": 0.15})
+        for task_id in (1, 2)
+    ]
+    executions = [SimpleNamespace(status="running") for _ in tasks]
+    execution_token = CancellationToken()
+    
+    await asyncio.gather(*(
+        service._execute_ai_task(task_execution, task, service._task_cancel_token(task, execution_token))
+        for task_execution, task in zip(executions, tasks)
+    ))
+    
+    assert [task_execution.status for task_execution in executions] == ["completed", "completed"]
@@ -0,0 +1,46 @@
+"""
+Test per-task timing metrics
+"""
+
+from types import SimpleNamespace
+
+import app.models.workflow  # noqa: F401  Task's relationships resolve Workflow by name
+from app.services.task_metrics import record_task_metrics
+
+
+def test_records_timing_and_throughput():
+    """Test wall time, queue wait and tokens/sec land on the row and in the log"""
+    task_execution = SimpleNamespace(execution_log=None)
+    
+    record_task_metrics(task_execution, 2.5, {
+        "queue_wait": 0.5,
+        "time_to_first_token": 0.25,
+        "prompt_tokens": 120,
+        "completion_tokens": 300
+    })
+    
+    assert task_execution.execution_time == 2500
+    assert task_execution.queue_wait == 500
+    assert task_execution.time_to_first_token == 250
+    assert task_execution.tokens_per_second == 150.0
+    assert task_execution.prompt_tokens == 120
+    assert task_execution.completion_tokens == 300
+    assert task_execution.execution_log["timing"]["queue_wait"] == 0.5
+
+
+def test_cached_response_reports_no_throughput():
+    """Test a cache hit records no queue wait or tokens/sec"""
+    task_execution = SimpleNamespace(execution_log={"attempt": 1})
+    
+    record_task_metrics(
+        task_execution, 0.01,
+        {"cached": True, "queue_wait": 3.0, "time_to_first_token": 0.4, "completion_tokens": 300, "cached_tokens": 420}
+    )
+    
+    assert task_execution.queue_wait == 0
+    assert task_execution.tokens_per_second is None
+    assert task_execution.completion_tokens == 0
+    assert not hasattr(task_execution, "time_to_first_token")
+    assert task_execution.execution_log["timing"]["cached_tokens"] == 420
+    assert task_execution.execution_log["attempt"] == 1
+    assert task_execution.execution_log["timing"]["cached"] is True
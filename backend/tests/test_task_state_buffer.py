@@ -0,0 +1,72 @@
+"""
+Test batched task execution state writes
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.task_state_buffer import TaskStateBuffer
+
+
+class FakeSession:
+    """Counts the session calls the buffer makes"""
+    
+    def __init__(self):
+        self.added = []
+        self.flushes = 0
+        self.commits = 0
+    
+    def add_all(self, rows):
+        self.added.extend(rows)
+    
+    def flush(self):
+        self.flushes += 1
+    
+    def commit(self):
+        self.commits += 1
+
+
+class Row:
+    def __init__(self, status):
+        self.status = status
+
+
+def test_inserts_are_batched_and_finished_tasks_commit_at_once():
+    """Test new rows share one uncommitted insert while each finished task commits straight away"""
+    db = FakeSession()
+    buffer = TaskStateBuffer(db, flush_interval=60)
+    
+    rows = [Row("running") for _ in range(5)]
+    buffer.insert(rows)
+    buffer.record(rows[0])
+    assert db.flushes == 1
+    assert db.commits == 0
+    
+    rows[0].status = "completed"
+    buffer.record(rows[0])
+    assert db.commits == 1
+    assert buffer.get_stats()["pending"] == 0
+    
+    buffer.flush()
+    assert db.commits == 1
+    
+    rows[1].status = "failed"
+    buffer.record(rows[1])
+    assert db.commits == 2
+
+
+@pytest.mark.asyncio
+async def test_background_flush_commits_pending_changes():
+    """Test buffered changes are committed within the flush interval without another write"""
+    db = FakeSession()
+    buffer = TaskStateBuffer(db, flush_interval=0.01)
+    buffer.start()
+    
+    buffer.insert([Row("running")])
+    assert db.commits == 0
+    await asyncio.sleep(0.05)
+    await buffer.stop()
+    
+    assert db.commits == 1
+    assert buffer.get_stats()["background_flushes"] == 1
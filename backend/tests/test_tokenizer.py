@@ -0,0 +1,45 @@
+"""
+Test local token estimation and context-window budgeting
+"""
+
+import pytest
+from app.core.exceptions import ValidationError
+from app.services.tokenizer import TokenEstimator, fit_completion_tokens, get_context_window
+
+MODEL = "llama-3-8b-instruct"
+
+
+def test_count_text_follows_word_pieces():
+    """Test common words, numbers and punctuation are counted separately"""
+    estimator = TokenEstimator()
+    assert estimator.count_text("the cat sat") == 3
+    assert estimator.count_text("123456") == 2
+    assert estimator.count_text("") == 0
+
+
+def test_completion_tokens_are_clamped_to_context_window():
+    """Test max_tokens is reduced to what fits after the prompt"""
+    window = get_context_window(MODEL)
+    max_tokens, clamped = fit_completion_tokens(MODEL, 1000, 32768)
+    assert clamped
+    assert 0 < max_tokens < window - 1000
+    
+    assert fit_completion_tokens(MODEL, 1000, 100) == (100, False)
+
+
+def test_oversized_prompt_is_rejected():
+    """Test a prompt larger than the context window fails locally"""
+    with pytest.raises(ValidationError):
+        fit_completion_tokens(MODEL, get_context_window(MODEL), 100)
+
+
+def test_estimates_calibrate_towards_actual_usage():
+    """Test recorded usage corrects later estimates for that model"""
+    estimator = TokenEstimator()
+    messages = [{"role": "user", "content": "word " * 100}]
+    estimate = estimator.count_messages(messages, MODEL)
+    for _ in range(50):
+        estimator.record_usage(MODEL, estimator.count_messages(messages, MODEL), estimate * 2)
+    
+    assert estimator.count_messages(messages, MODEL) == pytest.approx(estimate * 2, rel=0.05)
+    assert estimator.count_messages(messages, "other-model") == estimate
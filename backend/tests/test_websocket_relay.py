@@ -0,0 +1,48 @@
+"""
+Test relaying WebSocket updates from worker processes
+"""
+
+import json
+
+import pytest
+
+import app.core.websocket as websocket_module
+from app.core.websocket import ConnectionManager
+
+
+class PublishingRedis:
+    def __init__(self):
+        self.published = []
+    
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+
+
+@pytest.mark.asyncio
+async def test_worker_agent_and_workflow_updates_reach_api_subscribers(monkeypatch):
+    """Test updates published by a worker are delivered to the matching API-process subscribers"""
+    redis = PublishingRedis()
+    
+    async def get_redis():
+        return redis
+    
+    monkeypatch.setattr(websocket_module, "get_redis", get_redis)
+    worker_manager = ConnectionManager()
+    worker_manager.relay_to_redis = True
+    await worker_manager.broadcast_agent_update("3", {"type": "task_completed"})
+    await worker_manager.broadcast_workflow_update("7", {"type": "workflow_completed"})
+    
+    api_manager = ConnectionManager()
+    await api_manager.subscribe_to_agent("agent-client", "3")
+    await api_manager.subscribe_to_workflow("workflow-client", "7")
+    sent = []
+    
+    async def send_personal_message(message, client_id):
+        sent.append((client_id, message["type"]))
+    
+    monkeypatch.setattr(api_manager, "send_personal_message", send_personal_message)
+    for channel, data in redis.published:
+        assert channel == ConnectionManager.RELAY_CHANNEL
+        await api_manager._deliver_relayed_update(json.loads(data))
+    
+    assert sent == [("agent-client", "task_completed"), ("workflow-client", "workflow_completed")]
@@ -0,0 +1,113 @@
+"""
+Test execution checkpoints, pausing and resuming
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.exceptions import ExecutionPausedError
+from app.services.cancellation import CancellationToken
+from app.services.cerebras_service import cerebras_service
+from app.services.workflow_service import WorkflowService
+
+SCHEMA = {"type": "object", "properties": {"title": {"type": "string"}}}
+
+
+def make_task(task_id, config=None):
+    return SimpleNamespace(
+        id=task_id,
+        task_type="ai_task",
+        config=config,
+        input_data={"topic": "x"},
+        agent_id=1,
+        workflow=SimpleNamespace(config={"max_concurrency": 1})
+    )
+
+
+def test_load_checkpoint_cancels_interrupted_tasks():
+    """Test completed rows form the checkpoint and rows left running are marked cancelled"""
+    service = WorkflowService(MagicMock())
+    done = SimpleNamespace(task_id=1, status="completed")
+    interrupted = SimpleNamespace(task_id=2, status="running", error_message=None, completed_at=None)
+    failed = SimpleNamespace(task_id=3, status="failed")
+    service.db.query.return_value.filter.return_value.all.return_value = [done, interrupted, failed]
+    
+    completed = service._load_checkpoint(SimpleNamespace(id=1))
+    
+    assert completed == {1: done}
+    assert interrupted.status == "cancelled"
+    assert interrupted.completed_at is not None
+    assert failed.status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_linear_resume_feeds_checkpointed_output_to_next_task():
+    """Test a resumed linear execution skips completed tasks and passes their stored fields on"""
+    service = WorkflowService(MagicMock())
+    started = []
+    
+    def start_task_execution(execution, task, input_data=None):
+        started.append(service._new_task_execution(execution, task, input_data))
+        return started[-1]
+    
+    async def execute_ai_task(task_execution, task, cancel_token=None, output=None):
+        task_execution.status = "completed"
+    
+    service._start_task_execution = start_task_execution
+    service._execute_ai_task = execute_ai_task
+    tasks = [make_task(1, {"output_schema": SCHEMA}), make_task(2, {"input_fields": ["title"]})]
+    completed = {1: SimpleNamespace(output_data={"response": '{"title": "Draft"}'})}
+    
+    await service._execute_linear_workflow(SimpleNamespace(id=1), tasks, None, completed)
+    
+    assert [row.task_id for row in started] == [2]
+    assert started[0].input_data == {"topic": "x", "title": "Draft"}
+
+
+@pytest.mark.asyncio
+async def test_parallel_pause_drops_tasks_that_never_started(monkeypatch):
+    """Test pausing a parallel execution deletes the rows of tasks it never started"""
+    service = WorkflowService(MagicMock())
+    service._build_ai_task_request = lambda task_execution, task: {"model": "model"}
+    service._task_slot = lambda task, model, task_token=None: None
+    token = CancellationToken()
+    
+    async def iter_completions_batch(requests, concurrency):
+        for index, _ in enumerate(requests):
+            token.pause_requested = True  # pause once the first task is under way
+            yield index, {
+                "success": True,
+                "result": {"response": "done", "tokens_used": 5},
+                "execution_time": 0.01,
+                "slot_wait": 0.0
+            }
+    
+    monkeypatch.setattr(cerebras_service, "iter_completions_batch", iter_completions_batch)
+    
+    with pytest.raises(ExecutionPausedError):
+        await service._execute_parallel_workflow(SimpleNamespace(id=1), [make_task(1), make_task(2), make_task(3)], token)
+    
+    rows = service.db.add_all.call_args[0][0]
+    deleted = [call.args[0] for call in service.db.delete.call_args_list]
+    assert rows[0].status == "completed"
+    assert deleted == rows[1:]
+
+
+@pytest.mark.asyncio
+async def test_resume_restarts_paused_executions():
+    """Test resuming a workflow sets its paused executions pending and starts each again"""
+    service = WorkflowService(MagicMock())
+    workflow = SimpleNamespace(name="w", status="paused", config={"timeout": 30})
+    paused = [SimpleNamespace(id=1, status="paused"), SimpleNamespace(id=2, status="paused")]
+    service.db.query.return_value.filter.return_value.first.return_value = workflow
+    service.db.query.return_value.filter.return_value.all.return_value = paused
+    service._start_execution = AsyncMock()
+    
+    assert await service.resume_workflow(1) is True
+    
+    assert workflow.status == "active"
+    assert [execution.status for execution in paused] == ["pending", "pending"]
+    service.db.commit.assert_called()
+    assert [call.args for call in service._start_execution.call_args_list] == [(1, 30), (2, 30)]
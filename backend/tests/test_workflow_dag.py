@@ -0,0 +1,92 @@
+"""
+Test dependency-ordered workflow execution
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.exceptions import ValidationError, ExecutionPausedError
+from app.services.cancellation import CancellationToken
+from app.services.workflow_service import WorkflowService
+
+
+def make_task(task_id, dependencies=None):
+    return SimpleNamespace(id=task_id, order=task_id, dependencies=dependencies)
+
+
+def make_service(durations, failing=()):
+    """Service whose tasks sleep for their duration and record start/finish order"""
+    service = WorkflowService(MagicMock())
+    events = []
+    
+    async def execute_task(execution, task, cancel_token=None):
+        events.append(("start", task.id))
+        await asyncio.sleep(durations[task.id])
+        events.append(("finish", task.id))
+        return SimpleNamespace(status="failed" if task.id in failing else "completed")
+    
+    service._execute_task = execute_task
+    return service, events
+
+
+def test_task_graph_rejects_cycles():
+    """Test a dependency cycle is reported with the tasks on it"""
+    service = WorkflowService(MagicMock())
+    tasks = [make_task(1), make_task(2, [1, 4]), make_task(3, [2]), make_task(4, [3])]
+    
+    with pytest.raises(ValidationError) as error:
+        service._task_graph(tasks)
+    assert error.value.details == {"tasks": [2, 3, 4]}
+    
+    # Dependencies outside the execution are ignored
+    assert service._task_graph([make_task(1, [99]), make_task(2, [1])]) == {1: [], 2: [1]}
+
+
+@pytest.mark.asyncio
+async def test_tasks_start_when_dependencies_finish():
+    """Test a diamond runs its branches concurrently and joins on both"""
+    service, events = make_service({1: 0.01, 2: 0.05, 3: 0.01, 4: 0.01})
+    tasks = [make_task(1), make_task(2, [1]), make_task(3, [1]), make_task(4, [2, 3])]
+    
+    await service._execute_dag_workflow(SimpleNamespace(id=1, output_data=None), tasks)
+    
+    assert events[:3] == [("start", 1), ("finish", 1), ("start", 2)]
+    assert events.index(("start", 3)) < events.index(("finish", 2))
+    assert events[-2:] == [("start", 4), ("finish", 4)]
+
+
+@pytest.mark.asyncio
+async def test_failure_skips_downstream_tasks():
+    """Test tasks behind a failed task are skipped while independent ones still run"""
+    service, events = make_service({1: 0, 2: 0, 3: 0, 4: 0}, failing={1})
+    tasks = [make_task(1), make_task(2, [1]), make_task(3, [2]), make_task(4)]
+    execution = SimpleNamespace(id=1, output_data=None)
+    
+    await service._execute_dag_workflow(execution, tasks, max_parallelism=1)
+    
+    assert [task_id for kind, task_id in events if kind == "start"] == [1, 4]
+    assert execution.output_data == {"skipped_tasks": [2, 3]}
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_completed_tasks_and_pause_stops_at_boundary():
+    """Test checkpointed tasks are not rerun and a pause lets running tasks finish but starts no more"""
+    service, events = make_service({1: 0, 2: 0.02, 3: 0.02, 4: 0})
+    tasks = [make_task(1), make_task(2, [1]), make_task(3, [1]), make_task(4, [2, 3])]
+    token = CancellationToken()
+    
+    async def pause_soon():
+        await asyncio.sleep(0.01)
+        token.pause_requested = True
+    
+    pausing = asyncio.create_task(pause_soon())
+    with pytest.raises(ExecutionPausedError):
+        await service._execute_dag_workflow(
+            SimpleNamespace(id=1, output_data=None), tasks, token, completed={1: SimpleNamespace(status="completed")}
+        )
+    await pausing
+    
+    assert events == [("start", 2), ("start", 3), ("finish", 2), ("finish", 3)]
@@ -0,0 +1,49 @@
+"""
+Test linear workflow execution
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services.workflow_service import WorkflowService
+
+SCHEMA = {"type": "object", "properties": {"title": {"type": "string"}}}
+
+
+def make_task(task_id, config=None):
+    return SimpleNamespace(id=task_id, task_type="ai_task", config=config, input_data={"topic": "x"}, agent_id=1)
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_cancels_pipelined_task():
+    """Test a task started on its predecessor's fields is cancelled when the predecessor fails"""
+    service = WorkflowService(MagicMock())
+    
+    async def execute_ai_task(task_execution, task, cancel_token=None, output=None):
+        if task.id == 1:
+            output.feed('{"title": "Draft", "body": "')
+            await asyncio.sleep(0.05)
+            task_execution.status = "failed"
+            task_execution.error_message = "stream broke"
+        else:
+            await cancel_token.run(asyncio.sleep(10))
+            task_execution.status = "completed"
+    
+    executions = []
+    
+    def start_task_execution(execution, task, input_data=None):
+        executions.append(service._new_task_execution(execution, task, input_data))
+        return executions[-1]
+    
+    service._execute_ai_task = execute_ai_task
+    service._start_task_execution = start_task_execution
+    tasks = [make_task(1, {"output_schema": SCHEMA}), make_task(2, {"input_fields": ["title"]})]
+    
+    await asyncio.wait_for(service._execute_linear_workflow(SimpleNamespace(id=1), tasks), timeout=1)
+    
+    assert [execution.status for execution in executions] == ["failed", "cancelled"]
+    assert executions[1].input_data == {"topic": "x", "title": "Draft"}
+    assert "upstream task failed" in executions[1].error_message
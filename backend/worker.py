@@ -0,0 +1,193 @@
+"""
+CrewAI Cerebras Multi-Agent Workflow Platform
+Execution worker entry point: runs queued workflow executions apart from the API
+
+Usage (with EXECUTION_QUEUE_ENABLED on the API):
+    python worker.py
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis import init_redis, close_redis
+from app.core.websocket import websocket_manager
+from app.models.workflow import WorkflowExecution
+from app.services.cancellation import cancellation_registry
+from app.services.cerebras_service import cerebras_service
+from app.services.execution_queue import ExecutionQueue, execution_queue
+from app.services.workflow_service import WorkflowService
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class ExecutionWorker:
+    """Reserves executions from the queue and runs up to `concurrency` of them at once
+    
+    Running jobs have their visibility deadline extended every third of the
+    visibility timeout and are acknowledged once the execution finishes. On
+    shutdown the worker stops taking jobs, gives running executions
+    `shutdown_grace` seconds to finish, then hands the rest back to the
+    queue for another worker.
+    """
+    
+    def __init__(
+        self,
+        queue: ExecutionQueue,
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        shutdown_grace: float = 25.0,
+        heartbeat_file: Optional[str] = None
+    ):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.shutdown_grace = shutdown_grace
+        self.heartbeat_file = Path(heartbeat_file) if heartbeat_file else None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[asyncio.Task, int] = {}
+        self._stopping = asyncio.Event()
+        self._last_extended = 0.0
+    
+    def stop(self):
+        self._stopping.set()
+    
+    async def run(self):
+        logger.info(f"Worker {self.worker_id} started, running up to {self.concurrency} executions")
+        while not self._stopping.is_set():
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Worker loop error: {e}")
+                await self._wait(self.poll_interval)
+        await self._shutdown()
+    
+    async def _tick(self):
+        self._beat()
+        for job in await self.queue.requeue_expired():
+            self._fail_abandoned(job)
+        
+        if time.monotonic() - self._last_extended >= self.queue.visibility_timeout / 3:
+            await self.queue.extend(list(self._running.values()))
+            self._last_extended = time.monotonic()
+        
+        if len(self._running) < self.concurrency:
+            job = await self.queue.reserve()
+            if job is not None:
+                self._start(job)
+                return
+        await self._wait(self.poll_interval)
+    
+    async def _wait(self, timeout: float):
+        """Sleep until the poll interval passes, an execution finishes or the worker stops"""
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait({stopping, *self._running}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+    
+    def _start(self, job: Dict[str, Any]):
+        execution_id = job["execution_id"]
+        logger.info(f"Running execution {execution_id} (delivery {job['attempts']})")
+        task = asyncio.create_task(self._execute(job))
+        self._running[task] = execution_id
+        task.add_done_callback(self._running.pop)
+    
+    async def _execute(self, job: Dict[str, Any]):
+        execution_id = job["execution_id"]
+        # The executor tracks state in memory; reloading rows after each commit would only add reads
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            cancellation_registry.register(execution_id, job.get("timeout"))
+            await WorkflowService(db)._execute_workflow_async(execution_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Left unacknowledged: redelivered after the visibility timeout, then dead-lettered
+            logger.error(f"Execution {execution_id} crashed on worker {self.worker_id}: {e}")
+            return
+        finally:
+            db.close()
+        # A job queued again while this delivery ran (paused, then resumed) is kept
+        await self.queue.ack(execution_id, job.get("job_id"))
+    
+    def _fail_abandoned(self, job: Dict[str, Any]):
+        """Mark a dead-lettered execution failed so it does not stay running forever"""
+        execution_id = job["execution_id"]
+        logger.error(f"Execution {execution_id} dead-lettered after {job['attempts']} deliveries")
+        db = SessionLocal()
+        try:
+            execution = db.query(WorkflowExecution).filter(WorkflowExecution.id == execution_id).first()
+            if execution and execution.status in ("pending", "running"):
+                execution.status = "failed"
+                execution.error_message = f"Execution abandoned after {job['attempts']} delivery attempts"
+                execution.completed_at = func.now()
+                db.commit()
+        finally:
+            db.close()
+    
+    def _beat(self):
+        if self.heartbeat_file is not None:
+            try:
+                self.heartbeat_file.touch()
+            except OSError as e:
+                logger.warning(f"Could not touch heartbeat file {self.heartbeat_file}: {e}")
+    
+    async def _shutdown(self):
+        if self._running:
+            logger.info(f"Waiting up to {self.shutdown_grace}s for {len(self._running)} running executions")
+            await asyncio.wait(set(self._running), timeout=self.shutdown_grace)
+        
+        for task, execution_id in list(self._running.items()):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            await self.queue.release(execution_id)
+            logger.info(f"Returned execution {execution_id} to the queue")
+        logger.info(f"Worker {self.worker_id} stopped")
+
+
+async def main():
+    await init_redis()
+    await cancellation_registry.start()
+    # Clients connect to the API processes; send them this worker's updates through Redis
+    websocket_manager.relay_to_redis = True
+    await cerebras_service.warm_up()
+    
+    worker = ExecutionWorker(
+        execution_queue,
+        concurrency=settings.WORKER_CONCURRENCY,
+        poll_interval=settings.EXECUTION_QUEUE_POLL_INTERVAL,
+        shutdown_grace=settings.WORKER_SHUTDOWN_GRACE,
+        heartbeat_file=settings.WORKER_HEARTBEAT_FILE
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.stop)
+    
+    try:
+        await worker.run()
+    finally:
+        await cancellation_registry.stop()
+        await cerebras_service.close()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -55,6 +55,10 @@ kubectl apply -f k8s/backend.yaml
 echo "⏳ Waiting for backend to be ready..."
 kubectl wait --for=condition=ready pod -l app=backend -n crewai-cerebras --timeout=300s
 
+# Deploy execution workers
+echo "⚙️ Deploying execution workers..."
+kubectl apply -f k8s/worker.yaml
+
 # Deploy frontend
 echo "⚛️ Deploying frontend..."
 kubectl apply -f k8s/frontend.yaml
@@ -80,6 +84,7 @@ echo "  kubectl port-forward -n crewai-cerebras service/backend-service 8000:800
 echo ""
 echo "To view logs:"
 echo "  kubectl logs -f -n crewai-cerebras -l app=backend"
+echo "  kubectl logs -f -n crewai-cerebras -l app=worker"
 echo "  kubectl logs -f -n crewai-cerebras -l app=frontend"
 echo ""
 echo "To delete the deployment:"